@@ -19,11 +19,14 @@ function getI18nText(key) {
     return i18nStrings.value[key][language.value] || i18nStrings.value[key]['jp'] || key;
 };
 
+const cardImageVariants = nodecg.Replicant('cardImageVariants');
+
 /**
  * Constructs the full URL for a card image.
  * Relies on `assetPaths` and `database` replicants being in scope.
+ * `size` picks a generated variant ('thumb', 'medium') when one exists, otherwise the original.
  */
-const getCardImageUrl = (cardId, isBgImage = false) => {
+const getCardImageUrl = (cardId, isBgImage = false, size = 'thumb') => {
     if (!cardId || !assetPaths.value || !assetPaths.value.cardImgPath) {
         const defaultPath = '/assets/ptcg-telop/element/default.jpg';
         return isBgImage ? `url(${defaultPath})` : defaultPath;
@@ -32,7 +35,11 @@ const getCardImageUrl = (cardId, isBgImage = false) => {
     const cardData = db ? db[cardId] : null;
     const imageUrl = cardData ? cardData.image_url : null;
     const extension = imageUrl ? imageUrl.substring(imageUrl.lastIndexOf('.')) : '.jpg'; // Fallback to .jpg
-    const path = `/${assetPaths.value.cardImgPath}${cardId}${extension}`;
+    const variantPaths = assetPaths.value.cardImgVariantPaths;
+    const variants = cardImageVariants.value && cardImageVariants.value[cardId];
+    const path = (variantPaths && variants && variants.includes(size))
+        ? `/${variantPaths[size]}${cardId}.webp`
+        : `/${assetPaths.value.cardImgPath}${cardId}${extension}`;
     return isBgImage ? `url(${path})` : path;
 };
 
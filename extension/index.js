@@ -5,6 +5,7 @@ const path = require('path');
 const os = require('os');
 const { exec, spawn } = require('child_process');
 const https = require('https');
+const zlib = require('zlib');
 
 module.exports = function (nodecg) {
 	nodecg.log.info('Bundle ptcg-telop starting up.');
@@ -57,13 +58,21 @@ module.exports = function (nodecg) {
 			toolLimit: 4,
 			language: "jp",
 			forceRefetchDeck: false,
+			offlineMode: false,
 			hideAttackName: false
 		}
 	});
 
 	// Replicants can be declared outside the initialized block.
 	const cardDatabase = nodecg.Replicant('cardDatabase', { defaultValue: {} });
+	// Declared up here because loadCardDatabase() reads the decks during the first settings change.
+	const deckL = nodecg.Replicant('deckL', { defaultValue: { name: '', cards: [] } });
+	const deckR = nodecg.Replicant('deckR', { defaultValue: { name: '', cards: [] } });
+	let cardManifestCache = { path: null, mtimeMs: 0, manifest: null };
 	const assetPaths = nodecg.Replicant('assetPaths', { defaultValue: {} });
+	// cardId -> sizes ('thumb', 'medium') that have a generated variant for the current language.
+	const cardImageVariants = nodecg.Replicant('cardImageVariants', { defaultValue: {} });
+	const CARD_IMG_VARIANT_SIZES = ['thumb', 'medium'];
 	const deckLoadingStatus = nodecg.Replicant('deckLoadingStatus', { defaultValue: { loading: false, side: null } });
 	const deckLoadingProgress = nodecg.Replicant('deckLoadingProgress', { defaultValue: { side: null, percentage: 0, text: '' } });
 	const playerL_name = nodecg.Replicant('playerL_name', { defaultValue: '' });
@@ -195,6 +204,16 @@ module.exports = function (nodecg) {
 			assetPaths.value.cardImgPath = newCardImgPath;
 			nodecg.log.info(`Asset path for card images updated to: ${newCardImgPath}`);
 		}
+		const newVariantPaths = {};
+		for (const size of CARD_IMG_VARIANT_SIZES) {
+			newVariantPaths[size] = `assets/ptcg-telop/card_img_${newLang}_${size}/`;
+		}
+		if (JSON.stringify(assetPaths.value.cardImgVariantPaths) !== JSON.stringify(newVariantPaths)) {
+			assetPaths.value.cardImgVariantPaths = newVariantPaths;
+		}
+		if (!oldValue || oldValue.language !== newLang) {
+			refreshCardImageVariants();
+		}
 
 		// On initial load (oldValue is undefined) or if lang has changed, reload the DB.
 		if (!oldValue) {
@@ -250,8 +269,6 @@ module.exports = function (nodecg) {
 	const selections = nodecg.Replicant('selections', { defaultValue: [] });
 	const deckIdL = nodecg.Replicant('deckIdL', { defaultValue: '' });
 	const deckIdR = nodecg.Replicant('deckIdR', { defaultValue: '' });
-	const deckL = nodecg.Replicant('deckL', { defaultValue: { name: '', cards: [] } });
-	const deckR = nodecg.Replicant('deckR', { defaultValue: { name: '', cards: [] } });
 
 	// Prize Cards Replicants
 	const prizeCardsL = nodecg.Replicant('prizeCardsL', { defaultValue: Array.from({ length: 6 }, () => ({ cardId: null, isTaken: false })) });
@@ -292,6 +309,13 @@ module.exports = function (nodecg) {
 		liveRep.once('change', (newValue) => { if (JSON.stringify(newValue) !== JSON.stringify(draftRep.value)) draftRep.value = JSON.parse(JSON.stringify(newValue)); });
 		liveRepR.once('change', (newValue) => { if (JSON.stringify(newValue) !== JSON.stringify(draftRepR.value)) draftRepR.value = JSON.parse(JSON.stringify(newValue)); });
 	}
+	// Registered once the board replicants releaseUnusedCards() reads are declared.
+	for (const deck of [deckL, deckR]) {
+		deck.on('change', (newValue) => {
+			ensureCardsLoaded((newValue && newValue.cards) || []);
+			releaseUnusedCards();
+		});
+	}
 	// =====================================
 
 	// --- DEBUG: Moved logic out of 'initialized' event ---
@@ -299,11 +323,207 @@ module.exports = function (nodecg) {
 
 
 
-	function loadCardDatabase() {
+	/**
+	 * Rebuilds the cardImageVariants replicant from the variant directories the Python
+	 * scripts write (card_img_<lang>_thumb/, card_img_<lang>_medium/), so the graphics
+	 * only request a variant that exists and fall back to the original otherwise.
+	 */
+	function refreshCardImageVariants() {
+		const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
+		const variants = {};
+		for (const size of CARD_IMG_VARIANT_SIZES) {
+			const variantDir = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', `card_img_${lang}_${size}`);
+			if (!fs.existsSync(variantDir)) continue;
+			for (const file of fs.readdirSync(variantDir)) {
+				if (!file.endsWith('.webp')) continue;
+				const cardId = file.slice(0, -'.webp'.length);
+				(variants[cardId] = variants[cardId] || []).push(size);
+			}
+		}
+		cardImageVariants.value = variants;
+	}
+
+	/**
+	 * Logs the {"offline": ...} summary an import script prints in offline mode.
+	 */
+	function logOfflineMisses(label, offline) {
+		const missingCards = offline.missing_cards || [];
+		const missingRequests = offline.missing_requests || [];
+		if (missingCards.length === 0 && missingRequests.length === 0) {
+			nodecg.log.info(`[Import Flow] Offline import of "${label}" was served entirely from local data.`);
+			return;
+		}
+		nodecg.log.warn(`[Import Flow] Offline import of "${label}": ${missingCards.length} cards and ${missingRequests.length} requests are not available locally.`);
+		if (missingCards.length > 0) nodecg.log.warn(`[Import Flow] Missing cards: ${missingCards.join(', ')}`);
+		for (const miss of missingRequests) nodecg.log.warn(`[Import Flow] Missing: ${miss}`);
+	}
+
+	/**
+	 * Collects the {"progress": ...} events of one import (see python/telemetry.py): record()
+	 * returns the percentage done when a card finishes, log() reports where the time went.
+	 * Step times are summed over the parallel workers, so they can add up to more than the wall time.
+	 */
+	function createImportTimings(label) {
+		const startedAt = Date.now();
+		const phases = {};
+		const statuses = {};
+		const formatBytes = (bytes) => (bytes >= 1048576 ? `${(bytes / 1048576).toFixed(1)} MB` : `${(bytes / 1024).toFixed(1)} KB`);
+		return {
+			record(event) {
+				if (!event || typeof event.phase !== 'string') return null;
+				const phase = phases[event.phase] || (phases[event.phase] = { count: 0, ms: 0, bytes: 0, errors: 0, cache: {} });
+				phase.count += 1;
+				phase.ms += event.ms || 0;
+				phase.bytes += event.bytes || 0;
+				if (event.error) phase.errors += 1;
+				if (event.cache) phase.cache[event.cache] = (phase.cache[event.cache] || 0) + 1;
+				if (event.phase !== 'card') return null;
+				if (event.status) statuses[event.status] = (statuses[event.status] || 0) + 1;
+				return event.total > 0 ? (event.done / event.total) * 100 : null;
+			},
+			log() {
+				const names = Object.keys(phases).filter(name => name !== 'card');
+				if (names.length === 0 && !phases.card) return;
+				const parts = names.map((name) => {
+					const phase = phases[name];
+					let text = `${name} ${phase.count}x ${Math.round(phase.ms)} ms`;
+					if (phase.bytes > 0) text += `, ${formatBytes(phase.bytes)}`;
+					const cache = Object.entries(phase.cache).map(([kind, count]) => `${kind} ${count}`);
+					if (cache.length > 0) text += ` (${cache.join(', ')})`;
+					if (phase.errors > 0) text += `, ${phase.errors} failed`;
+					return text;
+				});
+				const cards = Object.entries(statuses).map(([status, count]) => `${count} ${status}`);
+				if (cards.length > 0) parts.push(`cards: ${cards.join(', ')}`);
+				nodecg.log.info(`[Import Timing] "${label}" took ${Date.now() - startedAt} ms; ${parts.join('; ')}.`);
+			},
+		};
+	}
+
+	/**
+	 * With the journal store (PTCG_CARD_STORE=journal) the database JSON is only a snapshot;
+	 * cards saved since the last compaction are JSON lines in database_<lang>.journal.
+	 * Applies them, the same way card_store.py replays them.
+	 */
+	function replayCardJournal(dbPath, dbData) {
+		const journalPath = dbPath.replace(/\.json$/, '.journal');
+		for (const file of [`${journalPath}.compacting`, journalPath]) {
+			if (!fs.existsSync(file)) continue;
+			for (const line of fs.readFileSync(file, 'utf8').split('\n')) {
+				if (!line.trim()) continue;
+				let entry;
+				try {
+					entry = JSON.parse(line);
+				} catch (e) {
+					continue; // Torn last line from an interrupted write
+				}
+				if (entry.deleted) {
+					delete dbData[entry.id];
+				} else {
+					dbData[entry.id] = entry.card;
+				}
+			}
+		}
+		return dbData;
+	}
+
+	/**
+	 * Reads a database file written by card_store.py in any of its formats (PTCG_DB_FORMAT):
+	 * plain or compact JSON, or gzip-compressed compact JSON. Compact files omit null keys,
+	 * which reads the same as null for every consumer of cardDatabase.
+	 */
+	function readCardDatabaseFile(dbPath) {
+		let raw = fs.readFileSync(dbPath);
+		if (raw.length >= 2 && raw[0] === 0x1f && raw[1] === 0x8b) {
+			raw = zlib.gunzipSync(raw);
+		}
+		return raw.toString('utf8');
+	}
+
+	/**
+	 * The SQLite store also exports the cards split by set (database_<lang>.shards/) with a
+	 * manifest mapping card IDs to shard files. Returns the manifest, or null when there is
+	 * none or it is older than database_<lang>.json (written by the journal store meanwhile).
+	 */
+	function readCardManifest(dbPath) {
+		const manifestPath = dbPath.replace(/\.json$/, '.manifest.json');
 		try {
-			const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
-			const dbFileName = `database_${lang}.json`;
-			const dbPath = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', dbFileName);
+			const mtimeMs = fs.statSync(manifestPath).mtimeMs;
+			if (fs.existsSync(dbPath) && fs.statSync(dbPath).mtimeMs > mtimeMs) return null;
+			if (cardManifestCache.path !== manifestPath || cardManifestCache.mtimeMs !== mtimeMs) {
+				const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+				if (manifest.version !== 1 || !manifest.index) return null;
+				cardManifestCache = { path: manifestPath, mtimeMs, manifest };
+			}
+			return cardManifestCache.manifest;
+		} catch (e) {
+			return null;
+		}
+	}
+
+	// Card IDs on the board (live and draft slots with their tools and energy, stadiums, prize
+	// cards) and the cards being shown, whose image URL ends in the card ID.
+	function cardIdsOnScreen() {
+		const ids = [];
+		for (const prefix of ['live_', 'draft_']) {
+			for (const side of ['L', 'R']) {
+				for (let i = 0; i < 9; i++) {
+					const slot = nodecg.Replicant(`${prefix}slot${side}${i}`).value;
+					if (!slot) continue;
+					if (slot.cardId) ids.push(slot.cardId);
+					ids.push(...(slot.attachedToolIds || []), ...(slot.attachedEnergy || []));
+				}
+			}
+			const stadium = nodecg.Replicant(`${prefix}stadium`).value;
+			if (stadium && stadium.cardId) ids.push(stadium.cardId);
+		}
+		for (const prizes of [prizeCardsL.value, prizeCardsR.value]) {
+			for (const prize of prizes || []) {
+				if (prize && prize.cardId) ids.push(prize.cardId);
+			}
+		}
+		for (const cardUrl of [cardToShowL.value, cardToShowR.value]) {
+			const match = typeof cardUrl === 'string' && cardUrl.match(/\/([^/]+)\.(jpg|png|jpeg|webp)$/i);
+			if (match) ids.push(match[1]);
+		}
+		return ids.filter(id => typeof id === 'string');
+	}
+
+	// Card IDs the loaded database must contain: both decks, the cards on screen and any extra IDs.
+	function neededCardIds(extraIds = []) {
+		const ids = new Set(extraIds);
+		for (const deck of [deckL.value, deckR.value]) {
+			for (const id of (deck && deck.cards) || []) ids.add(id);
+		}
+		for (const id of cardIdsOnScreen()) ids.add(id);
+		return ids;
+	}
+
+	function loadCardShards(dbPath, manifest, ids) {
+		const shardDir = dbPath.replace(/\.json$/, '.shards');
+		const files = new Set();
+		for (const id of ids) {
+			if (manifest.index[id]) files.add(manifest.index[id]);
+		}
+		const dbData = {};
+		for (const file of files) {
+			Object.assign(dbData, JSON.parse(readCardDatabaseFile(path.join(shardDir, file))));
+		}
+		return { dbData, shardCount: files.size };
+	}
+
+	function cardDatabasePath() {
+		const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
+		return path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', `database_${lang}.json`);
+	}
+
+	/**
+	 * Loads the card database. With shards, only the sets holding the cards of neededCardIds()
+	 * and extraIds are read, so the cost follows the decks in play rather than the database size.
+	 */
+	function loadCardDatabase(extraIds = []) {
+		try {
+			const dbPath = cardDatabasePath();
 			nodecg.log.info(`[DB_DEBUG] Attempting to load database. Calculated path: ${dbPath}`);
 
 			const dbDir = path.dirname(dbPath);
@@ -312,20 +532,32 @@ module.exports = function (nodecg) {
 				fs.mkdirSync(dbDir, { recursive: true });
 			}
 
+			const manifest = readCardManifest(dbPath);
+			if (manifest) {
+				try {
+					const { dbData, shardCount } = loadCardShards(dbPath, manifest, neededCardIds(extraIds));
+					cardDatabase.value = replayCardJournal(dbPath, dbData);
+					nodecg.log.info(`[DB_DEBUG] Loaded ${Object.keys(dbData).length} cards from ${shardCount}/${Object.keys(manifest.shards).length} shards.`);
+					return;
+				} catch (error) {
+					nodecg.log.warn('[DB_DEBUG] Could not read database shards, loading the whole file.', error);
+				}
+			}
+
 			if (!fs.existsSync(dbPath)) {
-				cardDatabase.value = {};
+				cardDatabase.value = replayCardJournal(dbPath, {});
 				nodecg.log.error(`[DB_DEBUG] CRITICAL_PATH_TEST: Card database file does not exist at path: ${dbPath}. Initialized empty.`);
 				return;
 			}
 
-			const fileContent = fs.readFileSync(dbPath, 'utf8');
+			const fileContent = readCardDatabaseFile(dbPath);
 			if (!fileContent || fileContent.trim() === '') {
 				nodecg.log.warn(`[DB_DEBUG] Database file is empty. Initializing empty.`);
-				cardDatabase.value = {};
+				cardDatabase.value = replayCardJournal(dbPath, {});
 				return;
 			}
 
-			const dbData = JSON.parse(fileContent);
+			const dbData = replayCardJournal(dbPath, JSON.parse(fileContent));
 			cardDatabase.value = dbData;
 			nodecg.log.info(`[DB_DEBUG] Successfully loaded and parsed database. Total entries: ${Object.keys(dbData).length}`);
 
@@ -335,6 +567,245 @@ module.exports = function (nodecg) {
 		}
 	}
 
+	/**
+	 * Merges a {"cardChanges": ...} line from card_store.py into the replicant key by key,
+	 * so only the changed cards are sent to the graphics and dashboards.
+	 */
+	function applyCardChanges(changes) {
+		if (changes.reload) {
+			loadCardDatabase();
+			return;
+		}
+		if (!cardDatabase.value || typeof cardDatabase.value !== 'object') cardDatabase.value = {};
+		const db = cardDatabase.value;
+		for (const [id, card] of Object.entries(changes.updated || {})) {
+			db[id] = card;
+		}
+		for (const id of changes.deleted || []) {
+			if (id in db) delete db[id];
+		}
+	}
+
+	/**
+	 * Deck edits, restored decks and cards skipped by an import (already in the database) may
+	 * not be loaded yet. With shards, only the missing sets are read and merged. Without them,
+	 * the whole database is reloaded, but only when reloadWithoutShards is set.
+	 */
+	function ensureCardsLoaded(ids, reloadWithoutShards = false) {
+		const db = cardDatabase.value || {};
+		const missing = ids.filter(id => !(db[id] && db[id].name));
+		if (missing.length === 0) return;
+		const dbPath = cardDatabasePath();
+		const manifest = readCardManifest(dbPath);
+		if (!manifest) {
+			if (reloadWithoutShards) loadCardDatabase(ids);
+			return;
+		}
+		if (!missing.some(id => manifest.index[id])) return;
+		try {
+			const { dbData } = loadCardShards(dbPath, manifest, missing);
+			applyCardChanges({ updated: replayCardJournal(dbPath, dbData) });
+		} catch (error) {
+			nodecg.log.warn('[DB_DEBUG] Could not read database shards, reloading the database.', error);
+			loadCardDatabase(ids);
+		}
+	}
+
+	/**
+	 * With shards, drops the loaded cards whose shard no card of neededCardIds() is in any more
+	 * (a replaced deck), so the replicant follows the decks in play instead of only growing.
+	 * Cards the manifest does not list yet (saved since the last export) are kept.
+	 */
+	function releaseUnusedCards() {
+		const db = cardDatabase.value;
+		if (!db || typeof db !== 'object') return;
+		const manifest = readCardManifest(cardDatabasePath());
+		if (!manifest) return;
+		const files = new Set();
+		for (const id of neededCardIds()) {
+			if (manifest.index[id]) files.add(manifest.index[id]);
+		}
+		const deleted = Object.keys(db).filter(id => manifest.index[id] && !files.has(manifest.index[id]));
+		if (deleted.length === 0) return;
+		applyCardChanges({ deleted });
+		nodecg.log.info(`[DB_DEBUG] Released ${deleted.length} cards from shards no deck or card on screen uses.`);
+	}
+
+	// Calls handleMessage for every JSON object the script prints on its own stdout line.
+	function onStdoutMessages(child, handleMessage) {
+		let stdoutBuffer = '';
+		const handleLine = (line) => {
+			if (!line.trim()) return;
+			let message;
+			try {
+				message = JSON.parse(line);
+			} catch (e) {
+				return; // Not a protocol line
+			}
+			if (message && typeof message === 'object') handleMessage(message);
+		};
+		child.stdout.on('data', (data) => {
+			stdoutBuffer += data.toString();
+			let newlineIndex;
+			while ((newlineIndex = stdoutBuffer.indexOf('\n')) !== -1) {
+				handleLine(stdoutBuffer.slice(0, newlineIndex));
+				stdoutBuffer = stdoutBuffer.slice(newlineIndex + 1);
+			}
+		});
+		child.stdout.on('end', () => {
+			handleLine(stdoutBuffer);
+			stdoutBuffer = '';
+		});
+	}
+
+	const pythonDir = path.join(__dirname, '..', 'python');
+	const pythonCommand = os.platform() === 'win32' ? 'python' : 'python3';
+	const IMPORT_SCRIPTS = {
+		deck: { jp: 'extract_deck_cards_jp.py', chs: 'extract_deck_cards_chs.py', cht: 'extract_deck_cards_cht.py', en: 'extract_deck_cards_en.py' },
+		card: { jp: 'get_single_card_jp.py', chs: 'get_single_card_chs.py', cht: 'get_single_card_cht.py', en: 'get_single_card_en.py' },
+	};
+
+	// Long-lived python/import_worker.py: imports run in one warm Python process that speaks
+	// line-delimited JSON-RPC on stdin/stdout, instead of a fresh python per click. It is started
+	// once and restarted with a backoff when it dies; while it is down, or when it cannot take a
+	// request, the import scripts are spawned as before.
+	const IMPORT_WORKER_MAX_BACKOFF_MS = 30000;
+	const IMPORT_WORKER_STABLE_MS = 60000; // Up this long, a crash restarts it without backoff
+	// The worker runs one request at a time. One it has not started this long after it was sent
+	// (stuck behind a slow or hung import) is run as a script instead; the worker drops it once its
+	// deadline, a little earlier, has passed, so the two never both run it.
+	const IMPORT_WORKER_QUEUE_TIMEOUT_MS = 15000;
+	const IMPORT_WORKER_DEADLINE_MARGIN_MS = 2000;
+	// background: requests that have answered but are still finishing their images.
+	const importWorker = { child: null, nextId: 1, pending: new Map(), background: new Map(), restarts: 0, startedAt: 0 };
+
+	function startImportWorker() {
+		const workerPath = path.join(pythonDir, 'import_worker.py');
+		if (!fs.existsSync(workerPath)) {
+			nodecg.log.warn('[Import Worker] import_worker.py not found, every import starts its own Python process.');
+			return;
+		}
+		const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
+		const child = spawn(pythonCommand, [workerPath, '--preload', lang], { cwd: pythonDir });
+		importWorker.child = child;
+		importWorker.startedAt = Date.now();
+
+		onStdoutMessages(child, handleImportWorkerMessage);
+		// Output that belongs to a request arrives as a "log" notification; this is everything else.
+		child.stderr.on('data', (data) => {
+			data.toString().split('\n').filter(line => line.trim()).forEach(line => nodecg.log.debug(`[Import Worker] ${line}`));
+		});
+		child.stdin.on('error', () => {}); // A dead worker is handled on 'close'
+		child.on('error', (err) => {
+			nodecg.log.error(`[Import Worker] Failed to start: ${err.message}`);
+			onImportWorkerGone(child, err.message);
+		});
+		child.on('close', (exitCode, signal) => onImportWorkerGone(child, signal || `exit code ${exitCode}`));
+	}
+
+	function onImportWorkerGone(child, reason) {
+		if (importWorker.child !== child) return;
+		importWorker.child = null;
+		const pending = Array.from(importWorker.pending.values());
+		importWorker.pending.clear();
+		pending.forEach(call => call.fail(new Error(`the worker exited (${reason})`)));
+		const background = Array.from(importWorker.background.values());
+		importWorker.background.clear();
+		background.forEach(call => call.handlers.onClose(call.exitCode || 1));
+
+		if (Date.now() - importWorker.startedAt > IMPORT_WORKER_STABLE_MS) importWorker.restarts = 0;
+		const delay = Math.min(IMPORT_WORKER_MAX_BACKOFF_MS, 1000 * 2 ** importWorker.restarts);
+		importWorker.restarts += 1;
+		nodecg.log.warn(`[Import Worker] Stopped (${reason}), restarting in ${delay / 1000}s.`);
+		setTimeout(startImportWorker, delay);
+	}
+
+	function handleImportWorkerMessage(message) {
+		if (message.method === 'started') {
+			const call = message.params && importWorker.pending.get(message.params.id);
+			if (call) call.started = true;
+			return;
+		}
+		if (message.method === 'finished') {
+			const call = message.params && importWorker.background.get(message.params.id);
+			if (!call) return;
+			importWorker.background.delete(message.params.id);
+			call.handlers.onClose(call.exitCode || message.params.exitCode);
+			return;
+		}
+		if (message.method === 'output' || message.method === 'log') {
+			const id = message.params && message.params.id;
+			const call = importWorker.pending.get(id) || importWorker.background.get(id);
+			if (!call) return;
+			if (message.method === 'output') {
+				call.producedOutput = true;
+				call.handlers.onMessage(message.params.message);
+			} else {
+				call.handlers.onStderr(`${message.params.line}\n`);
+			}
+			return;
+		}
+		const call = importWorker.pending.get(message.id);
+		if (!call) return;
+		importWorker.pending.delete(message.id);
+		clearTimeout(call.timer);
+		if (message.error) {
+			call.fail(new Error(message.error.message));
+		} else if (message.result && message.result.background) {
+			// The worker is free again; the call closes with the "finished" notification.
+			call.exitCode = message.result.exitCode;
+			importWorker.background.set(message.id, call);
+		} else {
+			call.handlers.onClose(message.result ? message.result.exitCode : 0);
+		}
+	}
+
+	// Runs an import script ('deck' or 'card') with args, in the worker when possible.
+	// handlers: onMessage(message) for every JSON line it prints, onStderr(text), onClose(exitCode), onError(err).
+	function runImport(kind, lang, args, handlers) {
+		const runScript = () => {
+			const scripts = IMPORT_SCRIPTS[kind];
+			const child = spawn(pythonCommand, [path.join(pythonDir, scripts[lang] || scripts.jp), ...args], { cwd: pythonDir });
+			onStdoutMessages(child, handlers.onMessage);
+			child.stderr.on('data', (data) => handlers.onStderr(data.toString()));
+			child.on('close', handlers.onClose);
+			child.on('error', handlers.onError);
+		};
+
+		const worker = importWorker.child;
+		if (!worker) {
+			runScript();
+			return;
+		}
+		const id = importWorker.nextId++;
+		const call = {
+			handlers,
+			started: false,
+			producedOutput: false,
+			timer: setTimeout(() => {
+				if (call.started || importWorker.pending.get(id) !== call) return;
+				importWorker.pending.delete(id);
+				call.fail(new Error(`not started within ${IMPORT_WORKER_QUEUE_TIMEOUT_MS / 1000}s`));
+			}, IMPORT_WORKER_QUEUE_TIMEOUT_MS),
+			fail(err) {
+				clearTimeout(this.timer);
+				if (this.producedOutput) {
+					// Part of the result was already applied; running the script again would apply it twice.
+					nodecg.log.warn(`[Import Worker] ${kind} import failed: ${err.message}.`);
+					handlers.onClose(1);
+					return;
+				}
+				nodecg.log.warn(`[Import Worker] Could not run the ${kind} import (${err.message}), starting the script instead.`);
+				runScript();
+			},
+		};
+		importWorker.pending.set(id, call);
+		const deadline = Date.now() + IMPORT_WORKER_QUEUE_TIMEOUT_MS - IMPORT_WORKER_DEADLINE_MARGIN_MS;
+		worker.stdin.write(`${JSON.stringify({ jsonrpc: '2.0', id, method: kind, params: { language: lang, args, deadline } })}\n`);
+	}
+
+	startImportWorker();
+
 	function loadI18nStrings() {
 		try {
 			const i18nPath = path.join(__dirname, '..', 'i18n', 'strings.json');
@@ -354,86 +825,194 @@ module.exports = function (nodecg) {
 	const processDeckImport = (side, code, callback, progressOptions = { scale: 1, offset: 0 }) => {
 		nodecg.log.info(`[Import Flow] Attempting to import "${code}" as a DECK for Player ${side}.`);
 
-		const pythonDir = path.join(__dirname, '..', 'python');
 		const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
-		const scriptMap = {
-			jp: 'extract_deck_cards_jp.py',
-			chs: 'extract_deck_cards_chs.py',
-			cht: 'extract_deck_cards_cht.py',
-			en: 'extract_deck_cards_en.py',
-		};
-		const pythonScriptFile = scriptMap[lang] || scriptMap.jp;
-		const pythonScriptPath = path.join(pythonDir, pythonScriptFile);
 		const dbFileName = `database_${lang}.json`;
 		const absoluteDbPath = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', dbFileName);
-		const pythonCommand = os.platform() === 'win32' ? 'python' : 'python3';
 
-		const args = [pythonScriptPath, code, '--database-path', absoluteDbPath];
+		const args = [code, '--database-path', absoluteDbPath];
 		// Conditionally add --keep argument based on ptcgSettings.value.forceRefetchDeck
 		if (!(ptcgSettings.value && ptcgSettings.value.forceRefetchDeck)) {
 			args.push('--keep');
 		}
-		const child = spawn(pythonCommand, args, { cwd: pythonDir });
+		// Offline mode: serve everything from the local database and caches, never the network.
+		if (ptcgSettings.value && ptcgSettings.value.offlineMode) {
+			args.push('--offline');
+		}
 
-		let stdoutData = '';
-		let stderrData = '';
-		const progressRegex = /--- Processing card (\d+)\/(\d+):/;
+		let deckHandled = false;
+		const timings = createImportTimings(code);
 
-		child.stdout.on('data', (data) => {
-			stdoutData += data.toString();
-		});
+		// The script prints the deck as one JSON line as soon as the card metadata is saved,
+		// then keeps running until its background image downloads finish.
+		const handleDeckOutput = (deckCards) => {
+			deckHandled = true;
+			const deckReplicant = side === 'L' ? deckL : deckR;
+			// The saved cards already arrived as cardChanges lines; only load the ones the script skipped.
+			nodecg.log.info(`Deck for Player ${side} processed.`);
+			ensureCardsLoaded(deckCards.cards, true);
+			deckReplicant.value = { name: code, cards: deckCards.cards };
+
+			// Clear prize cards for this side when loading a new deck
+			const prizeRep = nodecg.Replicant(`prizeCards${side}`);
+			prizeRep.value = Array.from({ length: 6 }, () => ({ cardId: null, isTaken: false }));
+			nodecg.log.info(`Prize cards cleared for Player ${side} due to new deck load.`);
+
+			nodecg.log.info(`Database reloaded and deck for Player ${side} updated.`);
+			deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
+			if (callback) callback(null, `Deck for Player ${side} updated.`);
+		};
 
-		child.stderr.on('data', (data) => {
-			const dataStr = data.toString();
-			stderrData += dataStr;
-			const match = dataStr.match(progressRegex);
-			if (match) {
-				const current = parseInt(match[1], 10);
-				const total = parseInt(match[2], 10);
-				// Calculate scaled percentage
-				const rawPercentage = (current / total) * 100;
-				const scaledPercentage = Math.round((rawPercentage * progressOptions.scale) + progressOptions.offset);
-				const text = `${scaledPercentage}%`;
-				deckLoadingStatus.value = { loading: true, side: side, percentage: scaledPercentage, text: text };
+		const handleMessage = (message) => {
+			if (message.cardChanges) {
+				applyCardChanges(message.cardChanges);
+			} else if (Array.isArray(message.cards) && !deckHandled) {
+				handleDeckOutput(message);
+			} else if (message.images) {
+				const failed = message.images.failed || [];
+				nodecg.log.info(`[Import Flow] Card images for "${code}" finished: ${message.images.downloaded} downloaded, ${failed.length} failed.`);
+				if (failed.length > 0) nodecg.log.warn(`[Import Flow] Failed card images: ${failed.join(', ')}`);
+				refreshCardImageVariants();
+			} else if (message.offline) {
+				logOfflineMisses(code, message.offline);
+			} else if (message.progress) {
+				const rawPercentage = timings.record(message.progress);
+				if (rawPercentage !== null && !deckHandled) {
+					// Calculate scaled percentage
+					const scaledPercentage = Math.round((rawPercentage * progressOptions.scale) + progressOptions.offset);
+					const text = `${scaledPercentage}%`;
+					deckLoadingStatus.value = { loading: true, side: side, percentage: scaledPercentage, text: text };
+				}
 			}
-		});
+		};
 
-		child.on('close', (exitCode) => {
+		const handleClose = (exitCode) => {
+			timings.log();
+			if (deckHandled) {
+				if (exitCode !== 0) nodecg.log.warn(`[Import Flow] Deck "${code}" was imported, but the script exited with code ${exitCode} while finishing images.`);
+				return;
+			}
 			if (exitCode !== 0) {
 				nodecg.log.warn(`[Import Flow] Failed to import "${code}" as a deck (Exit Code: ${exitCode}).`);
 				if (callback) callback(new Error(`Exit Code: ${exitCode}`));
 				return;
 			}
+			nodecg.log.warn(`[Import Flow] Failed to parse deck output for "${code}".`);
+			if (callback) callback(new Error('No deck output received.'));
+		};
 
-			try {
-				const deckCards = JSON.parse(stdoutData);
-				const deckReplicant = side === 'L' ? deckL : deckR;
-				nodecg.log.info(`Deck for Player ${side} processed. Reloading database.`);
-				loadCardDatabase();
-				deckReplicant.value = { name: code, cards: deckCards.cards };
-
-				// Clear prize cards for this side when loading a new deck
-				const prizeRep = nodecg.Replicant(`prizeCards${side}`);
-				prizeRep.value = Array.from({ length: 6 }, () => ({ cardId: null, isTaken: false }));
-				nodecg.log.info(`Prize cards cleared for Player ${side} due to new deck load.`);
-
-				nodecg.log.info(`Database reloaded and deck for Player ${side} updated.`);
-				deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
-				if (callback) callback(null, `Deck for Player ${side} updated.`);
-			} catch (parseError) {
-				nodecg.log.warn(`[Import Flow] Failed to parse deck output for "${code}".`);
-				if (callback) callback(parseError);
-			}
+		runImport('deck', lang, args, {
+			onMessage: handleMessage,
+			onStderr: () => {}, // Progress arrives as {"progress": ...} lines on stdout
+			onClose: handleClose,
+			onError: (err) => {
+				nodecg.log.error(`[Import Flow] Failed to start subprocess for deck import: ${err.message}.`);
+				if (callback) callback(err);
+			},
 		});
+	};
 
-		child.on('error', (err) => {
-			nodecg.log.error(`[Import Flow] Failed to start subprocess for deck import: ${err.message}.`);
-			if (callback) callback(err);
+	// Helper function to import several card IDs in one run of get_single_card_<lang>.py:
+	// one database load and save, one callback, then the cards are added to the deck in order.
+	const processCardBatchImport = (side, cardIds, callback) => {
+		const ids = Array.from(new Set(cardIds.map(id => id.replace('/', '-'))));
+		nodecg.log.info(`[Import Flow] Importing ${ids.length} cards as a BATCH for Player ${side}.`);
+
+		const deckReplicant = side === 'L' ? deckL : deckR;
+		const hasCard = (id) => cardDatabase.value && cardDatabase.value[id] && cardDatabase.value[id].name;
+
+		const finish = (summary) => {
+			ensureCardsLoaded(ids, true);
+			refreshCardImageVariants();
+			const added = ids.filter(hasCard);
+			const failed = ids.filter(id => !hasCard(id));
+			if (!Array.isArray(deckReplicant.value.cards)) deckReplicant.value.cards = [];
+			const newCards = added.filter(id => !deckReplicant.value.cards.includes(id));
+			if (newCards.length > 0) deckReplicant.value.cards = [...deckReplicant.value.cards, ...newCards];
+			deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
+
+			if (summary) {
+				nodecg.log.info(`[Import Flow] Batch import: ${summary.updated.length} updated, ${summary.skipped.length} skipped, ${summary.failed.length} failed.`);
+			}
+			nodecg.log.info(`[Import Flow] ${newCards.length} cards added to Player ${side}'s deck (${added.length - newCards.length} were already in it).`);
+			if (failed.length > 0) nodecg.log.warn(`[Import Flow] Cards that could not be imported: ${failed.join(', ')}`);
+			if (!callback) return;
+			if (added.length === 0) {
+				callback(new Error(`Failed to fetch cards: ${failed.join(', ')}`));
+			} else if (failed.length > 0) {
+				callback(null, `${added.length} cards added to deck; failed: ${failed.join(', ')}.`);
+			} else {
+				callback(null, `${added.length} cards added to deck.`);
+			}
+		};
+
+		ensureCardsLoaded(ids);
+		const missing = ids.filter(id => !hasCard(id));
+		if (missing.length === 0) {
+			finish(null);
+			return;
+		}
+		nodecg.log.info(`[Import Flow] ${missing.length} of ${ids.length} cards not in database. Fetching with Python...`);
+		deckLoadingStatus.value = { loading: true, side: side, percentage: 0, text: 'Fetching...' };
+
+		const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
+		const dbFileName = `database_${lang}.json`;
+		const absoluteDbPath = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', dbFileName);
+
+		const args = [...missing, '--database-path', absoluteDbPath];
+		if (ptcgSettings.value && ptcgSettings.value.offlineMode) {
+			args.push('--offline');
+		}
+
+		let summary = null;
+		let stderrData = '';
+		const timings = createImportTimings(`${missing.length} cards`);
+		runImport('card', lang, args, {
+			onMessage: (message) => {
+				if (message.cardChanges) {
+					applyCardChanges(message.cardChanges);
+				} else if (message.summary) {
+					summary = message.summary;
+				} else if (message.images) {
+					const failedImages = message.images.failed || [];
+					if (failedImages.length > 0) nodecg.log.warn(`[Import Flow] Failed card images: ${failedImages.join(', ')}`);
+				} else if (message.offline) {
+					logOfflineMisses(`${missing.length} cards`, message.offline);
+				} else if (message.progress) {
+					const rawPercentage = timings.record(message.progress);
+					if (rawPercentage !== null) {
+						const percentage = Math.round(rawPercentage);
+						deckLoadingStatus.value = { loading: true, side: side, percentage: percentage, text: `${percentage}%` };
+					}
+				}
+			},
+			onStderr: (text) => {
+				stderrData += text;
+			},
+			onClose: (exitCode) => {
+				timings.log();
+				if (exitCode !== 0) {
+					nodecg.log.warn(`[Import Flow] Batch card import exited with code ${exitCode}.`);
+					if (!summary) nodecg.log.error(`Stderr: ${stderrData}`);
+				}
+				finish(summary);
+			},
+			onError: (err) => {
+				nodecg.log.error(`[Import Flow] Failed to start subprocess for batch card import: ${err.message}`);
+				deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
+				if (callback) callback(err);
+			},
 		});
 	};
 
 	// Listen for messages to process deck codes or single card IDs
 	nodecg.listenFor('importDeckOrCard', ({ side, code }, callback) => {
+		// Several card IDs (separated by spaces, commas or newlines) are imported as one batch
+		const cardIds = String(code || '').split(/[\s,]+/).filter(Boolean);
+		if (cardIds.length > 1) {
+			processCardBatchImport(side, cardIds, callback);
+			return;
+		}
+
 		// Try to import as deck first
 		processDeckImport(side, code, (err, result) => {
 			if (!err) {
@@ -450,6 +1029,7 @@ module.exports = function (nodecg) {
 			nodecg.log.info(`[Import Flow] Attempting to import "${code}" (sanitized to ${sanitizedCardId}) as a SINGLE CARD for Player ${side}.`);
 
 			const deckReplicant = side === 'L' ? deckL : deckR;
+			ensureCardsLoaded([sanitizedCardId]);
 			const db = cardDatabase.value;
 
 			const addCardToDeck = (idToAdd) => {
@@ -469,31 +1049,21 @@ module.exports = function (nodecg) {
 				addCardToDeck(sanitizedCardId);
 			} else {
 				nodecg.log.info(`Card ${sanitizedCardId} not in database. Fetching with Python...`);
-				const pythonDir = path.join(__dirname, '..', 'python');
 				deckLoadingStatus.value = { loading: true, side: side, percentage: 0, text: 'Fetching...' };
 
 				const lang = (ptcgSettings.value && ptcgSettings.value.language) || 'jp';
-				const scriptMap = {
-					jp: 'get_single_card_jp.py',
-					chs: 'get_single_card_chs.py',
-					cht: 'get_single_card_cht.py',
-					en: 'get_single_card_en.py',
-				};
-				const pythonScriptFile = scriptMap[lang] || scriptMap.jp;
-				const pythonScriptPath = path.join(pythonDir, pythonScriptFile);
 				const dbFileName = `database_${lang}.json`;
 				const absoluteDbPath = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', dbFileName);
-				const pythonCommand = os.platform() === 'win32' ? 'python' : 'python3';
 
-				const args = [pythonScriptPath, sanitizedCardId, '--database-path', absoluteDbPath];
-				const child = spawn(pythonCommand, args, { cwd: pythonDir });
+				const args = [sanitizedCardId, '--database-path', absoluteDbPath];
+				if (ptcgSettings.value && ptcgSettings.value.offlineMode) {
+					args.push('--offline');
+				}
 
 				let stderrData = '';
-				child.stderr.on('data', (data) => {
-					stderrData += data.toString();
-				});
-
-				child.on('close', (exitCode) => {
+				const timings = createImportTimings(sanitizedCardId);
+				const handleClose = (exitCode) => {
+					timings.log();
 					if (exitCode !== 0) {
 						nodecg.log.error(`[Import Flow] Failed to fetch card ${sanitizedCardId} (Exit Code: ${exitCode}).`);
 						nodecg.log.error(`Stderr: ${stderrData}`);
@@ -502,24 +1072,34 @@ module.exports = function (nodecg) {
 						return;
 					}
 
-					nodecg.log.info(`Python script for ${sanitizedCardId} finished. Reloading database.`);
-					loadCardDatabase();
+					// The card arrived as a cardChanges line before the script exited, unless it was already saved.
+					nodecg.log.info(`Python script for ${sanitizedCardId} finished.`);
+					ensureCardsLoaded([sanitizedCardId], true);
+					refreshCardImageVariants();
 
-					setTimeout(() => {
-						if (cardDatabase.value && cardDatabase.value[sanitizedCardId] && cardDatabase.value[sanitizedCardId].name) {
-							addCardToDeck(sanitizedCardId);
-						} else {
-							nodecg.log.error(`[Import Flow] FINAL FAILURE: Script ran for "${sanitizedCardId}" but it was not added to the database.`);
-							deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
-							if (callback) callback(new Error(`Failed to fetch card ${sanitizedCardId}.`));
-						}
-					}, 200);
-				});
+					if (cardDatabase.value && cardDatabase.value[sanitizedCardId] && cardDatabase.value[sanitizedCardId].name) {
+						addCardToDeck(sanitizedCardId);
+					} else {
+						nodecg.log.error(`[Import Flow] FINAL FAILURE: Script ran for "${sanitizedCardId}" but it was not added to the database.`);
+						deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
+						if (callback) callback(new Error(`Failed to fetch card ${sanitizedCardId}.`));
+					}
+				};
 
-				child.on('error', (err) => {
-					nodecg.log.error(`[Import Flow] Failed to start subprocess for single card import: ${err.message}`);
-					deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
-					if (callback) callback(err);
+				runImport('card', lang, args, {
+					onMessage: (message) => {
+						if (message.cardChanges) applyCardChanges(message.cardChanges);
+						else if (message.progress) timings.record(message.progress);
+					},
+					onStderr: (text) => {
+						stderrData += text;
+					},
+					onClose: handleClose,
+					onError: (err) => {
+						nodecg.log.error(`[Import Flow] Failed to start subprocess for single card import: ${err.message}`);
+						deckLoadingStatus.value = { loading: false, side: null, percentage: 0, text: '' };
+						if (callback) callback(err);
+					},
 				});
 			}
 		};
@@ -1784,6 +2364,15 @@ module.exports = function (nodecg) {
 			} else {
 				nodecg.log.warn(`Card image directory for language '${lang}' not found. Skipping deletion.`);
 			}
+			for (const size of CARD_IMG_VARIANT_SIZES) {
+				const variantDir = path.join(projectRoot, 'nodecg', 'assets', 'ptcg-telop', `${cardImgDirName}_${size}`);
+				if (fs.existsSync(variantDir)) {
+					for (const file of fs.readdirSync(variantDir)) {
+						fs.unlinkSync(path.join(variantDir, file));
+					}
+				}
+			}
+			refreshCardImageVariants();
 
 			// 2. Clear database file
 			const dbFileName = `database_${lang}.json`;
@@ -1794,6 +2383,16 @@ module.exports = function (nodecg) {
 			} else {
 				nodecg.log.warn(`Database file for language '${lang}' not found. Skipping clear.`);
 			}
+			// The Python scripts keep the cards in an SQLite store or a journal next to the JSON file;
+			// remove them too, otherwise the next import would bring the old cards back.
+			const storePath = dbPath.replace(/\.json$/, '.sqlite3');
+			const journalPath = dbPath.replace(/\.json$/, '.journal');
+			for (const file of [storePath, `${storePath}-wal`, `${storePath}-shm`, journalPath, `${journalPath}.compacting`]) {
+				if (fs.existsSync(file)) fs.unlinkSync(file);
+			}
+			const manifestPath = dbPath.replace(/\.json$/, '.manifest.json');
+			if (fs.existsSync(manifestPath)) fs.unlinkSync(manifestPath);
+			fs.rmSync(dbPath.replace(/\.json$/, '.shards'), { recursive: true, force: true });
 
 			// 3. Reload in-memory database
 			loadCardDatabase();
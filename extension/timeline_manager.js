@@ -49,6 +49,7 @@ module.exports = function (nodecg, gameLogic) { // Modified to accept gameLogic
 	const playerR_name = nodecg.Replicant('playerR_name');
 	const turnCount = nodecg.Replicant('turnCount');
 	const cardDatabase = nodecg.Replicant('cardDatabase');
+	const cardImageVariants = nodecg.Replicant('cardImageVariants', { defaultValue: {} });
 	const operationQueue = nodecg.Replicant('operationQueue');
 	const bundleVersion = nodecg.Replicant('bundleVersion');
 
@@ -183,8 +184,9 @@ module.exports = function (nodecg, gameLogic) { // Modified to accept gameLogic
 		return (mm * 60 + ss) * 1000;
 	}
 
-	// Helper to construct card image URL (server-side version of getCardImageUrl)
-	function getCardImageUrl(cardId) {
+	// Helper to construct card image URL (server-side version of getCardImageUrl).
+	// size picks a generated variant ('thumb', 'medium') when one exists, otherwise the original.
+	function getCardImageUrl(cardId, size) {
 		if (!cardId) return '';
 		const settings = ptcgSettings.value || {};
 		const lang = settings.language || 'jp';
@@ -203,6 +205,10 @@ module.exports = function (nodecg, gameLogic) { // Modified to accept gameLogic
 		const imageUrl = cardData ? cardData.image_url : null;
 		const extension = imageUrl ? imageUrl.substring(imageUrl.lastIndexOf('.')) : '.jpg'; // Fallback to .jpg
 
+		const variants = cardImageVariants.value && cardImageVariants.value[cardId];
+		if (size && variants && variants.includes(size)) {
+			return `/assets/ptcg-telop/card_img_${lang}_${size}/${cardId}.webp`;
+		}
 		return `${basePath}${cardId}${extension}`;
 	}
 
@@ -543,8 +549,9 @@ module.exports = function (nodecg, gameLogic) { // Modified to accept gameLogic
 	// Helper to apply a single display operation
 	function applyDisplayOp(op) {
 		const { type, payload } = op;
-		if (type === 'SHOW_CARD_L') nodecg.Replicant('cardToShowL').value = getCardImageUrl(payload.cardId);
-		else if (type === 'SHOW_CARD_R') nodecg.Replicant('cardToShowR').value = getCardImageUrl(payload.cardId);
+		// Shown cards use the same 'medium' variant the dashboard sends (deck_viewer.html)
+		if (type === 'SHOW_CARD_L') nodecg.Replicant('cardToShowL').value = getCardImageUrl(payload.cardId, 'medium');
+		else if (type === 'SHOW_CARD_R') nodecg.Replicant('cardToShowR').value = getCardImageUrl(payload.cardId, 'medium');
 		else if (type === 'SHOW_PRIZE_L') {
 			const cards = prizeCardsL.value;
 			nodecg.sendMessage('showPrizeCards', { side: 'L', cards });
@@ -5,6 +5,9 @@
  * Usage:
  *   <script src="slot-renderer.js"></script>
  *   SlotRenderer.init({ cardDatabase, settingsRep, getCardImageUrl, resolveAssetPath });
+ *
+ * getCardImageUrl(cardId, isBgImage, size): the active Pokémon uses the page's default size,
+ * bench slots, tools and special energy icons ask for the small 'thumb' variant.
  */
 (function () {
     'use strict';
@@ -148,7 +151,7 @@
         const getSpecialIconHtml = (cardId) => {
             const cardData = _cardDatabase.value[cardId];
             const title = cardData ? cardData.name : 'Special Energy';
-            const bgImage = _getCardImageUrl(cardId, true);
+            const bgImage = _getCardImageUrl(cardId, true, 'thumb');
             return `<div class="attached-special-energy-icon" style="background-image: ${bgImage}" title="${title}"></div>`;
         };
 
@@ -234,7 +237,7 @@
                 let html = '';
                 newToolIds.forEach(id => {
                     if (db[id]) {
-                        html += `<div class="${itemClass}" data-tool-id="${id}"><img src="${_getCardImageUrl(id)}"></div>`;
+                        html += `<div class="${itemClass}" data-tool-id="${id}"><img src="${_getCardImageUrl(id, false, 'thumb')}"></div>`;
                     }
                 });
                 wrapperEl.innerHTML = html;
@@ -303,7 +306,7 @@
                                 toolItem.className = itemClass;
                                 toolItem.dataset.toolId = toolId;
                                 const toolImg = document.createElement('img');
-                                toolImg.src = _getCardImageUrl(toolId);
+                                toolImg.src = _getCardImageUrl(toolId, false, 'thumb');
                                 toolItem.appendChild(toolImg);
                                 wrapperEl.appendChild(toolItem);
                             }
@@ -336,7 +339,7 @@
                         toolItem.className = `${itemClass} anim-tool-appear`;
                         toolItem.dataset.toolId = id;
                         const toolImg = document.createElement('img');
-                        toolImg.src = _getCardImageUrl(id);
+                        toolImg.src = _getCardImageUrl(id, false, 'thumb');
                         toolItem.appendChild(toolImg);
                         wrapperEl.appendChild(toolItem);
                         toolItem.addEventListener('animationstart', () => playToolAnimation(toolItem, isBattleSlot, true), { once: true });
@@ -686,7 +689,7 @@
                         promises.push(handleSlotSlideAnimation(slotEl, isNewCard, forceSlideIn, skipSlideIn));
                         mainImg.onload = null;
                     };
-                    mainImg.src = _getCardImageUrl(slotData.cardId);
+                    mainImg.src = _getCardImageUrl(slotData.cardId, false, 'thumb');
                     mainImg.classList.toggle('is-v', cardData.pokemon && cardData.subtype === 'V');
                 } else {
                     promises.push(handleSlotSlideAnimation(slotEl, isNewCard, forceSlideIn, skipSlideIn));
@@ -0,0 +1,96 @@
+import sys, os, json, gc, time, argparse, subprocess, tempfile, shutil
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import card_store, card_model
+from bench_db_format import synthesize
+
+
+def peak_rss_mb():
+    # On Linux ru_maxrss survives exec, so it would report the parent's peak; VmHWM does not.
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_case(case, model, json_path, cards):
+    """Runs in its own process, so the peak RSS belongs to this case alone."""
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if case == "load":
+        if model == "dict":
+            # What load_database did before the compact model: one dict tree per card.
+            conn = card_store.connect(json_path)
+            database = {card_id: json.loads(data) for card_id, data in conn.execute("SELECT id, data FROM cards")}
+            conn.close()
+        else:
+            database = card_store.load(json_path, lazy=False)
+    else:
+        # A bulk build: every parsed card is kept until the final save, as warm-up crawls do.
+        database = {} if model == "dict" else card_store.CardDatabase()
+        for card_id, card in synthesize(cards).items():
+            database[card_id] = json.loads(json.dumps(card))  # A fresh dict per card, like a parser builds
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    return {"case": case, "model": model, "cards": len(database), "seconds": round(elapsed, 3),
+            "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the peak RSS of loading and building a card database with plain dicts vs card_model records.")
+    parser.add_argument("--cards", type=int, default=40000, help="Number of synthesized cards.")
+    parser.add_argument("--case", action="append", choices=["load", "build"], help="Case to run (repeatable, defaults to both).")
+    parser.add_argument("--run", nargs=3, metavar=("CASE", "MODEL", "JSON_PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        case, model, json_path = args.run
+        print(json.dumps(run_case(case, model, json_path, args.cards)))
+        return
+    if resource is None:
+        print("Peak RSS is only available on POSIX systems.", file=sys.stderr)
+
+    work_dir = tempfile.mkdtemp(prefix="ptcg_cardmodel_")
+    try:
+        json_path = os.path.join(work_dir, "database_jp.json")
+        card_store.BACKEND = 'sqlite'
+        card_store.save(synthesize(args.cards), json_path)
+        results = {}
+        for case in args.case or ["load", "build"]:
+            for model in ("dict", "card_model"):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), "--cards", str(args.cards), "--run", case, model, json_path],
+                                        capture_output=True, text=True, check=True, env=dict(os.environ, PTCG_CARD_STORE='sqlite')).stdout
+                result = json.loads(output)
+                results[(case, model)] = result
+                print(json.dumps(result))
+            before, after = results[(case, "dict")], results[(case, "card_model")]
+            if before["peak_rss_mb"] and after["peak_rss_mb"]:
+                drop = before["peak_rss_mb"] - after["peak_rss_mb"]
+                print(f"{case}: peak RSS {before['peak_rss_mb']} MB -> {after['peak_rss_mb']} MB "
+                      f"({drop / before['peak_rss_mb']:.0%} less), {before['seconds']}s -> {after['seconds']}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
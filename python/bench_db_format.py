@@ -0,0 +1,140 @@
+import sys, os, json, time, shutil, random, argparse, subprocess, tempfile, statistics
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_store
+
+# Reads a database file the way loadCardDatabase() does and reports the parse time and the
+# size of the replicant payload (NodeCG serializes replicant values with JSON.stringify).
+NODE_READER = r"""
+const fs = require('fs');
+const zlib = require('zlib');
+const [file, repeat] = [process.argv[1], Number(process.argv[2])];
+const times = [];
+let data;
+for (let i = 0; i < repeat; i++) {
+	const start = process.hrtime.bigint();
+	let raw = fs.readFileSync(file);
+	if (raw.length >= 2 && raw[0] === 0x1f && raw[1] === 0x8b) raw = zlib.gunzipSync(raw);
+	data = JSON.parse(raw.toString('utf8'));
+	times.push(Number(process.hrtime.bigint() - start) / 1e6);
+}
+times.sort((a, b) => a - b);
+console.log(JSON.stringify({ parse_ms: times[Math.floor(times.length / 2)], payload_bytes: Buffer.byteLength(JSON.stringify(data)) }));
+"""
+
+
+def synthesize(count, seed=1):
+    """A database shaped like card_utils_jp output: mostly Pokémon, the rest Trainers and Energy."""
+    rng = random.Random(seed)
+    cards = {}
+    for i in range(count):
+        card_id = str(40000 + i)
+        card = {
+            "name": f"ポケモン{i}", "set_code": f"SV{rng.randint(1, 11)}", "set_name": "拡張パック",
+            "card_number": f"{rng.randint(1, 120):03d}/100", "image_url": f"https://www.pokemon-card.com/assets/images/card_images/large/SV/0{card_id}_P.jpg",
+            "supertype": None, "subtype": None, "pokemon": None, "trainer": None, "energy": None,
+            "addRule": None, "rarity": None, "author": f"Artist {rng.randint(1, 300)}",
+        }
+        kind = rng.random()
+        if kind < 0.6:
+            card["supertype"] = "pokemon"
+            card["subtype"] = rng.choice([None, "ex", "V"])
+            card["pokemon"] = {
+                "hp": str(rng.randrange(60, 340, 10)), "color": [rng.choice(["grass", "fire", "water", "lightning"])],
+                "evolves": rng.choice(["たね", "1進化", "2進化"]), "evolvesFrom": [f"ポケモン{i - 1}"] if i % 3 else None,
+                "evolvesTo": None, "abilities": None,
+                "attacks": [{"name": f"ワザ{n}", "cost": ["colorless"] * rng.randint(1, 3), "damage": str(rng.randrange(10, 300, 10)), "text": "このワザのダメージは弱点・抵抗力を計算しない。" if n else None} for n in range(rng.randint(1, 2))],
+                "weaknesses": [{"type": "fire", "calc": "multiply", "value": "2"}], "resistances": None, "retreats": ["colorless"] * rng.randint(0, 3),
+                "prize": 2 if card["subtype"] else None,
+            }
+        elif kind < 0.9:
+            card["supertype"] = "trainer"
+            card["subtype"] = rng.choice(["グッズ", "サポート", "スタジアム", "ポケモンのどうぐ"])
+            card["trainer"] = {"text": "自分の山札を上から7枚見て、その中から好きなカードを1枚選び、手札に加える。残りのカードは山札にもどして切る。"}
+        else:
+            card["supertype"] = "energy"
+            card["subtype"] = "basic energy"
+            card["energy"] = rng.choice(["草", "炎", "水", "雷"])
+        cards[card_id] = card
+    return cards
+
+
+def time_python(path, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        card_store.read_file(path)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def time_node(path, repeat):
+    node = shutil.which("node")
+    if not node:
+        return None
+    result = subprocess.run([node, "-e", NODE_READER, path, str(repeat)], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def bench(cards, repeat):
+    work_dir = tempfile.mkdtemp(prefix="ptcg_dbformat_")
+    results = []
+    try:
+        for file_format in card_store.FILE_FORMATS:
+            path = os.path.join(work_dir, f"database_{file_format}.json")
+            start = time.perf_counter()
+            raw = card_store.encode_cards(cards, file_format)
+            encode_ms = (time.perf_counter() - start) * 1000
+            with open(path, 'wb') as f:
+                f.write(raw)
+            expected = cards if file_format == 'json' else card_store.strip_nulls(cards)
+            if card_store.read_file(path) != expected:
+                raise AssertionError(f"{file_format} does not round-trip")
+            result = {
+                "format": file_format,
+                "cards": len(cards),
+                "file_bytes": len(raw),
+                "encode_ms": round(encode_ms, 2),
+                "python_parse_ms": round(time_python(path, repeat), 2),
+            }
+            node = time_node(path, repeat)
+            if node:
+                result["node_parse_ms"] = round(node["parse_ms"], 2)
+                result["replicant_payload_bytes"] = node["payload_bytes"]
+            results.append(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare file size, parse time and replicant payload of the card database formats.")
+    parser.add_argument("--database-path", type=str, default=None, help="Benchmark an existing database file instead of a synthesized one.")
+    parser.add_argument("--cards", type=int, default=20000, help="Number of cards to synthesize.")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per format; the median is reported.")
+    args = parser.parse_args()
+
+    cards = card_store.read_file(args.database_path) if args.database_path else synthesize(args.cards)
+    results = bench(cards, args.repeat)
+    baseline = results[0]
+    print(f"{'format':<8} {'file':>12} {'py parse':>10} {'node parse':>11} {'payload':>12}", file=sys.stderr)
+    for result in results:
+        print(
+            f"{result['format']:<8} {result['file_bytes']:>12,} {result['python_parse_ms']:>8.1f}ms "
+            f"{result.get('node_parse_ms', float('nan')):>9.1f}ms {result.get('replicant_payload_bytes', 0):>12,}"
+            f"  ({result['file_bytes'] / baseline['file_bytes']:.0%} of json)",
+            file=sys.stderr,
+        )
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
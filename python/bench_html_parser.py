@@ -0,0 +1,236 @@
+import sys, os, json, time, types, random, argparse, subprocess
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_model
+import card_utils_jp, card_utils_cht
+
+# Parses synthesized JP / CHT detail pages with get_card_details, and optionally with
+# get_card_details from an earlier git revision; both must produce byte-identical card_details. The pages follow the markup get_card_details reads, wrapped in
+# site chrome (head, scripts, navigation, footer) like the real pages.
+
+LANGUAGES = ("jp", "cht")
+MODULES = {"jp": card_utils_jp, "cht": card_utils_cht}
+
+
+# --- Page synthesis ---
+
+def _chrome(rng, title):
+    nav = "".join(
+        f'<li class="Nav-item"><a class="Nav-link" href="/info/{rng.randrange(10**6)}.html">お知らせ {i}</a>'
+        for i in range(120)  # The real navigation leaves its <li> unclosed in places
+    )
+    head = (
+        f'<!DOCTYPE html><html lang="ja"><head><meta charset="UTF-8"><title>{title}</title>'
+        + "".join(f'<link rel="stylesheet" href="/assets/css/{i}.css">' for i in range(12))
+        + '<script>window.dataLayer = window.dataLayer || [];' + ' var x = "<div>";' * 200 + '</script></head>'
+    )
+    header = f'<body><div class="Wrapper"><header class="Header"><ul class="Nav">{nav}</ul></header><div class="WrapperArea">'
+    footer = (
+        '</div><footer class="Footer"><ul>'
+        + "".join(f'<li><a href="/corp/{i}.html">リンク {i}</a></li>' for i in range(80))
+        + '</ul><p>&copy;Pokémon</p></footer></div>'
+        + '<script src="/assets/js/common.js"></script><!-- analytics --></body></html>'
+    )
+    return head + header, footer
+
+
+JP_TYPES = ["grass", "fire", "water", "lightning", "psychic", "fighting", "dark", "metal", "dragon", "colorless"]
+JP_RARITIES = ["c", "u", "r", "rr", "sr", "ar", "sar", "ur"]
+
+
+def _jp_attack(rng, index):
+    costs = "".join(f'<span class="icon-{rng.choice(JP_TYPES)} icon"></span>' for _ in range(rng.randint(1, 3)))
+    damage = f'<span class="f_right Text-fjalla">{rng.randint(1, 25) * 10}{rng.choice(["", "＋", "×"])}</span>' if rng.random() < 0.8 else ''
+    text = (f'相手のバトルポケモンに<span class="icon-fire icon"></span>エネルギーを1個つける。'
+            f'このワザは{rng.randint(1, 9) * 10}ダメージ追加。' if rng.random() < 0.7 else '')
+    return f'<h4>{costs}ワザ{index}{damage}</h4>\n<p>{text}</p>\n'
+
+
+def synthesize_jp_page(rng, card_id, kind):
+    name = {"pokemon": "リザードン", "ex": "リザードンex", "ex_terastal": "テラパゴスex", "mega": "メガリザードンXex", "item": "ふしぎなアメ",
+            "supporter": "博士の研究", "stadium": "頂への雪道", "tool": "勇気のおまもり", "ace": "マスターボール",
+            "special": "ダブルターボエネルギー", "basic": "基本炎エネルギー", "fossil": "かいのカセキ", "tm": "ワザマシン エヴォリューション"}[kind]
+    head, footer = _chrome(rng, name)
+    rarity = f'<img width="24" src="/assets/images/card/rarity/ic_rare_{rng.choice(JP_RARITIES)}.gif">' if kind not in ("basic",) else ''
+    left = (
+        f'<section class="Section"><h1 class="Heading1 mt20">{name}</h1>\n<div class="LeftBox">'
+        f'<div class="LeftBox-inner"><img class="fit" src="/assets/images/card_images/large/SV{rng.randint(1, 9)}/0{card_id}_P_X.jpg" alt="{name}"></div>'
+        f'<div class="subtext Text-fjalla"><img class="img-regulation" src="/assets/images/card/regulation_logo_1/H.gif" alt="H" height="20">&nbsp;'
+        f'{rng.randint(1, 190):03d}&nbsp;/&nbsp;190&nbsp;{rarity}</div>'
+        f'<div class="author">イラストレーター<br><a href="/card-search/index.php?author=x">5ban Graphics</a></div>'
+        f'<a class="Link Link-arrow" href="/card-search/index.php?pg=M1">拡張パック「スタートデッキ{rng.randint(1, 30)}」</a></div>\n'
+    )
+    body = ''
+    if kind in ("pokemon", "ex", "ex_terastal", "mega"):
+        stage = rng.choice(["たね", "1&nbsp;進化", "2&nbsp;進化"])
+        body += (f'<div class="TopInfo Text-fjalla"><div class="tr"><div class="td-l"><span class="type">{stage}</span></div>'
+                 f'<div class="td-r"><span class="hp">HP</span><span class="hp-num">{rng.randint(3, 34) * 10}</span>'
+                 f'<span class="hp-type">タイプ</span><span class="icon-{rng.choice(JP_TYPES)} icon"></span></div></div></div>\n')
+        if rng.random() < 0.5:
+            body += '<h2 class="mt20">特性</h2>\n<h4>しんかのひ</h4>\n<p>自分の番に1回使える。<span class="icon-fire icon"></span>エネルギーをつける。</p>\n'
+        body += '<h2 class="mt20">ワザ</h2>\n' + "".join(_jp_attack(rng, i) for i in range(rng.randint(1, 2)))
+        if kind == "ex_terastal" or (kind == "ex" and rng.random() < 0.5):
+            body += '<p class="mt20">このポケモンは、ベンチにいるかぎり、ワザのダメージを受けない。</p>\n'
+        if kind in ("ex", "ex_terastal"):
+            body += '<h2 class="mt20">特別なルール</h2>\n<p>ポケモンexがきぜつしたとき、相手はサイドを2枚とる。</p>\n'
+        if kind == "mega":
+            body += '<h2 class="mt20">特別なルール</h2>\n<p></p>\n<p>メガシンカexがきぜつしたとき、相手はサイドを3枚とる。</p>\n'
+        resist = '<span class="icon-fighting icon"></span>－30' if rng.random() < 0.3 else '--'
+        retreat = '<span class="icon-none icon"></span>' * rng.randint(0, 3)
+        body += ('<table><tr><th>弱点</th><th>抵抗力</th><th>にげる</th></tr>'
+                 f'<tr><td class="weakpoint"><span class="icon-water icon"></span>×2</td>'
+                 f'<td class="resist">{resist}</td><td class="escape">{retreat}</td></tr></table>\n')
+        body += ('<h2 class="mt20">進化</h2>\n<div class="evolution evbox"><a href="/x">リザードン</a></div>\n'
+                 '<div class="evolution evbox ev_on"><div class="arrow_on"></div><a href="/x">リザード</a></div>\n'
+                 '<div class="evolution evbox"><div class="arrow_on"></div><a href="/x">ヒトカゲ</a></div>\n')
+    elif kind in ("item", "supporter", "stadium", "tool", "ace", "fossil", "tm"):
+        heading = {"item": "グッズ", "ace": "グッズ", "fossil": "グッズ", "supporter": "サポート", "stadium": "スタジアム",
+                   "tool": "ポケモンのどうぐ", "tm": "ポケモンのどうぐ"}[kind]
+        if kind == "fossil":
+            body += '<div class="TopInfo Text-fjalla"><div class="tr"><div class="td-r"><span class="hp">HP</span><span class="hp-num">60</span></div></div></div>\n'
+        body += f'<h2 class="mt20">{heading}</h2>\n<p>自分の山札からカードを{rng.randint(1, 7)}枚引く。</p>\n'
+        if kind == "tm":
+            body += '<h2 class="mt20">ワザ</h2>\n' + _jp_attack(rng, 0)
+        if kind == "ace":
+            body += '<h2 class="mt20">特別なルール</h2>\n<p>ACE SPEC：デッキに入れられるACE SPECのカードは1枚だけ。</p>\n'
+        body += '<p class="mt20">グッズは、自分の番に何枚でも使える。</p>\n'
+    else:
+        body += f'<h2 class="mt20">{"特殊エネルギー" if kind == "special" else "基本エネルギー"}</h2>\n'
+        if kind == "special":
+            body += '<p>このカードは、<span class="icon-colorless icon"></span>エネルギー2個ぶんとしてはたらく。</p>\n'
+    right = f'<div class="RightBox"><div class="RightBox-inner">{body}</div></div></section>'
+    return head + left + right + footer
+
+
+CHT_ENERGIES = ["Grass", "Fire", "Water", "Lightning", "Psychic", "Fighting", "Darkness", "Metal", "Dragon", "Colorless"]
+
+
+def synthesize_cht_page(rng, card_id, kind):
+    name = {"pokemon": "噴火龍", "ex": "噴火龍ex", "ex_terastal": "太樂巴戈斯ex", "mega": "超級噴火龍Xex", "vstar": "阿爾宙斯VSTAR",
+            "item": "神奇糖果", "supporter": "博士的研究", "stadium": "頂尖雪道", "tool": "勇氣護符", "tm": "招式學習器 進化",
+            "special": "雙渦輪能量", "basic": "基本【火】能量"}[kind]
+    head, footer = _chrome(rng, name)
+    icon = lambda energy: f'<img src="https://asia.pokemon-card.com/tw/card-img/icon/{energy}.png" alt="">'
+    marker = ''
+    if kind in ("pokemon", "ex", "ex_terastal", "mega", "vstar"):
+        marker = f'<span class="evolveMarker">{rng.choice(["基礎", "1階進化", "2階進化"])}</span>'
+    page = (f'<div class="contentWrapper"><h1 class="pageHeader cardDetail">{marker}\n            {name}</h1>\n'
+            f'<div class="cardDetailPage"><div class="imageColumn"><div class="cardImage">'
+            f'<img src="https://asia.pokemon-card.com/tw/card-img/tw{card_id:08d}.png" alt="{name}"></div></div>\n<div class="textColumn">')
+    if marker:
+        page += (f'<p class="mainInfomation"><span class="hitPoint">HP</span><span class="number">{rng.randint(3, 34) * 10}</span>'
+                 f'<span class="type">屬性</span>{icon(rng.choice(CHT_ENERGIES))}</p>\n<div class="skillInformation"><h3 class="commonHeader">招式</h3>\n')
+        if rng.random() < 0.5:
+            prefix = "[VSTAR力量] [特性]" if kind == "vstar" else "[特性]"
+            page += f'<div class="skill"><h4><span class="skillName">{prefix} 烈焰之心</span></h4><p class="skillEffect">在自己的回合可以使用1次。 將{icon("Fire")}能量附於自己的寶可夢身上。</p></div>\n'
+        for i in range(rng.randint(1, 2)):
+            costs = "".join(icon(rng.choice(CHT_ENERGIES)) for _ in range(rng.randint(1, 3)))
+            page += (f'<div class="skill"><h4><span class="skillCost">{costs}</span><span class="skillName">招式{i}</span>'
+                     f'<span class="skillDamage">{rng.randint(1, 25) * 10}</span></h4>'
+                     f'<p class="skillEffect">給予對手的 戰鬥寶可夢\n  {rng.randint(1, 9) * 10}點傷害。</p></div>\n')
+        if kind == "ex_terastal" or (kind == "ex" and rng.random() < 0.5):
+            page += '<div class="skill"><h4><span class="skillName">[太晶]</span></h4><p class="skillEffect">只要這隻寶可夢在備戰區，不會受到招式的傷害。</p></div>\n'
+        if kind in ("ex", "ex_terastal", "mega"):
+            prize = 3 if kind == "mega" else 2
+            page += f'<div class="skill"><h4><span class="skillName">[寶可夢ex規則]</span></h4><p class="skillEffect">寶可夢ex昏厥時，對手獲得{prize}張獎賞卡。</p></div>\n'
+        page += ('</div>\n<div class="subInformation"><table><tr><th>弱點</th><th>抵抗力</th><th>撤退</th></tr>'
+                 f'<tr><td class="weakpoint">{icon("Water")}×2</td><td class="resist">--</td>'
+                 f'<td class="escape">{icon("Colorless") * rng.randint(0, 3)}</td></tr></table></div>\n'
+                 '<div class="evolution"><ul><li class="step"><a href="/x">小火龍</a><ul><li class="step"><a href="/x">火恐龍</a>'
+                 '<ul><li class="step active"><a href="/x">噴火龍</a></li></ul></li></ul></li></ul></div>\n')
+    else:
+        header = {"item": "物品卡", "supporter": "支援者卡", "stadium": "競技場卡", "tool": "寶可夢道具", "tm": "寶可夢道具",
+                  "special": "特殊能量卡", "basic": "基本能量卡"}[kind]
+        page += f'<div class="skillInformation"><h3 class="commonHeader">{header}</h3>\n'
+        if kind != "basic":
+            page += f'<p class="skillEffect">從自己的牌庫抽出{rng.randint(1, 7)}張卡。<br>  這張卡可以\n當作{icon("Colorless")}能量。</p>\n'
+        page += '</div>\n'
+    page += (f'<div class="expansionColumn"><span class="alpha">H</span><span class="collectorNumber">{rng.randint(1, 190):03d}/190</span></div>\n'
+             f'<div class="expansionLinkColumn"><a href="/x">擴充包「朱＆紫」{rng.randint(1, 30)}</a></div>\n'
+             '<div class="illustrator"><span>插畫家</span><a href="/x">5ban Graphics</a></div></div></div></div>')
+    return head + page + footer
+
+
+SYNTHESIZERS = {"jp": synthesize_jp_page, "cht": synthesize_cht_page}
+KINDS = {
+    "jp": ("pokemon", "pokemon", "ex", "ex_terastal", "mega", "item", "supporter", "stadium", "tool", "tm", "ace", "special", "basic", "fossil"),
+    "cht": ("pokemon", "pokemon", "ex", "ex_terastal", "mega", "vstar", "item", "supporter", "stadium", "tool", "tm", "special", "basic"),
+}
+
+
+def synthesize_pages(language, count, seed=0):
+    """[(card_id, html)] covering every kind of card the parser distinguishes."""
+    rng = random.Random(seed)
+    kinds = KINDS[language]
+    return [(str(40000 + i), SYNTHESIZERS[language](rng, 40000 + i, kinds[i % len(kinds)])) for i in range(count)]
+
+
+# --- Benchmark ---
+
+def load_revision(language, revision):
+    """card_utils_<lang>.py as it was at a git revision, as a module of its own."""
+    source = subprocess.run(["git", "show", f"{revision}:python/card_utils_{language}.py"], cwd=script_dir,
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType(f"card_utils_{language}_{revision}")
+    module.__file__ = os.path.join(script_dir, f"card_utils_{language}.py")
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def run(get_card_details, pages, repeat):
+    outputs = None
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [get_card_details(card_id, html_content=html) for card_id, html in pages]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        outputs = outputs or [json.dumps(card, ensure_ascii=False, default=card_model.json_default) for card in results]
+    return best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JP/CHT detail page parser and check that it produces the same cards as an earlier revision.")
+    parser.add_argument("--language", action="append", choices=LANGUAGES, help="Language to measure (repeatable, defaults to all).")
+    parser.add_argument("--pages", type=int, default=120, help="Number of synthesized pages per language.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant; the fastest is reported.")
+    parser.add_argument("--baseline-rev", type=str, default=None, help="Also run get_card_details from this git revision and compare against it.")
+    args = parser.parse_args()
+
+    ok = True
+    for language in args.language or LANGUAGES:
+        pages = synthesize_pages(language, args.pages)
+        page_kb = sum(len(html.encode("utf-8")) for _, html in pages) / len(pages) / 1024
+        variants = []
+        if args.baseline_rev:
+            variants.append((f"baseline {args.baseline_rev}", load_revision(language, args.baseline_rev).get_card_details))
+        variants.append(("current", MODULES[language].get_card_details))
+
+        reference = None
+        for label, get_card_details in variants:
+            seconds, outputs = run(get_card_details, pages, args.repeat)
+            if reference is None:
+                reference = (label, seconds, outputs)
+            mismatches = [card_id for (card_id, _), a, b in zip(pages, outputs, reference[2]) if a != b]
+            failed = sum(1 for output in outputs if output == "null")
+            ok = ok and not mismatches and not failed
+            result = {"language": language, "variant": label, "pages": len(pages), "page_kb": round(page_kb, 1),
+                      "ms_per_page": round(seconds * 1000 / len(pages), 2), "pages_per_s": round(len(pages) / seconds, 1),
+                      "speedup": round(reference[1] / seconds, 2), "identical": not mismatches, "failed": failed}
+            print(json.dumps(result, ensure_ascii=False))
+            print(f"{language} {label:<28} {result['ms_per_page']:7.2f} ms/page  {result['speedup']:5.2f}x"
+                  + ("" if not mismatches else f"  <-- {len(mismatches)} cards differ from {reference[0]} (first: {mismatches[0]})")
+                  + ("" if not failed else f"  <-- {failed} pages failed to parse"), file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
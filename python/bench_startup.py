@@ -0,0 +1,111 @@
+import sys, os, re, json, time, argparse, compileall, subprocess, tempfile, shutil, statistics
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_store
+from bench_db_format import synthesize
+
+# Startup cost of a cache-hit import: get_single_card_<lang>.py --keep for a card that is
+# already in the database, which is what the extension runs when a card is re-added.
+# A cache hit must not load the network / parsing / multiprocessing stacks, and its startup
+# beyond a bare interpreter must stay under the target.
+TARGET_MS = 60
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "PIL", "multiprocessing", "asyncio")
+LANGUAGES = ("jp", "cht", "chs")
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def timed_run(command, env):
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=script_dir)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def median_ms(command, env, runs):
+    return statistics.median(timed_run(command, env)[0] for _ in range(runs))
+
+
+def parse_import_times(stderr):
+    """Returns ({module: cumulative µs} for every import, [(cumulative µs, module)] of the script's own top-level imports)."""
+    modules, top_level = {}, []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules[name] = cumulative
+        if indent == 1 and name not in ('site', 'encodings'):
+            top_level.append((cumulative, name))
+    return modules, top_level
+
+
+def bench(language, json_path, card_id, runs, env):
+    script = os.path.join(script_dir, f"get_single_card_{language}.py")
+    command = [sys.executable, script, card_id, "--database-path", json_path, "--keep"]
+    elapsed, result = timed_run(command, env)
+    if result.returncode != 0 or "already exists" not in result.stderr:
+        raise RuntimeError(f"{language}: the cache-hit run did not find the card:\n{result.stderr[-2000:]}")
+    _, traced = timed_run([sys.executable, "-X", "importtime", *command[1:]], env)
+    modules, top_level = parse_import_times(traced.stderr)
+    return {
+        "language": language,
+        "median_ms": round(median_ms(command, env, runs), 1),
+        "import_ms": round(sum(cumulative for cumulative, _ in top_level) / 1000, 1),
+        "heaviest_imports": [f"{name} {cumulative / 1000:.1f}ms" for cumulative, name in sorted(top_level, reverse=True)[:5]],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in modules],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the startup of a cache-hit single-card import and check it against a target.")
+    parser.add_argument("--language", action="append", choices=LANGUAGES, help="Language to measure (repeatable, defaults to all).")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command; the median is reported.")
+    parser.add_argument("--cards", type=int, default=2000, help="Number of synthesized cards in the database.")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS, help="Allowed startup beyond a bare interpreter, in ms.")
+    args = parser.parse_args()
+
+    # Measured with up-to-date bytecode, as the extension runs the scripts; recompiling on every run would dominate.
+    compileall.compile_dir(script_dir, maxlevels=0, quiet=1)
+    env = dict(os.environ, PTCG_CARD_STORE='sqlite')
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    interpreter_ms = median_ms([sys.executable, "-c", "pass"], env, args.runs)
+    # What every cache hit used to pay before the stacks were imported lazily.
+    eager_stack_ms = median_ms([sys.executable, "-c", "import requests, bs4"], env, args.runs) - interpreter_ms
+    print(f"interpreter: {interpreter_ms:.1f}ms, requests + bs4: {eager_stack_ms:.1f}ms", file=sys.stderr)
+
+    work_dir = tempfile.mkdtemp(prefix="ptcg_startup_")
+    ok = True
+    try:
+        cards = synthesize(args.cards)
+        card_id = next(iter(cards))
+        card_store.BACKEND = 'sqlite'
+        for language in args.language or LANGUAGES:
+            json_path = os.path.join(work_dir, f"database_{language}.json")
+            card_store.save(cards, json_path)
+            result = bench(language, json_path, card_id, args.runs, env)
+            result["interpreter_ms"] = round(interpreter_ms, 1)
+            result["eager_stack_ms"] = round(eager_stack_ms, 1)
+            result["startup_ms"] = round(result["median_ms"] - interpreter_ms, 1)
+            result["target_ms"] = args.target_ms
+            result["ok"] = result["startup_ms"] <= args.target_ms and not result["heavy_modules_loaded"]
+            ok = ok and result["ok"]
+            print(json.dumps(result, ensure_ascii=False))
+            print(f"{language}: {result['median_ms']:.1f}ms total, {result['startup_ms']:.1f}ms beyond the interpreter "
+                  f"(target {args.target_ms:.0f}ms), imports {result['import_ms']:.1f}ms"
+                  + (f", loaded {', '.join(result['heavy_modules_loaded'])}" if result['heavy_modules_loaded'] else "")
+                  + ("" if result["ok"] else "  <-- FAIL"), file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import sys
+from collections.abc import Mapping
+
+# Compact in-memory form of a card, shared by the JP, CHT and CHS modules.
+#
+# Each record keeps its known keys in __slots__ instead of a per-card dict, and the strings
+# that repeat across thousands of cards (energy types, "multiply"/"minus", subtypes, set
+# names, costs...) are interned, so every card points at one shared copy. Lists become tuples.
+# Records are read-only Mappings, so card.get('name') and card['pokemon']['hp'] keep working;
+# to_dict() returns exactly the dict the parsers used to build, keys in the same order.
+
+_shapes = {}
+
+
+def _shape(keys):
+    """Key tuples are shared between records with the same keys in the same order."""
+    return _shapes.setdefault(keys, keys)
+
+
+def _intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    if type(value) is list:
+        return tuple(_intern(item) for item in value)
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _expand(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [_expand(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _expand(item) for key, item in value.items()}
+    return value
+
+
+class Record(Mapping):
+    """Base of the card records. FIELDS get a slot; any other key is kept in _extra."""
+    __slots__ = ('_keys', '_extra')
+    _SETTERS = {}
+    FIELDS = ()
+    INTERNED = frozenset()
+    NESTED = {}  # key -> Record class used for a dict value, or for every dict in a list value
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None or isinstance(data, Record):
+            return data
+        record = cls.__new__(cls)
+        extra = None
+        setters = cls._SETTERS
+        for key, value in data.items():
+            if value is not None:
+                nested = cls.NESTED.get(key)
+                if nested is not None and type(value) is dict:
+                    value = nested.from_dict(value)
+                elif nested is not None and type(value) is list:
+                    value = tuple(nested.from_dict(item) if type(item) is dict else _intern(item) for item in value)
+                elif key in cls.INTERNED:
+                    value = _intern(value)
+                elif type(value) is list:
+                    value = _freeze(value)
+            setter = setters.get(key)
+            if setter is not None:
+                setter(record, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        _KEYS_SET(record, _shape(tuple(data)))
+        _EXTRA_SET(record, extra)
+        return record
+
+    def to_dict(self):
+        return {key: _expand(self[key]) for key in self._keys}
+
+    def __getitem__(self, key):
+        if key in self._keys:
+            if self._extra is not None and key in self._extra:
+                return self._extra[key]
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._keys else default
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only; build a dict and use from_dict()")
+
+    def __reduce__(self):
+        # pickle / copy rebuild the record from its dict; restoring the slots would go through __setattr__.
+        return (type(self).from_dict, (self.to_dict(),))
+
+
+_KEYS_SET = Record._keys.__set__
+_EXTRA_SET = Record._extra.__set__
+
+
+def _record(name, fields, interned=(), nested=None):
+    cls = type(name, (Record,), {
+        '__module__': __name__,  # So pickle finds the class here (parse process pools send cards back)
+        '__slots__': fields,
+        'FIELDS': frozenset(fields),
+        'INTERNED': frozenset(interned),
+        'NESTED': nested or {},
+    })
+    # Slot descriptors, called directly: faster than setattr and past the read-only __setattr__.
+    cls._SETTERS = {field: getattr(cls, field).__set__ for field in fields}
+    return cls
+
+
+Attack = _record('Attack', ('name', 'cost', 'damage', 'text'), interned=('name', 'cost', 'damage'))
+Ability = _record('Ability', ('name', 'text'), interned=('name',))
+Modifier = _record('Modifier', ('type', 'calc', 'value'), interned=('type', 'calc', 'value'))  # weaknesses / resistances
+Effect = _record('Effect', ('text', 'attacks'), nested={'attacks': Attack})  # trainer / special energy
+Pokemon = _record(
+    'Pokemon',
+    ('hp', 'color', 'evolves', 'option', 'evolvesFrom', 'evolvesTo', 'abilities', 'attacks', 'weaknesses', 'resistances', 'retreats', 'prize'),
+    interned=('hp', 'color', 'evolves', 'option', 'evolvesFrom', 'evolvesTo', 'retreats'),
+    nested={'abilities': Ability, 'attacks': Attack, 'weaknesses': Modifier, 'resistances': Modifier},
+)
+Card = _record(
+    'Card',
+    ('name', 'set_code', 'set_name', 'card_number', 'image_url', 'supertype', 'subtype', 'pokemon', 'trainer', 'energy', 'addRule', 'rarity', 'author'),
+    # energy is the energy type for basic energy (a dict only for special energy)
+    interned=('name', 'set_code', 'set_name', 'supertype', 'subtype', 'energy', 'addRule', 'rarity', 'author'),
+    nested={'pokemon': Pokemon, 'trainer': Effect, 'energy': Effect},
+)
+
+
+def compact(card):
+    """Card.from_dict for a card in the database format. None and records pass through."""
+    return Card.from_dict(card)
+
+
+def to_dict(card):
+    """The plain dict form of a card, whether it is a record or already a dict."""
+    return card.to_dict() if isinstance(card, Record) else card
+
+
+def json_default(value):
+    """For json.dump(s)(..., default=json_default), so records serialize like the dicts they replace."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
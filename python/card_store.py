@@ -0,0 +1,962 @@
+import sys, os, json, gzip, time, hashlib, sqlite3, threading, argparse, contextlib
+
+import card_model, telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Two storage backends sit behind load_database / save_database:
+#
+# "sqlite" (default): the cards are kept in an SQLite file next to the JSON path the scripts
+# are given (database_jp.json -> database_jp.sqlite3). Cards are upserted one row at a time
+# inside a single transaction per save; the set shards of those cards are exported afterwards for
+# the extension, and the whole JSON file at most every JSON_EXPORT_SECONDS.
+#
+# "journal": the JSON file is a snapshot and every save appends the changed cards to
+# database_jp.journal as JSON lines. Loads replay the journal over the snapshot; once the
+# journal passes JOURNAL_COMPACT_BYTES it is folded into a new snapshot in the background.
+BACKEND = os.environ.get('PTCG_CARD_STORE', 'sqlite')
+
+STORE_EXTENSION = '.sqlite3'
+SCHEMA_VERSION = 1
+
+# A save rewrites the set shards of the cards it wrote right away, but the whole JSON file only
+# when its last export is at least this old; until then the store's meta marks it stale and the
+# next save past the interval, `card_store.py export` or a journal-backend load brings it up to date.
+JSON_EXPORT_SECONDS = float(os.environ.get('PTCG_JSON_EXPORT_SECONDS', 60))
+
+# Rows per "WHERE id IN (...)" query; below SQLite's host parameter limit.
+SQL_BATCH = 500
+
+LOCK_EXTENSION = '.lock'
+
+# Encoding of the JSON file (the export, or the journal snapshot):
+# "json" keeps every key, "compact" drops keys whose value is null (most cards have a
+# null trainer/energy/addRule/...), "gzip" is the compact form gzip-compressed.
+# Readers detect the encoding from the content, so it can be switched at any time.
+FILE_FORMAT = os.environ.get('PTCG_DB_FORMAT', 'json')
+FILE_FORMATS = ('json', 'compact', 'gzip')
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Set by the scripts the extension runs: every save then prints the cards it wrote as one
+# {"cardChanges": ...} line on stdout, which the extension merges into the cardDatabase
+# replicant key by key instead of reloading the database.
+CHANGE_FEED = False
+
+# Next to the JSON file the SQLite backend also exports the cards split by set
+# (database_jp.shards/), with a manifest mapping card IDs to shard files
+# (database_jp.manifest.json), so the extension can read only the sets a deck uses.
+SHARD_DIR_EXTENSION = '.shards'
+MANIFEST_EXTENSION = '.manifest.json'
+MANIFEST_VERSION = 1
+
+# Sidecar index of the journal snapshot: card ID -> byte offset and length of its record,
+# valid while the snapshot keeps the size and mtime recorded in it.
+INDEX_EXTENSION = '.index.json'
+INDEX_VERSION = 1
+
+JOURNAL_EXTENSION = '.journal'
+JOURNAL_COMPACT_BYTES = int(os.environ.get('PTCG_JOURNAL_COMPACT_BYTES', 2 * 1024 * 1024))
+
+
+class CardDatabase(dict):
+    """
+    The in-memory database returned by load_database. It behaves like the plain dict the
+    scripts always used, but remembers which card IDs were assigned or deleted, so
+    save_database only writes those rows. Changes inside a card dict are not seen;
+    assign the card again (card_database[card_id] = card_info) as the scripts already do.
+    Cards are kept as compact card_model records; dicts are converted when stored.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__((key, _compact(value)) for key, value in dict(*args, **kwargs).items())
+        self.changed = set()
+        self.deleted = set()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, _compact(value))
+        self.changed.add(key)
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.deleted.add(key)
+        self.changed.discard(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.deleted.add(key)
+            self.changed.discard(key)
+        return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        self.deleted.update(self.keys())
+        self.changed.clear()
+        super().clear()
+
+    def mark_clean(self):
+        self.changed.clear()
+        self.deleted.clear()
+
+
+def _compact(card):
+    return card_model.compact(card) if isinstance(card, dict) else card
+
+
+class LazyCardDatabase(CardDatabase):
+    """
+    A CardDatabase filled on access, so a script that checks or reads a few cards does not
+    parse the whole database. fetch(card_id) returns one card or None, fetch_all() every card.
+    Iterating, len() and the other whole-database operations load everything first.
+    C code that reads the dict storage directly (json.dumps, for one) only sees the cards
+    loaded so far: serialize dict(db.items()) instead, as encode_cards does.
+    """
+    def __init__(self, fetch, fetch_all):
+        super().__init__()
+        self._fetch = fetch
+        self._fetch_all = fetch_all
+        self._missing = set()
+        self._complete = False
+        self._lazy_lock = threading.Lock()
+
+    def _load_key(self, key):
+        if self._complete or dict.__contains__(self, key) or key in self._missing or key in self.deleted:
+            return
+        card = self._fetch(key)
+        with self._lazy_lock:
+            if dict.__contains__(self, key) or key in self.deleted:
+                return  # Assigned or deleted while we were reading
+            if card is None:
+                self._missing.add(key)
+            else:
+                dict.__setitem__(self, key, _compact(card))
+
+    def _load_all(self):
+        if self._complete:
+            return
+        cards = self._fetch_all()
+        with self._lazy_lock:
+            for key, card in cards.items():
+                if not dict.__contains__(self, key) and key not in self.deleted:
+                    dict.__setitem__(self, key, _compact(card))
+            self._complete = True
+
+    def __getitem__(self, key):
+        self._load_key(key)
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        self._load_key(key)
+        return super().__contains__(key)
+
+    def get(self, key, default=None):
+        self._load_key(key)
+        return super().get(key, default)
+
+    def __delitem__(self, key):
+        self._load_key(key)
+        super().__delitem__(key)
+
+    def pop(self, key, *default):
+        self._load_key(key)
+        return super().pop(key, *default)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def __eq__(self, other):
+        self._load_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        self._load_all()
+        return super().__ne__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._load_all()
+        return super().__repr__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def copy(self):
+        self._load_all()
+        return dict(super().items())
+
+    def popitem(self):
+        self._load_all()
+        key, value = super().popitem()
+        self.deleted.add(key)
+        self.changed.discard(key)
+        return key, value
+
+
+# --- File encoding ---
+def strip_nulls(value):
+    """Drops null values from dicts, recursively. Readers treat a missing key like null."""
+    if isinstance(value, card_model.Record):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {key: strip_nulls(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [strip_nulls(item) for item in value]
+    return value
+
+
+def encode_cards(cards, file_format=None):
+    """Serializes a whole database to bytes in the given (or configured) format."""
+    file_format = file_format or FILE_FORMAT
+    if isinstance(cards, LazyCardDatabase):
+        cards = dict(cards.items())
+    if file_format not in FILE_FORMATS:
+        print(f"Warning: Unknown database format '{file_format}', writing plain JSON.", file=sys.stderr)
+        file_format = 'json'
+    if file_format == 'json':
+        return json.dumps(cards, ensure_ascii=False, default=card_model.json_default).encode('utf-8')
+    raw = json.dumps(strip_nulls(cards), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if file_format == 'gzip':
+        # mtime=0 keeps the output identical for identical databases.
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+
+def decode_cards(raw):
+    """Parses a database file in any of the FILE_FORMATS."""
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return json.loads(raw.decode('utf-8'))
+
+
+def read_file(json_path):
+    """Reads a database file of any format. Returns {} if it is missing or empty."""
+    try:
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return {}
+    return decode_cards(raw) if raw else {}
+
+
+def lock_path(json_path):
+    return os.path.splitext(json_path)[0] + LOCK_EXTENSION
+
+
+_held_locks = threading.local()
+
+
+@contextlib.contextmanager
+def locked(json_path):
+    """
+    Holds the advisory write lock of a database. Every writer (save, export, journal append,
+    compaction) takes it, so concurrent importers apply their changed cards on top of each
+    other's instead of one overwriting the other with a stale copy. Readers do not lock.
+    A thread that already holds the lock can take it again.
+    """
+    path = lock_path(json_path)
+    held = _held_locks.__dict__.setdefault('paths', set())
+    if os.path.abspath(path) in held:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after 10 seconds; keep waiting
+        held.add(os.path.abspath(path))
+        yield
+    finally:
+        held.discard(os.path.abspath(path))
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+def store_path(json_path):
+    return os.path.splitext(json_path)[0] + STORE_EXTENSION
+
+
+def connect(json_path):
+    """Opens (and creates or migrates, on first use) the store that belongs to a database JSON path."""
+    path = store_path(json_path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS cards (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    if conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone() is None:
+        with locked(json_path):
+            # Another process may have migrated while we waited for the lock.
+            if conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone() is None:
+                _migrate_from_json(conn, json_path)
+    return conn
+
+
+def _migrate_from_json(conn, json_path):
+    """One-time import of an existing database_<lang>.json into a new store."""
+    cards = _read_snapshot(json_path)
+    # A journal left by the journal backend is part of the data too.
+    for path in (_compacting_path(json_path), journal_path(json_path)):
+        _replay(path, cards)
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO cards (id, data, updated_at) VALUES (?, ?, ?)",
+            ((card_id, json.dumps(card, ensure_ascii=False, default=card_model.json_default), now) for card_id, card in cards.items()),
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (os.path.basename(json_path),))
+    if cards:
+        print(f"Migrated {len(cards)} cards from {os.path.basename(json_path)} to {os.path.basename(store_path(json_path))}.", file=sys.stderr)
+
+
+def load(json_path, lazy=True):
+    """
+    Returns the cards in the store as a CardDatabase. With lazy (the default) cards are
+    only read when they are accessed; see LazyCardDatabase.
+    """
+    if BACKEND == 'journal':
+        export_if_stale(json_path)  # Switched from the SQLite store: its last saves may not be in the JSON file yet
+        return _journal_load(json_path, lazy)
+    connect(json_path).close()  # Creates or migrates the store once, before any reads
+    if not lazy:
+        database = CardDatabase(_sqlite_fetch_all(json_path))
+        database.mark_clean()
+        return database
+    return LazyCardDatabase(lambda card_id: get_card(json_path, card_id), lambda: _sqlite_fetch_all(json_path))
+
+
+def _sqlite_fetch_all(json_path):
+    conn = connect(json_path)
+    try:
+        # Compacted row by row, so only one card at a time exists as a parsed dict.
+        return {card_id: card_model.compact(json.loads(data)) for card_id, data in conn.execute("SELECT id, data FROM cards")}
+    finally:
+        conn.close()
+
+
+def get_card(json_path, card_id):
+    """Reads a single card without loading the whole database. Returns None if it is missing."""
+    if BACKEND == 'journal':
+        return _journal_load(json_path, lazy=True).get(card_id)
+    # The primary key is the index here; a plain connection skips connect()'s schema checks.
+    conn = sqlite3.connect(store_path(json_path), timeout=30)
+    try:
+        row = conn.execute("SELECT data FROM cards WHERE id = ?", (card_id,)).fetchone()
+    finally:
+        conn.close()
+    return card_model.compact(json.loads(row[0])) if row else None
+
+
+def save(data, json_path, change_feed=None):
+    """
+    Writes a database to the store in one transaction, then exports the shards it changed
+    (and the JSON file, when due).
+    A CardDatabase only writes the cards assigned or deleted since it was loaded; a plain
+    dict replaces the whole store, as rewriting the JSON file used to.
+    change_feed overrides CHANGE_FEED, for a save that outlives the run that started it.
+    Returns the number of rows written.
+    """
+    if isinstance(data, CardDatabase):
+        updated = [card_id for card_id in data.changed if card_id in data]
+        deleted = list(data.deleted)
+    with telemetry.span('save') as event:
+        if BACKEND == 'journal':
+            written = _journal_save(data, json_path)
+        else:
+            with locked(json_path):
+                written = _sqlite_save(data, json_path, time.time())
+        event['cards'] = written
+    if (CHANGE_FEED if change_feed is None else change_feed) and written:
+        if isinstance(data, CardDatabase):
+            emit_changes({card_id: data[card_id] for card_id in updated}, deleted)
+        else:
+            emit_changes(reload=True)
+    return written
+
+
+def emit_changes(updated=None, deleted=(), reload=False):
+    """
+    Prints one change-feed line: {"cardChanges": {"updated": {id: card}, "deleted": [id]}}.
+    "reload" asks the extension to reload the whole database (a plain dict replaced it).
+    """
+    if reload:
+        changes = {"reload": True}
+    else:
+        encode = (lambda card: card) if FILE_FORMAT == 'json' else strip_nulls
+        changes = {"updated": {card_id: encode(card) for card_id, card in (updated or {}).items()}, "deleted": list(deleted)}
+    print(json.dumps({"cardChanges": changes}, ensure_ascii=False, default=card_model.json_default), flush=True)
+
+
+def _sqlite_save(data, json_path, now):
+    conn = connect(json_path)
+    try:
+        with conn:
+            if isinstance(data, CardDatabase):
+                changed = [card_id for card_id in data.changed if card_id in data]
+                deleted = list(data.deleted)
+            else:
+                if not data:
+                    return 0  # Never wipe the store because of an unexpectedly empty dict
+                conn.execute("DELETE FROM cards")
+                changed, deleted = list(data.keys()), []
+            conn.executemany(
+                "INSERT INTO cards (id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                ((card_id, json.dumps(data[card_id], ensure_ascii=False, default=card_model.json_default), now) for card_id in changed),
+            )
+            conn.executemany("DELETE FROM cards WHERE id = ?", ((card_id,) for card_id in deleted))
+        written = len(changed) + len(deleted)
+        if written:
+            incremental = isinstance(data, CardDatabase)
+            if not incremental or _json_export_due(conn, json_path, now):
+                cards = export_json(conn, json_path)
+                export_shards(cards, json_path, changed + deleted if incremental else None)
+            else:
+                _set_meta(conn, 'json_stale', '1')
+                export_changed_shards(conn, json_path, changed + deleted)
+    finally:
+        conn.close()
+    if isinstance(data, CardDatabase):
+        data.mark_clean()
+    return written
+
+
+def export_json(conn, json_path, file_format=None):
+    """
+    Writes the whole store to the JSON file the extension reads. It is read from the store,
+    not from memory, so cards saved by other processes meanwhile are included.
+    Returns the exported cards.
+    """
+    cards = {card_id: json.loads(data) for card_id, data in conn.execute("SELECT id, data FROM cards ORDER BY rowid")}
+    temp_path = f"{json_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(encode_cards(cards, file_format))
+        os.replace(temp_path, json_path)
+    except OSError as e:
+        print(f"ERROR: Failed to export database to {json_path}: {e}", file=sys.stderr)
+    else:
+        _set_meta(conn, 'json_exported_at', str(time.time()))
+        _set_meta(conn, 'json_stale', '0')
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return cards
+
+
+def _set_meta(conn, key, value):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _json_export_due(conn, json_path, now):
+    if not os.path.exists(json_path) or _read_manifest(json_path) is None:
+        return True
+    return now - float(_get_meta(conn, 'json_exported_at') or 0) >= JSON_EXPORT_SECONDS
+
+
+def export_if_stale(json_path):
+    """Writes the JSON file now if a save deferred its export (see JSON_EXPORT_SECONDS)."""
+    if not os.path.exists(store_path(json_path)):
+        return False
+    conn = connect(json_path)
+    try:
+        if _get_meta(conn, 'json_stale') != '1':
+            return False
+        with locked(json_path):
+            if _get_meta(conn, 'json_stale') != '1':
+                return False
+            cards = export_json(conn, json_path)
+            export_shards(cards, json_path)
+        return True
+    finally:
+        conn.close()
+
+
+# --- Shards ---
+def shard_dir(json_path):
+    return os.path.splitext(json_path)[0] + SHARD_DIR_EXTENSION
+
+
+def manifest_path(json_path):
+    return os.path.splitext(json_path)[0] + MANIFEST_EXTENSION
+
+
+def shard_key(card):
+    """Cards are grouped by set: set code (regulation mark for JP/CHT) plus set name."""
+    return f"{card.get('set_code') or ''}/{card.get('set_name') or ''}"
+
+
+def shard_file(key):
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.json"
+
+
+def _read_manifest(json_path):
+    try:
+        with open(manifest_path(json_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def _write_atomic(path, raw):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(raw)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def export_shards(cards, json_path, card_ids=None, file_format=None):
+    """
+    Writes the per-set shards and the manifest. With card_ids, only the shards those cards
+    were in or are now in are rewritten; otherwise (or without a manifest) all of them.
+    The manifest is written last, so it is never newer than the shards it points to.
+    """
+    directory = shard_dir(json_path)
+    old = _read_manifest(json_path) if card_ids is not None else None
+    groups = {}
+    index = {}
+    for card_id, card in cards.items():
+        name = shard_file(shard_key(card))
+        groups.setdefault(name, {})[card_id] = card
+        index[card_id] = name
+    if old is None or not os.path.isdir(directory):
+        affected = set(groups)
+    else:
+        affected = {old['index'].get(card_id) for card_id in card_ids} | {index.get(card_id) for card_id in card_ids}
+        affected.discard(None)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for name in affected:
+            path = os.path.join(directory, name)
+            if name in groups:
+                _write_atomic(path, encode_cards(groups[name], file_format))
+            elif os.path.exists(path):
+                os.remove(path)  # Its last card moved to another set or was deleted
+        if old is None:
+            for name in os.listdir(directory):
+                if name not in groups:
+                    os.remove(os.path.join(directory, name))
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "shards": {name: {"key": shard_key(next(iter(group.values()))), "count": len(group)} for name, group in groups.items()},
+            "index": index,
+        }
+        _write_atomic(manifest_path(json_path), json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    except OSError as e:
+        print(f"ERROR: Failed to export database shards to {directory}: {e}", file=sys.stderr)
+    return len(affected)
+
+
+def export_changed_shards(conn, json_path, card_ids, file_format=None):
+    """
+    Rewrites only the shards the given cards were in or are now in, reading just their rows
+    from the store, and updates the manifest. Without a manifest every shard is written.
+    """
+    old = _read_manifest(json_path)
+    if old is None or not os.path.isdir(shard_dir(json_path)):
+        return export_shards({card_id: json.loads(data) for card_id, data in conn.execute("SELECT id, data FROM cards ORDER BY rowid")},
+                             json_path, file_format=file_format)
+    index = dict(old['index'])
+    shards = dict(old['shards'])
+    changed = {card_id: json.loads(data) for _, card_id, data in _rows(conn, card_ids)}
+    affected = {index[card_id] for card_id in card_ids if card_id in index}
+    for card_id in card_ids:
+        index.pop(card_id, None)
+    for card_id, card in changed.items():
+        index[card_id] = shard_file(shard_key(card))
+        affected.add(index[card_id])
+    members = {}
+    for card_id, name in index.items():
+        if name in affected:
+            members.setdefault(name, []).append(card_id)
+    directory = shard_dir(json_path)
+    try:
+        for name in affected:
+            path = os.path.join(directory, name)
+            if name not in members:
+                shards.pop(name, None)
+                if os.path.exists(path):
+                    os.remove(path)  # Its last card moved to another set or was deleted
+                continue
+            group = {card_id: changed.get(card_id) or json.loads(data) for _, card_id, data in sorted(_rows(conn, members[name]))}
+            _write_atomic(path, encode_cards(group, file_format))
+            shards[name] = {"key": shard_key(next(iter(group.values()))), "count": len(group)}
+        manifest = {"version": MANIFEST_VERSION, "shards": shards, "index": index}
+        _write_atomic(manifest_path(json_path), json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    except OSError as e:
+        print(f"ERROR: Failed to export database shards to {directory}: {e}", file=sys.stderr)
+    return len(affected)
+
+
+def _rows(conn, card_ids):
+    """(rowid, id, data) of the given cards that are in the store."""
+    card_ids = list(card_ids)
+    rows = []
+    for start in range(0, len(card_ids), SQL_BATCH):
+        batch = card_ids[start:start + SQL_BATCH]
+        rows += conn.execute(f"SELECT rowid, id, data FROM cards WHERE id IN ({','.join('?' * len(batch))})", batch).fetchall()
+    return rows
+
+
+# --- Journal backend ---
+def journal_path(json_path):
+    return os.path.splitext(json_path)[0] + JOURNAL_EXTENSION
+
+
+def _compacting_path(json_path):
+    return journal_path(json_path) + '.compacting'
+
+
+def _read_snapshot(json_path):
+    try:
+        return read_file(json_path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read {json_path}: {e}", file=sys.stderr)
+        return {}
+
+
+def _replay(path, cards):
+    """Applies the entries of a journal file to cards. A torn last line (crash mid-append) is ignored."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return 0
+    applied = 0
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get('deleted'):
+            cards.pop(entry['id'], None)
+        else:
+            cards[entry['id']] = entry['card']
+        applied += 1
+    return applied
+
+
+def _journal_load(json_path, lazy=False):
+    if not lazy:
+        cards = _read_snapshot(json_path)
+        for path in (_compacting_path(json_path), journal_path(json_path)):
+            _replay(path, cards)
+        database = CardDatabase(cards)
+        database.mark_clean()
+        return database
+    # The journal is small (it is compacted past JOURNAL_COMPACT_BYTES); replay it into an
+    # overlay and read everything else from the snapshot through its index.
+    overlay = _JournalOverlay()
+    for path in (_compacting_path(json_path), journal_path(json_path)):
+        _replay(path, overlay)
+    index = load_index(json_path)
+    # Without a usable index the snapshot is read in full once, and every later miss is served from it.
+    loaded = []
+    load_lock = threading.Lock()
+
+    def fetch_all():
+        with load_lock:
+            if not loaded:
+                loaded.append(_journal_load(json_path))
+        return loaded[0]
+
+    def fetch(card_id):
+        if loaded:
+            return loaded[0].get(card_id)
+        if card_id in overlay.deleted:
+            return None
+        if card_id in overlay:
+            return overlay[card_id]
+        if index is not None:
+            try:
+                return read_indexed(json_path, index, card_id)
+            except (OSError, ValueError):
+                pass  # Compacted meanwhile; read the new snapshot in full
+        return fetch_all().get(card_id)
+
+    return LazyCardDatabase(fetch, fetch_all)
+
+
+class _JournalOverlay(dict):
+    """Journal entries replayed on their own: assigned cards, plus the IDs deleted since the snapshot."""
+    def __init__(self):
+        super().__init__()
+        self.deleted = set()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.deleted.discard(key)
+
+    def pop(self, key, *default):
+        self.deleted.add(key)
+        return super().pop(key, *default)
+
+
+def _write_snapshot(cards, json_path):
+    """Writes the snapshot atomically: a temporary file next to it, then os.replace."""
+    os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+    temp_path = f"{json_path}.{os.getpid()}.tmp"
+    try:
+        raw = encode_cards(cards)
+        with open(temp_path, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, json_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    write_index(json_path, raw)
+
+
+def _journal_save(data, json_path):
+    if not isinstance(data, CardDatabase):
+        if not data:
+            return 0  # Never wipe the database because of an unexpectedly empty dict
+        # A plain dict replaces everything: it becomes the snapshot and the journal starts over.
+        with locked(json_path):
+            _write_snapshot(data, json_path)
+            for path in (_compacting_path(json_path), journal_path(json_path)):
+                if os.path.exists(path):
+                    os.remove(path)
+        return len(data)
+
+    encode = (lambda card: card) if FILE_FORMAT == 'json' else strip_nulls
+    lines = [json.dumps({"id": card_id, "card": encode(data[card_id])}, ensure_ascii=False, default=card_model.json_default) for card_id in data.changed if card_id in data]
+    lines += [json.dumps({"id": card_id, "deleted": True}, ensure_ascii=False) for card_id in data.deleted]
+    if not lines:
+        return 0
+    path = journal_path(json_path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # One write per save with O_APPEND, under the lock so a compaction cannot move the file mid-append.
+    with locked(json_path):
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            payload = ("\n".join(lines) + "\n").encode('utf-8')
+            end = os.fstat(fd).st_size
+            if end and os.lseek(fd, end - 1, os.SEEK_SET) >= 0 and os.read(fd, 1) != b"\n":
+                payload = b"\n" + payload  # Seal a torn line left by a crash, so it cannot swallow ours
+            os.write(fd, payload)
+            os.fsync(fd)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+    data.mark_clean()
+    if size > JOURNAL_COMPACT_BYTES:
+        _start_compaction(json_path)
+    return len(lines)
+
+
+def _start_compaction(json_path):
+    """Runs compact() in a detached process, so the import that crossed the threshold is not held up."""
+    import subprocess
+
+    try:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), json_path, "compact"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError as e:
+        print(f"Warning: Could not start journal compaction: {e}", file=sys.stderr)
+
+
+def compact(json_path):
+    """
+    Folds the journal into a new snapshot under the write lock. The journal is renamed aside
+    first, so an interrupted compaction is finished by the next one.
+    Returns the number of entries folded.
+    """
+    with locked(json_path):
+        compacting = _compacting_path(json_path)
+        if not os.path.exists(compacting):
+            if not os.path.exists(journal_path(json_path)):
+                return 0
+            os.replace(journal_path(json_path), compacting)
+        cards = _read_snapshot(json_path)
+        folded = _replay(compacting, cards)
+        _write_snapshot(cards, json_path)
+        os.remove(compacting)
+        return folded
+
+
+# --- Snapshot index ---
+def index_path(json_path):
+    return os.path.splitext(json_path)[0] + INDEX_EXTENSION
+
+
+def build_index(raw):
+    """
+    Finds the byte range of every record in an uncompressed snapshot (any indentation).
+    Returns {card_id: [offset, length]}, or None for a gzip snapshot, which cannot be sliced.
+    """
+    if raw[:2] == GZIP_MAGIC:
+        return None
+    text = raw.decode('utf-8')
+    decoder = json.JSONDecoder()
+    offsets = {}
+    byte_pos = 0  # Byte offset of char_pos
+    char_pos = 0
+
+    def skip(pos, chars):
+        while pos < len(text) and (text[pos].isspace() or text[pos] in chars):
+            pos += 1
+        return pos
+
+    def to_bytes(pos):
+        nonlocal byte_pos, char_pos
+        byte_pos += len(text[char_pos:pos].encode('utf-8'))
+        char_pos = pos
+        return byte_pos
+
+    pos = skip(0, '{')
+    while pos < len(text) and text[pos] != '}':
+        card_id, pos = decoder.raw_decode(text, pos)
+        pos = skip(pos, ':')
+        start = to_bytes(pos)
+        _, pos = decoder.raw_decode(text, pos)
+        offsets[card_id] = [start, to_bytes(pos) - start]
+        pos = skip(pos, ',')
+    return offsets
+
+
+def write_index(json_path, raw=None):
+    """Writes the sidecar index of the snapshot. Returns the index, or None if it cannot be built."""
+    try:
+        stat = os.stat(json_path)
+        if raw is None:
+            with open(json_path, 'rb') as f:
+                raw = f.read()
+        offsets = build_index(raw) if raw else {}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not index {json_path}: {e}", file=sys.stderr)
+        return None
+    if offsets is None:
+        return None
+    index = {"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "offsets": offsets}
+    try:
+        _write_atomic(index_path(json_path), json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    except OSError as e:
+        print(f"Warning: Could not write {index_path(json_path)}: {e}", file=sys.stderr)
+    return index
+
+
+def load_index(json_path):
+    """
+    Returns the sidecar index of the snapshot, rebuilding it if the snapshot's size or mtime
+    changed since it was written. Returns None when the snapshot cannot be indexed (gzip).
+    """
+    try:
+        stat = os.stat(json_path)
+    except FileNotFoundError:
+        return {"offsets": {}}
+    try:
+        with open(index_path(json_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION and index.get('size') == stat.st_size and index.get('mtime_ns') == stat.st_mtime_ns:
+            return index
+    except (OSError, ValueError):
+        pass
+    return write_index(json_path)
+
+
+def read_indexed(json_path, index, card_id):
+    """Reads and parses only the record of one card. Returns None if it is not in the snapshot."""
+    entry = index['offsets'].get(card_id)
+    if entry is None:
+        return None
+    with open(json_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size != index.get('size') or stat.st_mtime_ns != index.get('mtime_ns'):
+            raise ValueError(f"{json_path} changed since it was indexed")
+        f.seek(entry[0])
+        return json.loads(f.read(entry[1]).decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate, export or inspect the SQLite card store behind database_<lang>.json.")
+    parser.add_argument("database_path", help="Path to the database JSON file (the store is the .sqlite3 file next to it).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Create the store from the JSON file (only done once; also happens automatically).")
+    export_parser = subparsers.add_parser("export", help="Rewrite the JSON file from the store.")
+    export_parser.add_argument("--format", choices=FILE_FORMATS, default=None, help="Encoding of the JSON file (defaults to PTCG_DB_FORMAT, or json).")
+    subparsers.add_parser("stats", help="Show the number of cards in the store.")
+    subparsers.add_parser("compact", help="Fold the journal (journal backend) into a new JSON snapshot.")
+    subparsers.add_parser("index", help="Rebuild the sidecar index of the JSON snapshot (journal backend).")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index = write_index(args.database_path)
+        print(f"Indexed {len(index['offsets'])} cards." if index else "The snapshot cannot be indexed (missing or gzip).")
+        return
+
+    if args.command == "compact":
+        folded = compact(args.database_path)
+        print(f"Folded {folded} journal entries into {args.database_path}.")
+        return
+
+    conn = connect(args.database_path)
+    try:
+        if args.command == "export":
+            with locked(args.database_path):
+                cards = export_json(conn, args.database_path, args.format)
+                export_shards(cards, args.database_path, file_format=args.format)
+            print(f"Exported to {args.database_path}.")
+        elif args.command == "stats" or args.command == "migrate":
+            count = conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+            print(f"{store_path(args.database_path)}: {count} cards.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-import sys, os, re, json, time
+import sys, os, re, json, time, threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,7 +10,8 @@ libs_dir = os.path.join(script_dir, 'libs')
 if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
-import requests
+import http_client, card_store, card_model, evolution_index, telemetry
+from deck_ingest import ingest_cards
 
 # --- Constants and Paths ---
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
@@ -18,7 +20,18 @@ CARD_IMG_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop', 'car
 CARD_PACKS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'card_packs.json')
 
 # --- Cache ---
+# card_packs.json is refreshed in the background once it is older than this.
+CARD_PACKS_TTL = 7 * 24 * 3600
+# An unknown set code triggers at most one refresh per this many seconds.
+CARD_PACKS_MISS_COOLDOWN = 10 * 60
+# Longest a refresh may hold the cross-process lock before it is considered abandoned.
+CARD_PACKS_LOCK_SECONDS = 60
+
 _SET_NAME_CACHE = None
+_SET_NAME_FETCHED_AT = 0
+_SET_NAME_REFRESH = None
+_SET_NAME_LAST_ATTEMPT = 0
+_SET_NAME_LOCK = threading.Lock()
 
 # --- Mappings ---
 EVOLUTION_STAGE_MAP = {
@@ -72,16 +85,16 @@ CHS_TO_JP_ENERGY_MAP = {
 def fetch_card_packs():
     """
     从 tcg.mik.moe API 获取卡包列表并保存到文件。
+    文件中同时记录获取时间，用于判断卡包列表是否过期。
+    Returns the pack list, or None on failure.
     """
+    import requests
+
     url = "https://tcg.mik.moe/api/v3/card/product-list"
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-    }
     data = {}
 
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, json=data)
         response.raise_for_status()
         response.encoding = 'utf-8'
         card_packs_data = response.json()
@@ -91,10 +104,18 @@ def fetch_card_packs():
             
             if pack_list:
                 print(f"成功获取到 {len(pack_list)} 个卡包的信息。", file=sys.stderr)
-                
-                with open(CARD_PACKS_FILE, "w", encoding="utf-8") as f:
-                    json.dump(pack_list, f, ensure_ascii=False, indent=4)
+
+                catalog = {"fetched_at": time.time(), "source": url, "list": pack_list}
+                temp_path = f"{CARD_PACKS_FILE}.{os.getpid()}.tmp"
+                try:
+                    with open(temp_path, "w", encoding="utf-8") as f:
+                        json.dump(catalog, f, ensure_ascii=False, indent=4)
+                    os.replace(temp_path, CARD_PACKS_FILE)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
                 print(f"数据已成功保存到 {CARD_PACKS_FILE} 文件。", file=sys.stderr)
+                return pack_list
 
             else:
                 print("API返回成功，但卡包列表为空。", file=sys.stderr)
@@ -108,62 +129,201 @@ def fetch_card_packs():
         print("解析返回的JSON数据失败，请检查API响应内容。", file=sys.stderr)
     except Exception as e:
         print(f"发生未知错误: {e}", file=sys.stderr)
+    return None
+
+
+def read_card_packs():
+    """
+    Returns (pack list, fetched_at) from card_packs.json, or (None, 0) if it is missing or unreadable.
+    Files written before the fetch metadata existed are a bare list; their mtime is used as the fetch time.
+    """
+    try:
+        with open(CARD_PACKS_FILE, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+        if isinstance(catalog, list):
+            return catalog, os.path.getmtime(CARD_PACKS_FILE)
+        return catalog.get('list', []), catalog.get('fetched_at', 0)
+    except FileNotFoundError:
+        return None, 0
+    except (json.JSONDecodeError, IOError, AttributeError) as e:
+        print(f"Error reading or parsing card_packs.json: {e}", file=sys.stderr)
+        return None, 0
+
+
+def _read_card_packs_file():
+    """Returns (set name map, fetched_at), or (None, 0) if card_packs.json is missing or unreadable."""
+    set_list, fetched_at = read_card_packs()
+    if set_list is None:
+        return None, 0
+    try:
+        return {item['setCode']: item['name'] for item in set_list}, fetched_at
+    except (KeyError, TypeError) as e:
+        print(f"Error reading or parsing card_packs.json: {e}", file=sys.stderr)
+        return None, 0
 
 
 def _get_set_name_map():
-    """Lazy loads the set code to set name mapping, fetching if necessary."""
-    global _SET_NAME_CACHE
-    if _SET_NAME_CACHE is not None:
-        return _SET_NAME_CACHE
+    """
+    Returns the set code to set name mapping. Only the very first load (no card_packs.json yet)
+    waits for the API; a stale catalog is served as-is while it is refreshed in the background.
+    """
+    global _SET_NAME_CACHE, _SET_NAME_FETCHED_AT
+    if _SET_NAME_CACHE is None:
+        # Deck imports call this from several worker threads; only the first one loads.
+        with _SET_NAME_LOCK:
+            if _SET_NAME_CACHE is None:
+                _SET_NAME_CACHE, _SET_NAME_FETCHED_AT = _load_set_name_map()
+    if time.time() - _SET_NAME_FETCHED_AT > CARD_PACKS_TTL:
+        _refresh_set_name_map()
+    return _SET_NAME_CACHE
+
+def _load_set_name_map():
+    set_name_map, fetched_at = _read_card_packs_file()
+    if set_name_map is not None:
+        return set_name_map, fetched_at
+
+    print("card_packs.json not found, fetching from API...", file=sys.stderr)
+    fetch_card_packs()
+    set_name_map, fetched_at = _read_card_packs_file()
+    if set_name_map is None:
+        print("Failed to create or find card_packs.json.", file=sys.stderr)
+        # Retried after the miss cooldown.
+        return {}, time.time() - CARD_PACKS_TTL + CARD_PACKS_MISS_COOLDOWN
+    return set_name_map, fetched_at
 
-    if not os.path.exists(CARD_PACKS_FILE):
-        print("card_packs.json not found, fetching from API...", file=sys.stderr)
-        fetch_card_packs() # This function from get_set_info_chs should create the file
+def _refresh_set_name_map():
+    """
+    Starts a background refresh of the set catalog and returns its future. Single-flight:
+    while a refresh is running, every caller gets the same future. Across processes,
+    a lock file next to card_packs.json keeps concurrent imports from all refetching.
+    """
+    global _SET_NAME_REFRESH
+    with _SET_NAME_LOCK:
+        if _SET_NAME_REFRESH is None or _SET_NAME_REFRESH.done():
+            _SET_NAME_REFRESH = Future()
+            threading.Thread(target=_run_set_name_refresh, args=(_SET_NAME_REFRESH,), daemon=True).start()
+        return _SET_NAME_REFRESH
+
+def _run_set_name_refresh(future):
+    global _SET_NAME_CACHE, _SET_NAME_FETCHED_AT, _SET_NAME_LAST_ATTEMPT
+    _SET_NAME_LAST_ATTEMPT = time.time()
+    lock_path = CARD_PACKS_FILE + '.lock'
+    try:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            owns_lock = True
+        except FileExistsError:
+            owns_lock = False
+            try:
+                abandoned = time.time() - os.path.getmtime(lock_path) > CARD_PACKS_LOCK_SECONDS
+                if abandoned:
+                    os.remove(lock_path)  # Left behind by a process that died mid-refresh
+            except FileNotFoundError:
+                abandoned = True  # Released just now; take it ourselves
+            if abandoned:
+                return _run_set_name_refresh(future)
+        try:
+            if owns_lock:
+                print("Set catalog is stale or missing a set, refreshing card_packs.json in the background...", file=sys.stderr)
+                fetch_card_packs()
+            else:
+                # Another process is refreshing; pick up its result when it is done.
+                deadline = time.time() + CARD_PACKS_LOCK_SECONDS
+                while os.path.exists(lock_path) and time.time() < deadline:
+                    time.sleep(0.2)
+        finally:
+            if owns_lock and os.path.exists(lock_path):
+                os.remove(lock_path)
+
+        set_name_map, fetched_at = _read_card_packs_file()
+        with _SET_NAME_LOCK:
+            if set_name_map is not None:
+                _SET_NAME_CACHE = set_name_map
+                _SET_NAME_FETCHED_AT = fetched_at
+            if time.time() - _SET_NAME_FETCHED_AT > CARD_PACKS_TTL:
+                # The fetch failed; keep serving the old map and try again after the miss cooldown.
+                _SET_NAME_FETCHED_AT = time.time() - CARD_PACKS_TTL + CARD_PACKS_MISS_COOLDOWN
+    except Exception as e:
+        print(f"Error refreshing the set catalog: {e}", file=sys.stderr)
+    finally:
+        if not future.done():
+            future.set_result(_SET_NAME_CACHE)
 
-    if os.path.exists(CARD_PACKS_FILE):
+def _lookup_set_name(set_code, set_name_map):
+    """
+    Looks up a set name. An unknown set code usually means a set released after the catalog
+    was fetched, so it starts a refresh, at most once per cooldown period, without waiting for
+    it: the card gets no set name for now, and fill_set_names() adds it once the catalog has it.
+    """
+    set_name = set_name_map.get(set_code)
+    if set_name is not None or not set_code:
+        return set_name
+    if _SET_NAME_CACHE is not None and set_code in _SET_NAME_CACHE:
+        return _SET_NAME_CACHE[set_code]
+    with _SET_NAME_LOCK:
+        refreshing = _SET_NAME_REFRESH is not None and not _SET_NAME_REFRESH.done()
+    if not refreshing and time.time() - _SET_NAME_LAST_ATTEMPT >= CARD_PACKS_MISS_COOLDOWN:
+        print(f"Set code {set_code} is not in the set catalog, refreshing it in the background...", file=sys.stderr)
+        _refresh_set_name_map()
+    return None
+
+def fill_set_names(card_database, card_ids, wait=0):
+    """
+    Adds the set name to cards that were saved without one (their set was not in the catalog
+    yet) once the catalog has it. With wait, a catalog refresh that is still running is given
+    that many seconds to finish first. Returns the number of cards filled.
+    """
+    cards = {card_id: card_database.get(card_id) for card_id in card_ids}
+    missing = {card_id: card for card_id, card in cards.items()
+               if card and card.get('name') and card.get('set_code') and not card.get('set_name')}
+    if not missing:
+        return 0
+    refresh = _SET_NAME_REFRESH
+    if wait and refresh is not None and not refresh.done():
         try:
-            with open(CARD_PACKS_FILE, 'r', encoding='utf-8') as f:
-                set_list = json.load(f)
-                _SET_NAME_CACHE = {item['setCode']: item['name'] for item in set_list}
-                return _SET_NAME_CACHE
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error reading or parsing card_packs.json: {e}", file=sys.stderr)
-            _SET_NAME_CACHE = {}
-            return _SET_NAME_CACHE
-    else:
-        print("Failed to create or find card_packs.json.", file=sys.stderr)
-        _SET_NAME_CACHE = {}
-        return _SET_NAME_CACHE
+            refresh.result(timeout=wait)
+        except FutureTimeoutError:
+            pass
+    set_name_map = _SET_NAME_CACHE or _get_set_name_map()
+    filled = 0
+    for card_id, card in missing.items():
+        set_name = set_name_map.get(card['set_code'])
+        if set_name:
+            card_database[card_id] = dict(card_model.to_dict(card), set_name=set_name)
+            filled += 1
+    return filled
 
 def load_database(db_path=None):
     """
-    Loads the card database from a local JSON file.
+    Loads the card database from the card store (see card_store.py).
+    On first use the store is migrated from the existing JSON file.
     """
-    target_path = db_path if db_path else DATABASE_FILE
-    if not os.path.exists(target_path) or os.path.getsize(target_path) == 0:
-        return {}
-    with open(target_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return card_store.load(db_path if db_path else DATABASE_FILE)
 
-def save_database(data, db_path=None):
+def save_database(data, db_path=None, change_feed=None):
     """
-    Saves the card database to a local JSON file.
+    Saves the card database: changed cards are upserted into the card store in one
+    transaction and the JSON file the extension reads is exported from it.
+    change_feed is passed on to card_store.save().
     """
     target_path = db_path if db_path else DATABASE_FILE
-    os.makedirs(os.path.dirname(target_path), exist_ok=True)
-    temp_file_path = target_path + '.tmp'
+    # Only the saved cards are recorded, so a lazily loaded database is not read in full;
+    # an empty index is seeded once from the whole database saved before it existed.
+    changed = [data[card_id] for card_id in data.changed if card_id in data] if isinstance(data, card_store.CardDatabase) else None
     try:
-        with open(temp_file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        os.replace(temp_file_path, target_path)
+        card_store.save(data, target_path, change_feed=change_feed)
     except Exception as e:
         print(f"ERROR: Failed to save database to {target_path}: {e}", file=sys.stderr)
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+    for card in (data.values() if changed is None or evolution_index.is_empty() else changed):
+        evolution_index.record_card(card)
+    evolution_index.save()
 
-def _transform_api_data(api_data, card_details, set_name_map):
-    """Transforms the JSON data from the API into the desired card_details format."""
+def _transform_api_data(api_data, card_details, set_name_map, lookups=None):
+    """
+    Transforms the JSON data from the API into the desired card_details format.
+    lookups holds the set name and pre-evolution already resolved by fetch_card_with_lookups();
+    without it they are looked up here.
+    """
     data = api_data.get('data', {})
     if not data:
         return
@@ -172,7 +332,7 @@ def _transform_api_data(api_data, card_details, set_name_map):
     card_details['name'] = data.get('name')
     card_details['rarity'] = data.get('rarity')
     card_details['author'] = data.get('artist')
-    card_details['set_name'] = set_name_map.get(set_code)
+    card_details['set_name'] = lookups['set_name'] if lookups is not None else _lookup_set_name(set_code, set_name_map)
     
     card_index = data.get('cardIndex')
     if set_code and card_index:
@@ -234,16 +394,12 @@ def _transform_api_data(api_data, card_details, set_name_map):
                     # If it's a Stage 2, we need to find the Basic Pokémon as well.
                     stage1_name = pokemon_attr.get('evolvesFrom')
                     if stage1_name:
-                        print(f"  -> It's a Stage 2. Finding basic form for {stage1_name}...", file=sys.stderr)
-                        # Use our working function to get the Stage 1 card details
-                        stage1_details = get_card_by_name(stage1_name)
-                        if (stage1_details and stage1_details.get('pokemon') and 
-                            stage1_details['pokemon'].get('evolvesFrom')):
-                            # We found the basic Pokémon's name
-                            basic_name = stage1_details['pokemon']['evolvesFrom'][0]
-                            print(f"  -> Found basic form: {basic_name}", file=sys.stderr)
+                        basic_name = lookups.get('pre_evolution') if lookups is not None else _find_pre_evolution(stage1_name)
+                        if basic_name:
                             # Append the basic name to the evolution chain
                             card_details['pokemon']['evolvesFrom'].append(basic_name)
+            evolves_from = card_details['pokemon'].get('evolvesFrom')
+            evolution_index.record(card_details['name'], evolves_from[0] if evolves_from else None)
 
             # Abilities
             if pokemon_attr.get('ability'):
@@ -347,13 +503,34 @@ def _transform_api_data(api_data, card_details, set_name_map):
     else:
         card_details['supertype'] = supertype_api.lower() if supertype_api else None
 
+def _find_pre_evolution(name):
+    """
+    Returns the name a Pokémon evolves from, using the local evolution index and
+    only falling back to a search by name on a miss. The fallback result is stored.
+    """
+    known, pre_evolution = evolution_index.lookup(name)
+    if known:
+        return pre_evolution
+
+    print(f"  -> It's a Stage 2. Finding basic form for {name}...", file=sys.stderr)
+    details = get_card_by_name(name)
+    if not details or not details.get('pokemon'):
+        return None
+    evolves_from = details['pokemon'].get('evolvesFrom')
+    pre_evolution = evolves_from[0] if evolves_from else None
+    if pre_evolution:
+        print(f"  -> Found basic form: {pre_evolution}", file=sys.stderr)
+    # The searched card is stored under the name we asked for, and the index is written
+    # right away so parse worker processes share the result too.
+    evolution_index.record(name, pre_evolution)
+    evolution_index.save()
+    return pre_evolution
+
 def get_card_by_name(name):
     """Fetches card data by name using the advance search API."""
+    import requests
+
     url = "https://tcg.mik.moe/api/v3/card/card-basic-search"
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36",
-    }
     payload = {
         "SearchText": name,
         "exact": True,
@@ -361,9 +538,8 @@ def get_card_by_name(name):
         "PageSize": 1
     }
     try:
-        # Add a small delay to avoid spamming the API
-        time.sleep(0.5)
-        response = requests.post(url, headers=headers, json=payload)
+        # The client applies the per-host rate limit to avoid spamming the API
+        response = http_client.post(url, json=payload, cache=True)
         response.raise_for_status()
         
         search_result = response.json()
@@ -390,6 +566,57 @@ def get_card_by_name(name):
         
     return None
 
+def fetch_card_page(card_id, revalidate=False):
+    """
+    Fetches the raw card-detail API response as text. Returns None on a request error.
+    With revalidate the cached response is always revalidated (an --overwrite run wants fresh data).
+    """
+    import requests  # Only runs for a card that is not in the database
+
+    normalized_id = card_id.replace('/', '-')
+    try:
+        set_code, card_number = normalized_id.split('-', 1)
+    except ValueError:
+        print(f"Invalid card_id format: {card_id}. Expected 'SET/NUM' or 'SET-NUM'.", file=sys.stderr)
+        return None
+
+    url = "https://tcg.mik.moe/api/v3/card/card-detail"
+    payload = {"setCode": set_code, "cardIndex": card_number}
+    try:
+        with telemetry.span('fetch', card_id):
+            response = http_client.post(url, json=payload, cache=True, fresh_seconds=0 if revalidate else None)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        return response.text
+    except requests.exceptions.RequestException as e:
+        print(f"API request error for {card_id}: {e}", file=sys.stderr)
+        return None
+
+def fetch_card_with_lookups(card_id, revalidate=False):
+    """
+    Like fetch_card_page, but also resolves what parsing the card would look up over the
+    network (the set name and a Stage 2's basic form) and adds it to the response under
+    '_lookups'. The import pipeline fetches with this so its parse stage, which may run in
+    other processes, never goes to the network.
+    """
+    text = fetch_card_page(card_id, revalidate=revalidate)
+    if text is None:
+        return None
+    try:
+        api_response = json.loads(text)
+    except json.JSONDecodeError:
+        return text
+    data = api_response.get('data') if isinstance(api_response, dict) else None
+    if api_response.get('code') != 200 or not data:
+        return text
+
+    lookups = {'set_name': _lookup_set_name(data.get('setCode'), _get_set_name_map())}
+    pokemon_attr = data.get('pokemonAttr') or {}
+    if pokemon_attr.get('stage') == 'Stage 2' and pokemon_attr.get('evolvesFrom'):
+        lookups['pre_evolution'] = _find_pre_evolution(pokemon_attr['evolvesFrom'])
+    api_response['_lookups'] = lookups
+    return json.dumps(api_response, ensure_ascii=False)
+
 def get_card_details(card_id, html_content=None):
     """Extracts detailed information by calling the tcg.mik.moe API."""
     # Normalize the ID to use a hyphen, making it consistent internally.
@@ -417,67 +644,57 @@ def get_card_details(card_id, html_content=None):
         "author": None
     }
 
-    # If html_content is provided, it means we are in a testing/mocking context.
-    # We will parse it as JSON instead of making a live request.
-    if html_content:
-        try: api_response = json.loads(html_content)
-        except json.JSONDecodeError:
-            print(f"Error: Provided html_content is not valid JSON.", file=sys.stderr)
-            return None
-    else:
-        url = "https://tcg.mik.moe/api/v3/card/card-detail"
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-        }
-        payload = {"setCode": set_code, "cardIndex": card_number}
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            api_response = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"API request error for {card_id}: {e}", file=sys.stderr)
-            return None
-        except json.JSONDecodeError:
-            print(f"Failed to decode JSON from API response for {card_id}.", file=sys.stderr)
+    # If html_content is provided, it means we are in a testing/mocking context,
+    # or the response was already fetched by fetch_card_page (e.g. by the import pipeline).
+    if html_content is None:
+        html_content = fetch_card_page(card_id)
+        if html_content is None:
             return None
 
+    try:
+        api_response = json.loads(html_content)
+    except json.JSONDecodeError:
+        print(f"Failed to decode JSON from API response for {card_id}.", file=sys.stderr)
+        return None
+
     if api_response and api_response.get("code") == 200:
-        set_name_map = _get_set_name_map()
-        _transform_api_data(api_response, card_details, set_name_map)
-        return card_details
+        lookups = api_response.pop('_lookups', None)
+        set_name_map = _get_set_name_map() if lookups is None else None
+        _transform_api_data(api_response, card_details, set_name_map, lookups)
+        return card_model.compact(card_details)
     else:
         print(f"API returned an error for {card_id}: {api_response.get('msg')}", file=sys.stderr)
         return None
 
-def download_card_image(card_id, image_url):
-    """
-    Downloads the card image for the CHS version.
-    """
-    if not image_url or not card_id: return
-    
-    os.makedirs(CARD_IMG_DIR, exist_ok=True)
+def get_card_image_path(card_id, image_url):
     # The card_id passed in should be the internal format 'SET-NUM'
     internal_card_id = card_id
     file_extension = os.path.splitext(image_url)[1] or '.png'
     if '?' in file_extension: file_extension = file_extension.split('?')[0]
+    return os.path.join(CARD_IMG_DIR, f"{internal_card_id}{file_extension}")
 
-    image_path = os.path.join(CARD_IMG_DIR, f"{internal_card_id}{file_extension}")
-    
-    if not os.path.exists(image_path):
-        try:
-            response = requests.get(image_url, stream=True)
-            response.raise_for_status()
-            with open(image_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+def download_card_image(card_id, image_url, image_pool=None):
+    """
+    Downloads the card image for the CHS version. With an image_pool the download
+    is queued in the background and its future is returned instead.
+    """
+    if not image_url or not card_id: return
+
+    image_path = get_card_image_path(card_id, image_url)
+    if image_pool is not None:
+        return image_pool.submit(card_id, image_url, image_path)
+    import requests
+    import image_variants
+    from image_pool import download_image_file
+
+    try:
+        if download_image_file(image_url, image_path, card_id):
             print(f"Downloaded CHS card image: {os.path.basename(image_path)}", file=sys.stderr)
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading CHS card image {card_id}: {e}", file=sys.stderr)
+            image_variants.generate_variants(image_path)
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"Error downloading CHS card image {card_id}: {e}", file=sys.stderr)
 
-def _core_process_card(card_id, card_database, overwrite=True, html_content=None):
+def _core_process_card(card_id, card_database, overwrite=True, html_content=None, image_pool=None):
     """
     Core processing logic for a single CHS card.
     """
@@ -493,14 +710,19 @@ def _core_process_card(card_id, card_database, overwrite=True, html_content=None
     
     print(f"Processing CHS card ID {card_id}...", file=sys.stderr)
     # get_card_details still uses the original 'SET/NUM' format for the API call
-    card_info = get_card_details(card_id, html_content=html_content)
+    if html_content is None:
+        html_content = fetch_card_page(card_id, revalidate=overwrite)
+    card_info = None
+    if html_content:
+        with telemetry.span('parse', internal_card_id):
+            card_info = get_card_details(card_id, html_content=html_content)
     
     if not card_info or not card_info.get('name'):
         print(f"Could not retrieve or parse information for CHS card ID {card_id}.", file=sys.stderr)
         return card_database.get(internal_card_id), 'failed'
 
     # Use the internal ID for downloading the image
-    download_card_image(internal_card_id, card_info.get('image_url'))
+    download_card_image(internal_card_id, card_info.get('image_url'), image_pool=image_pool)
     return card_info, 'updated'
 
 def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=None, db_instance=None):
@@ -523,6 +745,26 @@ def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=Non
     
     return card_info, status
 
+def add_cards_to_database(card_ids, overwrite=True, db_path=None, workers=None, image_pool=None):
+    """
+    Adds several CHS cards with one database load and one save; the cards are fetched in
+    parallel (see deck_ingest.py). IDs may be 'SET/NUM' or 'SET-NUM'; the results are keyed by
+    the internal 'SET-NUM' form: {card_id: (card_info, status)}.
+    """
+    card_database = load_database(db_path=db_path)
+    results, db_was_updated = ingest_cards(
+        [card_id.replace('/', '-') for card_id in card_ids],
+        lambda card_id: _core_process_card(card_id, card_database, overwrite, image_pool=image_pool),
+        card_database,
+        workers=workers,
+    )
+    # Cards imported earlier while their set was missing from the catalog get its name now.
+    if fill_set_names(card_database, results):
+        db_was_updated = True
+    if db_was_updated:
+        save_database(card_database, db_path=db_path)
+    return results
+
 if __name__ == "__main__":
     print("Fetching latest CHS card pack information...", file=sys.stderr)
     fetch_card_packs()
\ No newline at end of file
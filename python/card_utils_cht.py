@@ -1,4 +1,4 @@
-import sys, os, re, json, time
+import sys, os, re
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,8 +9,8 @@ libs_dir = os.path.join(script_dir, 'libs')
 if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
-import requests
-from bs4 import BeautifulSoup, Tag
+import http_client, card_store, card_model, html_parsing, telemetry
+from deck_ingest import ingest_cards
 
 # Calculate the absolute path of the project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
@@ -57,47 +57,42 @@ EVOLVE_STAGE_MAP = {
     "2階進化": "2 進化"
 }
 
+# The page-level elements get_card_details reads, found in one walk (see html_parsing.first_tags).
+DETAIL_RULES = {
+    'name': ('h1', html_parsing.all_of(html_parsing.has_class('pageHeader'), html_parsing.has_class('cardDetail'))),
+    'image': ('img', html_parsing.inside('cardImage')),
+    'set_name': ('a', html_parsing.inside('expansionLinkColumn')),
+    'card_number': (None, html_parsing.all_of(html_parsing.has_class('collectorNumber'), html_parsing.inside('expansionColumn'))),
+    'set_code': (None, html_parsing.all_of(html_parsing.has_class('alpha'), html_parsing.inside('expansionColumn'))),
+    'author': ('a', html_parsing.inside('illustrator')),
+    'evolve_marker': (None, html_parsing.has_class('evolveMarker')),
+    'skill_header': (None, html_parsing.all_of(html_parsing.has_class('commonHeader'), html_parsing.inside('skillInformation'))),
+    'hp': (None, html_parsing.all_of(html_parsing.has_class('number'), html_parsing.inside('mainInfomation'))),
+    'type_img': ('img', html_parsing.inside('mainInfomation')),
+    'evolution': ('div', html_parsing.has_class('evolution')),
+    'skills[]': (None, html_parsing.all_of(html_parsing.has_class('skill'), html_parsing.inside('skillInformation'))),
+    'sub_info_table': ('table', html_parsing.inside('subInformation')),
+    'effect': (None, html_parsing.all_of(html_parsing.has_class('skillEffect'), html_parsing.inside('skillInformation'))),
+}
+
 def load_database(db_path=None):
     """
-    Loads the card database from a local JSON file.
+    Loads the card database from the card store (see card_store.py).
+    On first use the store is migrated from the existing JSON file.
     """
-    target_path = db_path if db_path else DATABASE_FILE
-    if not os.path.exists(target_path) or os.path.getsize(target_path) == 0:
-        return {}
-    with open(target_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return card_store.load(db_path if db_path else DATABASE_FILE)
 
 def save_database(data, db_path=None):
     """
-    Saves the card database to a local JSON file.
+    Saves the card database: changed cards are upserted into the card store in one
+    transaction and the JSON file the extension reads is exported from it.
     """
     target_path = db_path if db_path else DATABASE_FILE
-    print(f"DEBUG: save_database called. Data keys count: {len(data)}", file=sys.stderr)
-    if not data:
-        print("DEBUG: Data to be saved is empty!", file=sys.stderr)
-        return
-
-    temp_file_path = target_path + '.tmp'
-    print(f"DEBUG: Attempting to save to temporary file: {os.path.abspath(temp_file_path)}", file=sys.stderr)
-    print(f"DEBUG: Target database file: {os.path.abspath(target_path)}", file=sys.stderr)
-
     try:
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-        with open(temp_file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        print(f"DEBUG: Temporary file written. Size: {os.path.getsize(temp_file_path)} bytes.", file=sys.stderr)
-        os.replace(temp_file_path, target_path)
-        print(f"DEBUG: Successfully replaced {os.path.basename(temp_file_path)} with {os.path.basename(target_path)}", file=sys.stderr)
-        time.sleep(1)
-        reloaded_data = load_database(db_path=target_path)
-        print(f"DEBUG: Reloaded database immediately after save. Keys count: {len(reloaded_data)}", file=sys.stderr)
+        card_store.save(data, target_path)
     except Exception as e:
         print(f"ERROR: Failed to save database to {target_path}: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc(file=sys.stderr)
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+
 
 def parse_energy_icons(element):
     """
@@ -106,6 +101,8 @@ def parse_energy_icons(element):
     """
     if not element:
         return ""
+    from bs4 import Tag
+
     text_parts = []
     for content in element.contents:
         if isinstance(content, str):
@@ -117,13 +114,15 @@ def parse_energy_icons(element):
                 text_parts.append(f"【{energy_type}】")
     return "".join(text_parts).strip()
 
-def get_evolution_chain_cht(soup):
+def get_evolution_chain_cht(soup, evolution_div=None):
     """
     Parses the HTML of a card detail page to extract its evolution chain,
-    excluding the immediate parent.
+    excluding the immediate parent. evolution_div is the page's div.evolution when the caller
+    already has it.
     """
     evolves_from = []
-    evolution_div = soup.find('div', class_='evolution')
+    if evolution_div is None:
+        evolution_div = soup.find('div', class_='evolution')
     if not evolution_div:
         return []
 
@@ -153,6 +152,23 @@ def get_evolution_chain_cht(soup):
     
     return evolves_from
 
+def fetch_card_page(card_id, revalidate=False):
+    """
+    Downloads the raw HTML of a card detail page. Returns None on a request error.
+    With revalidate the cached page is always revalidated (an --overwrite run wants fresh data).
+    """
+    import requests  # Only runs for a card that is not in the database
+
+    try:
+        detail_url = f"https://asia.pokemon-card.com/tw/card-search/detail/{card_id}/"
+        with telemetry.span('fetch', card_id):
+            response = http_client.get(detail_url, cache=True, fresh_seconds=0 if revalidate else None)
+        response.raise_for_status()
+        return response.text
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}", file=sys.stderr)
+        return None
+
 def get_card_details(card_id, html_content=None):
     """
     Extracts detailed information from the official Pokémon card website (Traditional Chinese)
@@ -174,25 +190,20 @@ def get_card_details(card_id, html_content=None):
         "author": None
     }
 
-    soup = None
-    if html_content:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    else:
-        try:
-            detail_url = f"https://asia.pokemon-card.com/tw/card-search/detail/{card_id}/"
-            response = requests.get(detail_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}", file=sys.stderr)
+    if html_content is None:
+        html_content = fetch_card_page(card_id)
+        if html_content is None:
             return None
 
+    soup = html_parsing.make_soup(html_content)
+    found = html_parsing.first_tags(soup, DETAIL_RULES)
     if not soup:
         return None
 
     try:
+
         # --- Basic Information ---
-        card_name_element = soup.select_one('h1.pageHeader.cardDetail')
+        card_name_element = found.get('name')
         if card_name_element:
             if card_name_element.contents:
                 card_name = card_name_element.contents[-1].strip()
@@ -200,30 +211,30 @@ def get_card_details(card_id, html_content=None):
                 card_name = card_name_element.get_text(strip=True)
             card_details['name'] = card_name
 
-        image_element = soup.select_one('.cardImage img')
+        image_element = found.get('image')
         if image_element and image_element.get('src'):
             card_details['image_url'] = image_element['src']
 
         # --- Set Information ---
-        expansion_link = soup.select_one('.expansionLinkColumn a')
+        expansion_link = found.get('set_name')
         if expansion_link:
             card_details['set_name'] = expansion_link.get_text(strip=True)
 
-        collector_number_span = soup.select_one('.expansionColumn .collectorNumber')
+        collector_number_span = found.get('card_number')
         if collector_number_span:
             card_details['card_number'] = collector_number_span.get_text(strip=True)
 
-        regulation_mark_span = soup.select_one('.expansionColumn .alpha')
+        regulation_mark_span = found.get('set_code')
         if regulation_mark_span:
             card_details['set_code'] = regulation_mark_span.get_text(strip=True)
 
         # --- Illustrator ---
-        illustrator_link = soup.select_one('.illustrator a')
+        illustrator_link = found.get('author')
         if illustrator_link:
             card_details['author'] = illustrator_link.get_text(strip=True)
 
         # --- Supertype/Subtype Determination ---
-        evolve_marker = soup.select_one('.evolveMarker')
+        evolve_marker = found.get('evolve_marker')
         if evolve_marker:
             card_details['supertype'] = 'pokemon'
             for st in ['ex', 'VSTAR', 'VMAX', 'V']:
@@ -231,7 +242,7 @@ def get_card_details(card_id, html_content=None):
                     card_details['subtype'] = st
                     break
         else:
-            skill_header = soup.select_one('.skillInformation .commonHeader')
+            skill_header = found.get('skill_header')
             if skill_header:
                 header_text = skill_header.get_text(strip=True)
                 if '基本能量卡' in header_text:
@@ -277,11 +288,11 @@ def get_card_details(card_id, html_content=None):
                 card_details['addRule'] = '超級進化寶可夢ex昏厥時，對手獲得3張獎賞卡。'
                 card_details['pokemon']['prize'] = 3
 
-            hp_span = soup.select_one('.mainInfomation .number')
+            hp_span = found.get('hp')
             if hp_span:
                 card_details['pokemon']['hp'] = hp_span.get_text(strip=True)
 
-            type_img = soup.select_one('.mainInfomation img')
+            type_img = found.get('type_img')
             if type_img:
                 type_filename = os.path.basename(type_img['src'])
                 if type_filename in ENERGY_ICON_MAP:
@@ -297,13 +308,13 @@ def get_card_details(card_id, html_content=None):
             if card_name.endswith('VSTAR') or card_name.endswith('VMAX'):
                 card_details['pokemon']['evolves'] = 'V進化'
 
-            evolves_from_list = get_evolution_chain_cht(soup)
+            evolves_from_list = get_evolution_chain_cht(soup, evolution_div=found.get('evolution'))
             if evolves_from_list:
                 card_details['pokemon']['evolvesFrom'] = evolves_from_list
 
             abilities_list = []
             attacks_list = []
-            skills = soup.select('.skillInformation .skill')
+            skills = found['skills[]']
             for skill in skills:
                 name_span = skill.select_one('.skillName')
                 cost_span = skill.select_one('.skillCost')
@@ -355,7 +366,7 @@ def get_card_details(card_id, html_content=None):
             if attacks_list:
                 card_details['pokemon']['attacks'] = attacks_list
 
-            sub_info_table = soup.select_one('.subInformation table')
+            sub_info_table = found.get('sub_info_table')
             if sub_info_table:
                 headers = [th.get_text(strip=True) for th in sub_info_table.select('th')]
                 values = sub_info_table.select('td')
@@ -381,19 +392,19 @@ def get_card_details(card_id, html_content=None):
 
         elif card_details['supertype'] == 'trainer':
             card_details['trainer'] = {}
-            effect_p = soup.select_one('.skillInformation .skillEffect')
+            effect_p = found.get('effect')
             if effect_p:
                 text = effect_p.get_text(separator=' ', strip=True)
                 card_details['trainer']['text'] = ' '.join(text.split())
 
         elif card_details['supertype'] == 'energy' and card_details['subtype'] == 'special energy':
             card_details['energy'] = {}
-            effect_p = soup.select_one('.skillInformation .skillEffect')
+            effect_p = found.get('effect')
             if effect_p:
                 text = effect_p.get_text(separator=' ', strip=True)
                 card_details['energy']['text'] = ' '.join(text.split())
 
-        return card_details
+        return card_model.compact(card_details)
 
     except Exception as e:
         print(f"An unexpected error occurred while parsing card {card_id}: {e}", file=sys.stderr)
@@ -401,37 +412,46 @@ def get_card_details(card_id, html_content=None):
         traceback.print_exc(file=sys.stderr)
         return None
 
-def download_card_image(card_id, image_url, language='cht'):
-    if not image_url:
-        return
+def get_card_image_path(card_id, image_url, language='cht'):
     card_img_dir_name = f"card_img_{language}"
     target_dir = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop', card_img_dir_name)
-    os.makedirs(target_dir, exist_ok=True)
     file_extension = os.path.splitext(image_url)[1] or '.jpg'
-    image_path = os.path.join(target_dir, f"{card_id}{file_extension}")
-    if not os.path.exists(image_path):
-        try:
-            response = requests.get(image_url, stream=True)
-            response.raise_for_status()
-            with open(image_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+    return os.path.join(target_dir, f"{card_id}{file_extension}")
+
+def download_card_image(card_id, image_url, language='cht', image_pool=None):
+    if not image_url:
+        return
+    image_path = get_card_image_path(card_id, image_url, language=language)
+    if image_pool is not None:
+        return image_pool.submit(card_id, image_url, image_path)
+    import requests
+    import image_variants
+    from image_pool import download_image_file
+
+    try:
+        if download_image_file(image_url, image_path, card_id):
             print(f"Downloaded card image: {os.path.basename(image_path)}", file=sys.stderr)
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading card image {card_id}: {e}", file=sys.stderr)
+            image_variants.generate_variants(image_path)
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"Error downloading card image {card_id}: {e}", file=sys.stderr)
 
-def _core_process_card(card_id, card_database, overwrite=True, html_content=None, language='cht'):
+def _core_process_card(card_id, card_database, overwrite=True, html_content=None, language='cht', image_pool=None):
     if not overwrite and card_id in card_database and card_database[card_id].get('name'):
         print(f"Card ID {card_id} already exists, skipping.", file=sys.stderr)
         return card_database[card_id], 'skipped'
     if card_id in card_database and not card_database[card_id].get('name'):
         print(f"Warning: Card ID {card_id} has corrupted data, forcing re-fetch...", file=sys.stderr)
     print(f"Processing card ID {card_id}...", file=sys.stderr)
-    card_info = get_card_details(card_id, html_content=html_content)
+    if html_content is None:
+        html_content = fetch_card_page(card_id, revalidate=overwrite)
+    card_info = None
+    if html_content:
+        with telemetry.span('parse', card_id):
+            card_info = get_card_details(card_id, html_content=html_content)
     if not card_info or not card_info.get('name'):
         print(f"Could not retrieve or parse information for card ID {card_id}.", file=sys.stderr)
         return card_database.get(card_id), 'failed'
-    download_card_image(card_id, card_info.get('image_url'), language=language)
+    download_card_image(card_id, card_info.get('image_url'), language=language, image_pool=image_pool)
     return card_info, 'updated'
 
 def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=None, language='cht'):
@@ -443,3 +463,19 @@ def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=Non
         print(f"Card ID {card_id} has been added/updated in the database.", file=sys.stderr)
         return card_info, True
     return card_info, False
+
+def add_cards_to_database(card_ids, overwrite=True, db_path=None, language='cht', workers=None, image_pool=None):
+    """
+    Adds several cards with one database load and one save; the cards are fetched in parallel
+    (see deck_ingest.py). Returns the ingest_cards() results: {card_id: (card_info, status)}.
+    """
+    card_database = load_database(db_path=db_path)
+    results, db_was_updated = ingest_cards(
+        card_ids,
+        lambda card_id: _core_process_card(card_id, card_database, overwrite, language=language, image_pool=image_pool),
+        card_database,
+        workers=workers,
+    )
+    if db_was_updated:
+        save_database(card_database, db_path=db_path)
+    return results
@@ -1,4 +1,4 @@
-import sys, os, re, json,time, sys
+import sys, os, re
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,8 +9,8 @@ libs_dir = os.path.join(script_dir, 'libs')
 if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
-import requests
-from bs4 import BeautifulSoup
+import http_client, card_store, card_model, html_parsing, telemetry
+from deck_ingest import ingest_cards
 
 # Calculate the absolute path of the project root
 # __file__ is the path of the current script, e.g., /path/to/project/python/card_utils_jp.py
@@ -56,57 +56,45 @@ RARITY_ICON_MAP = {
     # More rarity icons can be added as needed
 }
 
+TRAINER_SUBTYPE_MAP = {'グッズ': 'item', 'サポート': 'supporter', 'スタジアム': 'stadium', 'ポケモンのどうぐ': 'tool'}
+TERASTAL_TEXT = 'このポケモンは、ベンチにいるかぎり、ワザのダメージを受けない。'
+
+# The page-level elements get_card_details reads, found in one walk (see html_parsing.first_tags).
+DETAIL_RULES = {
+    'name': ('h1', html_parsing.has_class('Heading1')),
+    'image': ('img', html_parsing.has_class('fit')),
+    'subtext': ('div', html_parsing.has_class('subtext')),
+    'set_name': ('a', html_parsing.class_is('Link Link-arrow')),
+    'author': ('div', html_parsing.has_class('author')),
+    'top_info': ('div', html_parsing.has_class('TopInfo')),
+    'right_box': (None, html_parsing.has_class('RightBox-inner')),
+    'terastal': ('p', html_parsing.all_of(html_parsing.has_class('mt20'), html_parsing.string_is(TERASTAL_TEXT))),
+    'special_rule': ('h2', html_parsing.string_is('特別なルール')),
+    'weakness': ('th', html_parsing.string_is('弱点')),
+    'rarity': ('img', html_parsing.attr_matches('src', r'ic_rare_.*\.gif')),
+}
+DETAIL_RULES.update({
+    f'trainer:{h2_text}': ('h2', html_parsing.all_of(html_parsing.has_class('mt20'), html_parsing.string_is(h2_text)))
+    for h2_text in TRAINER_SUBTYPE_MAP
+})
+
 def load_database(db_path=None):
     """
-    Loads the card database from a local JSON file.
+    Loads the card database from the card store (see card_store.py).
+    On first use the store is migrated from the existing JSON file.
     """
-    target_path = db_path if db_path else DATABASE_FILE
-    if not os.path.exists(target_path) or os.path.getsize(target_path) == 0:
-        return {}
-    with open(target_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return card_store.load(db_path if db_path else DATABASE_FILE)
 
 def save_database(data, db_path=None):
     """
-    Saves the card database to a local JSON file.
+    Saves the card database: changed cards are upserted into the card store in one
+    transaction and the JSON file the extension reads is exported from it.
     """
     target_path = db_path if db_path else DATABASE_FILE
-    print(f"DEBUG: save_database called. Data keys count: {len(data)}", file=sys.stderr)
-    if not data:
-        print("DEBUG: Data to be saved is empty!", file=sys.stderr)
-        return # Avoid writing an empty file if data is unexpectedly empty
-
-    # Use a temporary file for atomic writing
-    temp_file_path = target_path + '.tmp'
-    print(f"DEBUG: Attempting to save to temporary file: {os.path.abspath(temp_file_path)}", file=sys.stderr)
-    print(f"DEBUG: Target database file: {os.path.abspath(target_path)}", file=sys.stderr)
-
     try:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-        
-        with open(temp_file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        
-        print(f"DEBUG: Temporary file written. Size: {os.path.getsize(temp_file_path)} bytes.", file=sys.stderr)
-
-        # After successful writing, rename the temporary file to the target file
-        os.replace(temp_file_path, target_path)
-        print(f"DEBUG: Successfully replaced {os.path.basename(temp_file_path)} with {os.path.basename(target_path)}", file=sys.stderr)
-        
-        # Immediately try to reload the database to verify the write
-        time.sleep(1) # Give OS a moment to sync
-        reloaded_data = load_database(db_path=target_path)
-        print(f"DEBUG: Reloaded database immediately after save. Keys count: {len(reloaded_data)}", file=sys.stderr)
-
+        card_store.save(data, target_path)
     except Exception as e:
         print(f"ERROR: Failed to save database to {target_path}: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc(file=sys.stderr)
-    finally:
-        # Ensure the temporary file is deleted, even if an error occurs
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
 
 
 def parse_energy_icons(element):
@@ -127,14 +115,16 @@ def parse_energy_icons(element):
                     break
     return "".join(text_parts).strip()
 
-def get_pokemon_evolution_chain(soup, card_name):
+def get_pokemon_evolution_chain(soup, card_name, evolution_section=None):
     """
     Accurately extracts the evolution chain based on HTML structure and evolution arrows.
+    evolution_section is the page's .RightBox-inner when the caller already has it.
     """
     evolves_from = []
     evolves_to = []
 
-    evolution_section = soup.select_one(".RightBox-inner")
+    if evolution_section is None:
+        evolution_section = soup.select_one(".RightBox-inner")
     if not evolution_section:
         return [], []
 
@@ -187,6 +177,23 @@ def get_pokemon_evolution_chain(soup, card_name):
 
     return evolves_from, evolves_to
 
+def fetch_card_page(card_id, revalidate=False):
+    """
+    Downloads the raw HTML of a card detail page. Returns None on a request error.
+    With revalidate the cached page is always revalidated (an --overwrite run wants fresh data).
+    """
+    import requests  # Only runs for a card that is not in the database
+
+    try:
+        detail_url = f"https://www.pokemon-card.com/card-search/details.php/card/{card_id}"
+        with telemetry.span('fetch', card_id):
+            response = http_client.get(detail_url, cache=True, fresh_seconds=0 if revalidate else None)
+        response.raise_for_status()
+        return response.text
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}", file=sys.stderr)
+        return None
+
 def get_card_details(card_id, html_content=None):
     """
     Extracts detailed information from the official Pokémon card website or local HTML detail page.
@@ -207,33 +214,28 @@ def get_card_details(card_id, html_content=None):
         "author": None
     }
     
-    soup = None
-    if html_content:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    else:
-        try:
-            detail_url = f"https://www.pokemon-card.com/card-search/details.php/card/{card_id}"
-            response = requests.get(detail_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}", file=sys.stderr)
+    if html_content is None:
+        html_content = fetch_card_page(card_id)
+        if html_content is None:
             return None
 
+    soup = html_parsing.make_soup(html_content)
+    found = html_parsing.first_tags(soup, DETAIL_RULES)
     if not soup:
         return None
 
     try:
+
         # --- Basic Information ---
-        card_name_element = soup.find('h1', class_='Heading1')
+        card_name_element = found.get('name')
         card_name = card_name_element.get_text(strip=True).strip("' ") if card_name_element else ''
         card_details['name'] = card_name
 
-        image_element = soup.find('img', class_='fit')
+        image_element = found.get('image')
         if image_element and image_element.get('src'):
             card_details['image_url'] = "https://www.pokemon-card.com" + image_element['src']
 
-        subtext_div = soup.find('div', class_='subtext')
+        subtext_div = found.get('subtext')
         if subtext_div:
             set_code_element = subtext_div.find('img', class_='img-regulation')
             if set_code_element and set_code_element.get('alt'):
@@ -244,23 +246,22 @@ def get_card_details(card_id, html_content=None):
             if match:
                 card_details['card_number'] = match.group(1).replace(" ", "").replace("\xa0", "")
 
-        set_name_element = soup.find('a', class_='Link Link-arrow')
+        set_name_element = found.get('set_name')
         if set_name_element:
             card_details['set_name'] = set_name_element.get_text(strip=True)
 
-        author_link = soup.find('div', class_='author').find('a')
+        author_link = found.get('author').find('a')
         if author_link:
             card_details['author'] = author_link.get_text(strip=True)
 
         # --- Card Type Determination ---
-        top_info = soup.find('div', class_='TopInfo')
+        top_info = found.get('top_info')
         if top_info and top_info.find('span', class_='type'):
             card_details['supertype'] = 'pokemon'
         else:
-            trainer_subtype_map = {'グッズ': 'item', 'サポート': 'supporter', 'スタジアム': 'stadium', 'ポケモンのどうぐ': 'tool'}
             found_trainer = False
-            for h2_text, subtype in trainer_subtype_map.items():
-                if soup.find('h2', class_='mt20', string=h2_text):
+            for h2_text, subtype in TRAINER_SUBTYPE_MAP.items():
+                if f'trainer:{h2_text}' in found:
                     card_details['supertype'] = 'trainer'
                     card_details['subtype'] = subtype
                     found_trainer = True
@@ -280,7 +281,7 @@ def get_card_details(card_id, html_content=None):
         # --- Unified Ability and Attack Parsing (placed before weaknesses) ---
         abilities_list = []
         attacks_list = []
-        right_box = soup.select_one(".RightBox-inner")
+        right_box = found.get('right_box')
 
         if right_box:
             abilities_heading = right_box.find('h2', string='特性')
@@ -332,11 +333,11 @@ def get_card_details(card_id, html_content=None):
                 card_details['pokemon']['evolves'] = evolves_text_span.get_text(strip=True).replace("\xa0", " ")
 
             if card_details.get('subtype') == 'ex':
-                if soup.find('p', class_='mt20', string='このポケモンは、ベンチにいるかぎり、ワザのダメージを受けない。'):
+                if 'terastal' in found:
                     card_details['pokemon']['option'] = 'Terastal'
             
             # Robustly find the Mega Evolution rule
-            special_rule_heading = soup.find('h2', string='特別なルール')
+            special_rule_heading = found.get('special_rule')
             if special_rule_heading:
                 next_p = special_rule_heading.find_next_sibling('p')
                 while next_p and not next_p.get_text(strip=True):
@@ -344,7 +345,7 @@ def get_card_details(card_id, html_content=None):
                 if next_p and 'メガシンカexがきぜつしたとき' in next_p.get_text():
                     card_details['pokemon']['option'] = 'Mega'
 
-            evolves_from, evolves_to = get_pokemon_evolution_chain(soup, card_name)
+            evolves_from, evolves_to = get_pokemon_evolution_chain(soup, card_name, evolution_section=right_box)
             if evolves_from:
                 card_details['pokemon']['evolvesFrom'] = evolves_from
             if evolves_to:
@@ -360,7 +361,7 @@ def get_card_details(card_id, html_content=None):
             if attacks_list:
                 card_details['pokemon']['attacks'] = attacks_list
 
-            table = soup.find('th', string='弱点')
+            table = found.get('weakness')
             if table:
                 data_row = table.find_parent('tr').find_next_sibling('tr')
                 tds = data_row.find_all('td')
@@ -394,7 +395,7 @@ def get_card_details(card_id, html_content=None):
                 if text_p: card_details['energy']['text'] = parse_energy_icons(text_p)
 
         # --- Additional Rules & Rarity ---
-        add_rule_heading = soup.find('h2', string='特別なルール')
+        add_rule_heading = found.get('special_rule')
         if add_rule_heading:
             rule_text = add_rule_heading.find_next_sibling('p').get_text(strip=True)
             card_details['addRule'] = rule_text
@@ -409,14 +410,14 @@ def get_card_details(card_id, html_content=None):
                 if prize_match:
                     card_details['pokemon']['prize'] = int(prize_match.group(1))
 
-        rarity_img = soup.find('img', src=re.compile(r'ic_rare_.*\.gif'))
+        rarity_img = found.get('rarity')
         if rarity_img:
             rarity_filename = os.path.basename(rarity_img.get('src', ''))
             card_details['rarity'] = RARITY_ICON_MAP.get(rarity_filename, '')
         elif 'ACE SPEC' in (card_details.get('addRule') or ''):
             card_details['rarity'] = 'ACE'
 
-        return card_details
+        return card_model.compact(card_details)
 
     except Exception as e:
         print(f"An unexpected error occurred while parsing card {card_id}: {e}", file=sys.stderr)
@@ -424,28 +425,35 @@ def get_card_details(card_id, html_content=None):
         traceback.print_exc(file=sys.stderr)
         return None
 
-def download_card_image(card_id, image_url, language='jp'):
-    if not image_url: return
+def get_card_image_path(card_id, image_url, language='jp'):
     # Construct the language-specific directory name
     card_img_dir_name = f"card_img_{language}"
     target_dir = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop', card_img_dir_name)
-
-    os.makedirs(target_dir, exist_ok=True)
     # Infer image format from server URL, default to .jpg as it's most common
     file_extension = os.path.splitext(image_url)[1] or '.jpg'
-    image_path = os.path.join(target_dir, f"{card_id}{file_extension}")
-    if not os.path.exists(image_path):
-        try:
-            response = requests.get(image_url, stream=True)
-            response.raise_for_status()
-            with open(image_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+    return os.path.join(target_dir, f"{card_id}{file_extension}")
+
+def download_card_image(card_id, image_url, language='jp', image_pool=None):
+    """
+    Downloads the card image. With an image_pool the download is queued in the
+    background and its future is returned instead.
+    """
+    if not image_url: return
+    image_path = get_card_image_path(card_id, image_url, language=language)
+    if image_pool is not None:
+        return image_pool.submit(card_id, image_url, image_path)
+    import requests
+    import image_variants
+    from image_pool import download_image_file
+
+    try:
+        if download_image_file(image_url, image_path, card_id):
             print(f"Downloaded card image: {os.path.basename(image_path)}", file=sys.stderr)
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading card image {card_id}: {e}", file=sys.stderr)
+            image_variants.generate_variants(image_path)
+    except (requests.exceptions.RequestException, OSError) as e:
+        print(f"Error downloading card image {card_id}: {e}", file=sys.stderr)
 
-def _core_process_card(card_id, card_database, overwrite=True, html_content=None, language='jp'):
+def _core_process_card(card_id, card_database, overwrite=True, html_content=None, language='jp', image_pool=None):
     if not overwrite and card_id in card_database and card_database[card_id].get('name'):
         print(f"Card ID {card_id} already exists, skipping.", file=sys.stderr)
         return card_database[card_id], 'skipped'
@@ -454,13 +462,18 @@ def _core_process_card(card_id, card_database, overwrite=True, html_content=None
         print(f"Warning: Card ID {card_id} has corrupted data, forcing re-fetch...", file=sys.stderr)
     
     print(f"Processing card ID {card_id}...", file=sys.stderr)
-    card_info = get_card_details(card_id, html_content=html_content)
+    if html_content is None:
+        html_content = fetch_card_page(card_id, revalidate=overwrite)
+    card_info = None
+    if html_content:
+        with telemetry.span('parse', card_id):
+            card_info = get_card_details(card_id, html_content=html_content)
     
     if not card_info or not card_info.get('name'):
         print(f"Could not retrieve or parse information for card ID {card_id}.", file=sys.stderr)
         return card_database.get(card_id), 'failed'
 
-    download_card_image(card_id, card_info.get('image_url'), language=language)
+    download_card_image(card_id, card_info.get('image_url'), language=language, image_pool=image_pool)
     return card_info, 'updated'
 
 def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=None, language='jp'):
@@ -474,3 +487,19 @@ def add_card_to_database(card_id, overwrite=True, html_content=None, db_path=Non
         return card_info, True
     
     return card_info, False
+
+def add_cards_to_database(card_ids, overwrite=True, db_path=None, language='jp', workers=None, image_pool=None):
+    """
+    Adds several cards with one database load and one save; the cards are fetched in parallel
+    (see deck_ingest.py). Returns the ingest_cards() results: {card_id: (card_info, status)}.
+    """
+    card_database = load_database(db_path=db_path)
+    results, db_was_updated = ingest_cards(
+        card_ids,
+        lambda card_id: _core_process_card(card_id, card_database, overwrite, language=language, image_pool=image_pool),
+        card_database,
+        workers=workers,
+    )
+    if db_was_updated:
+        save_database(card_database, db_path=db_path)
+    return results
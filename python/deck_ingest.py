@@ -0,0 +1,83 @@
+import sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import telemetry
+
+# Number of cards processed at the same time. The per-host token buckets in
+# rate_limit.py decide how fast requests actually go out.
+DEFAULT_WORKERS = 4
+
+
+def ingest_cards(card_ids, process_card, card_database, workers=None):
+    """
+    Processes a list of card IDs with a bounded worker pool.
+
+    Args:
+        card_ids (list): Card IDs in deck order. The key used in card_database is the same ID.
+        process_card (callable): Called as process_card(card_id) and returns (card_info, status),
+            the same contract as _core_process_card in the card_utils modules.
+        card_database (dict): The in-memory database. Updated cards are merged into it here,
+            from the calling thread only, so the caller can save it once afterwards.
+        workers (int, optional): Size of the worker pool. Defaults to DEFAULT_WORKERS.
+
+    Returns:
+        tuple: (results, db_was_updated) where results maps each card ID to (card_info, status).
+    """
+    workers = max(1, workers or DEFAULT_WORKERS)
+    card_ids = list(dict.fromkeys(card_ids))
+    total = len(card_ids)
+    results = {}
+    elapsed = {}
+    db_was_updated = False
+
+    def timed(card_id):
+        started = time.perf_counter()
+        try:
+            return process_card(card_id)
+        finally:
+            elapsed[card_id] = telemetry.elapsed_ms(started)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(timed, card_id): card_id for card_id in card_ids}
+        for done, future in enumerate(as_completed(futures), start=1):
+            card_id = futures[future]
+            print(f"--- Processing card {done}/{total}: {card_id} ---", file=sys.stderr)
+            try:
+                card_info, status = future.result()
+            except Exception as e:
+                print(f"Error while processing card ID {card_id}: {e}", file=sys.stderr)
+                card_info, status = card_database.get(card_id), 'failed'
+
+            if status == 'updated':
+                card_database[card_id] = card_info
+                db_was_updated = True
+            results[card_id] = (card_info, status)
+            telemetry.emit('card', card=card_id, done=done, total=total, status=status, ms=elapsed.get(card_id))
+
+    return results, db_was_updated
+
+
+def read_card_ids(card_ids=(), ids_file=None):
+    """
+    Collects card IDs from the command line and from an --ids-file (whitespace-separated,
+    '#' starts a comment, '-' reads stdin). Returns them in order, without duplicates.
+    """
+    ids = [card_id.strip() for card_id in card_ids if card_id and card_id.strip()]
+    if ids_file:
+        if ids_file == '-':
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(ids_file, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        for line in lines:
+            ids.extend(line.split('#', 1)[0].split())
+    return list(dict.fromkeys(ids))
+
+
+def summarize(card_ids, results):
+    """The {"updated": [...], "skipped": [...], "failed": [...]} summary of ingest_cards() results, in card_ids order."""
+    summary = {"updated": [], "skipped": [], "failed": []}
+    for card_id in dict.fromkeys(card_ids):
+        status = results[card_id][1] if card_id in results else 'failed'
+        summary.get(status, summary["failed"]).append(card_id)
+    return summary
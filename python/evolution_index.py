@@ -0,0 +1,110 @@
+import sys, os, json, threading, atexit, argparse
+
+import card_store
+
+# --- Constants and Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+ASSETS_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop')
+# Pokémon name -> name it evolves from (None for Basic Pokémon), learned from every parsed CHS card.
+INDEX_FILE = os.path.join(ASSETS_DIR, 'evolution_index_chs.json')
+
+_lock = threading.Lock()
+_names = None
+_dirty = False
+
+
+def _load():
+    global _names
+    if _names is None:
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                _names = json.load(f).get('names', {})
+        except (OSError, ValueError):
+            _names = {}
+    return _names
+
+
+def lookup(name):
+    """Returns (known, pre_evolution). pre_evolution is None for a known Basic Pokémon."""
+    with _lock:
+        names = _load()
+        if name in names:
+            return True, names[name]
+    return False, None
+
+
+def is_empty():
+    with _lock:
+        return not _load()
+
+
+def record(name, pre_evolution):
+    """Remembers what a Pokémon evolves from. Pass None for a Basic Pokémon."""
+    global _dirty
+    if not name:
+        return
+    with _lock:
+        names = _load()
+        if name not in names or names[name] != pre_evolution:
+            names[name] = pre_evolution
+            _dirty = True
+
+
+def record_card(card):
+    """Records a card in the database format. Non-Pokémon cards are ignored."""
+    pokemon = card.get('pokemon') if card else None
+    if not pokemon or not pokemon.get('evolves'):
+        return
+    evolves_from = pokemon.get('evolvesFrom')
+    record(card.get('name'), evolves_from[0] if evolves_from else None)
+
+
+def save():
+    """Writes the index, merged with whatever other processes wrote meanwhile."""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                on_disk = json.load(f).get('names', {})
+        except (OSError, ValueError):
+            on_disk = {}
+        on_disk.update(_names)
+        os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+        temp_path = f"{INDEX_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"names": on_disk}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, INDEX_FILE)
+            _dirty = False
+        except OSError as e:
+            print(f"Warning: Could not write evolution index: {e}", file=sys.stderr)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+atexit.register(save)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the CHS evolution-family index used for Stage 2 resolution.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Fill the index from a card database file.")
+    rebuild_parser.add_argument("--database-path", type=str, default=os.path.join(ASSETS_DIR, 'database_chs.json'), help="Path to the database JSON file.")
+    lookup_parser = subparsers.add_parser("lookup", help="Print what a Pokémon evolves from.")
+    lookup_parser.add_argument("name")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        database = card_store.read_file(args.database_path)
+        for card in database.values():
+            record_card(card)
+        save()
+        print(f"Evolution index now has {len(_load())} names.")
+    elif args.command == "lookup":
+        known, pre_evolution = lookup(args.name)
+        print(json.dumps({"name": args.name, "known": known, "evolvesFrom": pre_evolution}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import sys, json, re, os, time, argparse
+import sys, json, re, os, argparse
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,8 +10,10 @@ if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
 # -*- coding: utf-8 -*-
-import requests
-from card_utils_chs import add_card_to_database, load_database, save_database
+from card_utils_chs import _core_process_card, load_database, save_database, fetch_card_with_lookups, get_card_details, download_card_image, fill_set_names, CARD_PACKS_LOCK_SECONDS
+from deck_ingest import ingest_cards
+import http_client, rate_limit, import_pipeline, card_store, telemetry
+from image_pool import ImageDownloadPool, finish_and_report, defer
 
 def _identifier_type(identifier):
     """Determines if the identifier is a deckCode, deckId, or a URL."""
@@ -41,12 +43,12 @@ def fetch_deck_by_id(deck_id):
 
 def _fetch_deck_data(url, payload, identifier):
     """Generic function to fetch deck data from a given API endpoint."""
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
-    }
+    import requests
+
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        # Deck lists change, so the cached response is always revalidated; offline it is replayed as-is.
+        with telemetry.span('deck'):
+            response = http_client.post(url, json=payload, cache=True, fresh_seconds=0)
         response.raise_for_status()
         response.encoding = 'utf-8'
         api_response = response.json()
@@ -82,8 +84,18 @@ def main(identifier_arg=None):
     overwrite_group.add_argument("--overwrite", dest="overwrite", action="store_true", help="Force overwrite if card exists in the database (default behavior).")
     overwrite_group.add_argument("--keep", dest="overwrite", action="store_false", help="Skip writing if card exists in the database.")
     parser.set_defaults(overwrite=True)
+    rate_limit.add_arguments(parser)
+    import_pipeline.add_arguments(parser)
+    http_client.add_arguments(parser)
     
     args = parser.parse_args()
+    rate_limit.apply_arguments(args)
+    http_client.apply_arguments(args)
+    card_store.CHANGE_FEED = True  # Saved cards are streamed to the extension as {"cardChanges": ...} lines
+    telemetry.enable()  # Progress and timings go to the extension as {"progress": ...} lines
+    if http_client.OFFLINE:
+        # Offline, cards already in the database are used as they are.
+        args.overwrite = False
 
     identifier = args.identifier
     if not identifier:
@@ -114,6 +126,7 @@ def main(identifier_arg=None):
 
     if card_list_from_api is None:
         print("Could not fetch deck data. Exiting.", file=sys.stderr)
+        http_client.report_offline()
         sys.exit(1)
 
     if not card_list_from_api:
@@ -122,8 +135,8 @@ def main(identifier_arg=None):
 
     # --- Database Update Logic ---
     card_database = load_database(db_path=args.database_path)
-    db_changed = False
-    for i, card in enumerate(card_list_from_api):
+    card_ids = []
+    for card in card_list_from_api:
         set_code = card.get('setCode')
         card_index = card.get('cardIndex')
         
@@ -131,15 +144,29 @@ def main(identifier_arg=None):
             print(f"Skipping a card due to missing setCode or cardIndex: {card}", file=sys.stderr)
             continue
 
-        card_id = f"{set_code}-{card_index}"
-        print(f"--- Processing card {i+1}/{len(card_list_from_api)}: {card_id} ---", file=sys.stderr)
-
-        card_info, status = add_card_to_database(card_id, overwrite=overwrite, db_instance=card_database)
-        
-        if status == 'updated':
-            db_changed = True
-        
-        time.sleep(0.5)
+        card_ids.append(f"{set_code}-{card_index}")
+
+    # Images download in the background so the deck list can be printed as soon as the metadata is ready.
+    image_pool = ImageDownloadPool()
+    if args.pipeline:
+        results, db_changed = import_pipeline.run_pipeline(
+            card_ids,
+            fetch_card_with_lookups,
+            get_card_details,
+            lambda card_id, image_url: download_card_image(card_id, image_url, image_pool=image_pool),
+            card_database,
+            overwrite,
+            concurrency=import_pipeline.parse_concurrency(args.stage_concurrency),
+            parse_processes=args.parse_processes,
+            image_queued=True,
+        )
+    else:
+        results, db_changed = ingest_cards(
+            card_ids,
+            lambda card_id: _core_process_card(card_id, card_database, overwrite, image_pool=image_pool),
+            card_database,
+            workers=args.workers,
+        )
 
     if db_changed:
         print("\nSaving updated database to file...", file=sys.stderr)
@@ -154,10 +181,26 @@ def main(identifier_arg=None):
         for card in card_list_from_api
         if card.get('setCode') and card.get('cardIndex')
     ]
+    missing = [card_id for card_id in card_ids if not (results[card_id][0] or {}).get('name')]
+    if http_client.OFFLINE:
+        # Offline, return the partial deck rather than IDs the graphics have no data for.
+        final_deck_card_ids = [card_id for card_id in final_deck_card_ids if card_id not in missing]
     deck_output = {"cards": final_deck_card_ids}
     
     # Print the final JSON object to stdout for Node.js to capture
-    print(json.dumps(deck_output, ensure_ascii=False))
+    print(json.dumps(deck_output, ensure_ascii=False), flush=True)
+
+    # Cards whose set was not in the catalog were saved without a set name; once the background
+    # refresh it started is done, add the name (the extension gets it through the change feed).
+    change_feed = card_store.CHANGE_FEED
+
+    def finish():
+        if fill_set_names(card_database, card_ids, wait=CARD_PACKS_LOCK_SECONDS):
+            save_database(card_database, db_path=args.database_path, change_feed=change_feed)
+        finish_and_report(image_pool)
+
+    defer(finish)
+    http_client.report_offline(missing)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,4 @@
-import os, re, time, argparse, sys, json
+import os, argparse, sys, json
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,12 +9,13 @@ libs_dir = os.path.join(script_dir, 'libs')
 if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
-import requests
-from bs4 import BeautifulSoup
 # Explicitly import path variables for consistency
-from card_utils_jp import load_database, save_database, _core_process_card
+from card_utils_jp import load_database, save_database, _core_process_card, fetch_card_page, get_card_details, download_card_image
+from deck_ingest import ingest_cards
+import http_client, rate_limit, import_pipeline, card_store, telemetry
+from image_pool import ImageDownloadPool, finish_and_report, defer
 
-def extract_deck_cards(deck_id, overwrite=True, db_path=None, language='jp'):
+def extract_deck_cards(deck_id, overwrite=True, db_path=None, language='jp', workers=None, pipeline=False, stage_concurrency=None, parse_processes=False, image_pool=None, missing=None):
     """
     Extracts all card IDs from a Pokémon deck page and batch updates the database.
 
@@ -30,13 +31,19 @@ def extract_deck_cards(deck_id, overwrite=True, db_path=None, language='jp'):
     deck_list_with_quantity = {}
     all_cards_details = []
     
+    # The deck page is always fetched and parsed, but importing the stacks here keeps --help and argument errors fast.
+    import requests
+    from bs4 import BeautifulSoup
+
     # 1. Load the database once
     card_database = load_database(db_path=db_path)
     db_was_updated = False
 
     try:
         print(f"Extracting card IDs from deck page: {url}...", file=sys.stderr)
-        response = requests.get(url)
+        # Deck lists change, so the cached page is always revalidated; offline it is replayed as-is.
+        with telemetry.span('deck'):
+            response = http_client.get(url, cache=True, fresh_seconds=0)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, 'html.parser')
 
@@ -65,25 +72,38 @@ def extract_deck_cards(deck_id, overwrite=True, db_path=None, language='jp'):
 
         print(f"Found {len(deck_list_with_quantity)} unique cards in the deck.", file=sys.stderr)
 
-        # 2. Process all cards in memory
-        card_list_items = list(deck_list_with_quantity.items())
-        total_cards = len(card_list_items)
-        for i, (card_id, quantity) in enumerate(card_list_items):
-            print(f"--- Processing card {i+1}/{total_cards}: {card_id} ---", file=sys.stderr)
-            card_info, status = _core_process_card(card_id, card_database, overwrite, language=language)
-            
-            if status == 'updated':
-                card_database[card_id] = card_info
-                db_was_updated = True
-
+        # 2. Process all cards in memory with a bounded worker pool
+        card_ids = list(deck_list_with_quantity.keys())
+        if pipeline:
+            results, db_was_updated = import_pipeline.run_pipeline(
+                card_ids,
+                fetch_card_page,
+                get_card_details,
+                lambda card_id, image_url: download_card_image(card_id, image_url, language=language, image_pool=image_pool),
+                card_database,
+                overwrite,
+                concurrency=stage_concurrency,
+                parse_processes=parse_processes,
+                image_queued=image_pool is not None,
+            )
+        else:
+            results, db_was_updated = ingest_cards(
+                card_ids,
+                lambda card_id: _core_process_card(card_id, card_database, overwrite, language=language, image_pool=image_pool),
+                card_database,
+                workers=workers,
+            )
+
+        for card_id in card_ids:
+            card_info, status = results[card_id]
             if card_info and card_info.get('name'):
                 # To avoid polluting the database, we only add ID and quantity to the list returned to the caller
-                card_display_info = {**card_info, "id": card_id, "quantity": quantity}
+                card_display_info = {**card_info, "id": card_id, "quantity": deck_list_with_quantity[card_id]}
                 all_cards_details.append(card_display_info)
             else:
                 print(f"Warning: Failed to process card ID {card_id}. It will not be included in the final list.", file=sys.stderr)
-            
-            time.sleep(0.3)
+                if missing is not None:
+                    missing.append(card_id)
 
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}", file=sys.stderr)
@@ -108,8 +128,18 @@ def main(deck_id_arg=None):
     overwrite_group.add_argument("--overwrite", dest="overwrite", action="store_true", help="Force overwrite if card exists in the database (default behavior).")
     overwrite_group.add_argument("--keep", dest="overwrite", action="store_false", help="Skip writing if card exists in the database.")
     parser.set_defaults(overwrite=True)
+    rate_limit.add_arguments(parser)
+    import_pipeline.add_arguments(parser)
+    http_client.add_arguments(parser)
     
     args = parser.parse_args()
+    rate_limit.apply_arguments(args)
+    http_client.apply_arguments(args)
+    card_store.CHANGE_FEED = True  # Saved cards are streamed to the extension as {"cardChanges": ...} lines
+    telemetry.enable()  # Progress and timings go to the extension as {"progress": ...} lines
+    if http_client.OFFLINE:
+        # Offline, cards already in the database are used as they are.
+        args.overwrite = False
 
     deck_id = args.deck_id or deck_id_arg
     if not deck_id:
@@ -119,14 +149,21 @@ def main(deck_id_arg=None):
             sys.exit(1)
 
     print(f"Extracting all cards for deck ID '{deck_id}' from the website...", file=sys.stderr)
-    cards = extract_deck_cards(deck_id, args.overwrite, db_path=args.database_path)
+    # Images download in the background so the deck list can be printed as soon as the metadata is ready.
+    image_pool = ImageDownloadPool()
+    missing = []
+    cards = extract_deck_cards(
+        deck_id, args.overwrite, db_path=args.database_path, workers=args.workers,
+        pipeline=args.pipeline, stage_concurrency=import_pipeline.parse_concurrency(args.stage_concurrency),
+        parse_processes=args.parse_processes, image_pool=image_pool, missing=missing,
+    )
 
     if cards:
         # The user now wants a unique list of card IDs.
         card_ids_only = [card['id'] for card in cards if 'id' in card]
         
         # To be consistent with other scripts, wrap the list in an object with a "cards" key.
-        print(json.dumps({"cards": card_ids_only}))
+        print(json.dumps({"cards": card_ids_only}), flush=True)
         
         print("Extracted cards:", file=sys.stderr)
         total_cards = 0
@@ -138,8 +175,11 @@ def main(deck_id_arg=None):
             else:
                 print(f"  Incomplete card data detected, skipping display.", file=sys.stderr)
         print(f"A total of {total_cards} cards were extracted.", file=sys.stderr)
+        defer(lambda: finish_and_report(image_pool))
+        http_client.report_offline(missing)
     else:
         print("No cards were extracted or an error occurred.", file=sys.stderr)
+        http_client.report_offline(missing)
         sys.exit(1)
 
 if __name__ == "__main__":
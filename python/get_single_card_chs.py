@@ -1,8 +1,9 @@
-import os, sys, re, time, argparse, json, io
+import os, sys, argparse, json
 
-# Reconfigure stdout and stderr to use UTF-8 encoding
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+# Reconfigure stdout and stderr to use UTF-8 encoding (the import worker's streams are UTF-8 already)
+for stream in (sys.stdout, sys.stderr):
+    if hasattr(stream, 'reconfigure'):
+        stream.reconfigure(encoding='utf-8')
 
 # Get the absolute path of the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,12 +14,15 @@ libs_dir = os.path.join(script_dir, 'libs')
 if libs_dir not in sys.path:
     sys.path.insert(0, libs_dir)
 
-from card_utils_chs import add_card_to_database, get_card_details, save_database, load_database
+from card_utils_chs import add_cards_to_database, get_card_details, save_database, load_database
+from deck_ingest import read_card_ids, summarize
+import http_client, rate_limit, card_store, card_model, telemetry
 
 def main(card_id_arg=None):
-    parser = argparse.ArgumentParser(description="Fetches detailed information for a single Simplified Chinese card and updates the database.")
+    parser = argparse.ArgumentParser(description="Fetches detailed information for one or more Simplified Chinese cards and updates the database once.")
     
-    parser.add_argument("card_id", nargs='?', default=None, help="The ID of the card to fetch (e.g., 'CSV5C/075').")
+    parser.add_argument("card_ids", nargs='*', help="IDs of the cards to fetch (e.g., 'CSV5C/075').")
+    parser.add_argument("--ids-file", type=str, default=None, help="File with more card IDs, one per line or whitespace-separated ('-' reads stdin).")
     parser.add_argument("--database-path", type=str, default=None, help="Path to the CHS database JSON file.")
     
     parser.add_argument(
@@ -32,7 +36,16 @@ def main(card_id_arg=None):
     overwrite_group.add_argument("--keep", dest="overwrite", action="store_false", help="Skip writing if the card exists.")
     
     parser.set_defaults(overwrite=True)
+    rate_limit.add_arguments(parser)
+    http_client.add_arguments(parser)
     args = parser.parse_args()
+    rate_limit.apply_arguments(args)
+    http_client.apply_arguments(args)
+    card_store.CHANGE_FEED = True  # Saved cards are streamed to the extension as {"cardChanges": ...} lines
+    telemetry.enable()  # Progress and timings go to the extension as {"progress": ...} lines
+    if http_client.OFFLINE:
+        # Offline, a card already in the database is used as it is.
+        args.overwrite = False
 
     card_info = None
     updated = False
@@ -42,7 +55,7 @@ def main(card_id_arg=None):
             print(f"Error: File '{args.file}' does not exist.", file=sys.stderr)
             sys.exit(1)
         
-        card_id = args.card_id if args.card_id else "local_test/" + os.path.basename(args.file).split('.')[0]
+        card_id = args.card_ids[0] if args.card_ids else "local_test/" + os.path.basename(args.file).split('.')[0]
 
         print(f"Parsing card from local file '{args.file}' (ID: {card_id})...", file=sys.stderr)
         with open(args.file, 'r', encoding='utf-8') as f:
@@ -64,14 +77,38 @@ def main(card_id_arg=None):
                 print("Card already exists and --keep is set, not updating.", file=sys.stderr)
 
     else:
-        card_id = args.card_id or card_id_arg
-        if not card_id:
+        card_ids = read_card_ids(args.card_ids, args.ids_file)
+        if not card_ids and card_id_arg:
+            card_ids = [str(card_id_arg)]
+        if not card_ids:
             card_id = input("Please enter the Card ID (e.g., CSV5C/075): ")
             if not card_id:
                 print("No Card ID provided. Exiting.", file=sys.stderr)
                 sys.exit(1)
-        
-        card_info, updated = add_card_to_database(str(card_id), args.overwrite, db_path=args.database_path)
+            card_ids = [card_id]
+        # The database keys cards as 'SET-NUM'; the summary reports them the same way.
+        card_ids = list(dict.fromkeys(card_id.replace('/', '-') for card_id in card_ids))
+
+        # One database load and one save for every ID; a batch downloads its images in the background.
+        image_pool = None
+        if len(card_ids) > 1:
+            from image_pool import ImageDownloadPool, finish_and_report, defer
+            image_pool = ImageDownloadPool()
+        results = add_cards_to_database(card_ids, args.overwrite, db_path=args.database_path, workers=args.workers, image_pool=image_pool)
+        summary = summarize(card_ids, results)
+        print(json.dumps({"summary": summary}, ensure_ascii=False), flush=True)
+
+        if image_pool is not None:
+            print(f"{len(summary['updated'])} cards updated, {len(summary['skipped'])} skipped, {len(summary['failed'])} failed.", file=sys.stderr)
+            defer(lambda: finish_and_report(image_pool))
+            if summary["failed"]:
+                http_client.report_offline(summary["failed"])
+                sys.exit(1)
+            return
+
+        card_id = card_ids[0]
+        card_info, status = results[card_id]
+        updated = status == 'updated'
 
     if card_info:
         if updated:
@@ -81,10 +118,11 @@ def main(card_id_arg=None):
         else:
             print("\nCard information already exists in the database (not overwritten):")
         
-        print(json.dumps(card_info, indent=2, ensure_ascii=False))
+        print(json.dumps(card_info, indent=2, ensure_ascii=False, default=card_model.json_default))
 
     else:
         print(f"Failed to process the card.", file=sys.stderr)
+        http_client.report_offline([card_id])
         sys.exit(1)
 
 if __name__ == "__main__":
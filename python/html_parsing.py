@@ -0,0 +1,71 @@
+import re
+
+
+def make_soup(html_content):
+    """Parses a page with Python's html.parser, the tree builder the scripts always used."""
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html_content, 'html.parser')
+
+
+def first_tags(root, rules):
+    """
+    Finds the first tag (in document order) for every rule in one walk over root, instead of
+    one find() / select_one() scan per element. rules maps a key to (tag name or None, predicate);
+    keys without a match are missing from the result. A key ending in '[]' collects every match.
+    """
+    by_name = {}
+    for key, (name, predicate) in rules.items():
+        by_name.setdefault(name, []).append((key, predicate))
+    any_name = by_name.pop(None, [])
+    found = {key: [] for key in rules if key.endswith('[]')}
+    remaining = set(rules) - set(found)
+    collecting = bool(found)
+
+    for tag in root.descendants:
+        if tag.name is None:
+            continue  # A string
+        candidates = by_name.get(tag.name)
+        for key, predicate in (candidates + any_name if candidates else any_name):
+            if key in remaining:
+                if predicate(tag):
+                    found[key] = tag
+                    remaining.discard(key)
+            elif collecting and key.endswith('[]') and predicate(tag):
+                found[key].append(tag)
+        if not remaining and not collecting:
+            break
+    return found
+
+
+# --- Predicates for first_tags(), matching what find() / select_one() match ---
+
+def has_class(cls):
+    """class_='x' / '.x': one of the tag's classes."""
+    return lambda tag: cls in (tag.get('class') or ())
+
+
+def class_is(value):
+    """class_='a b': the whole class attribute."""
+    return lambda tag: ' '.join(tag.get('class') or ()) == value
+
+
+def string_is(value):
+    """string='...': the tag's only string."""
+    return lambda tag: tag.string == value
+
+
+def attr_matches(attr, pattern):
+    """attr=re.compile(...): the attribute contains a match."""
+    pattern = re.compile(pattern)
+    return lambda tag: tag.get(attr) is not None and pattern.search(tag.get(attr)) is not None
+
+
+def inside(cls):
+    """'.x y': the tag has an ancestor with class x."""
+    return lambda tag: any(cls in (parent.get('class') or ()) for parent in tag.parents)
+
+
+def all_of(*predicates):
+    return lambda tag: all(predicate(tag) for predicate in predicates)
+
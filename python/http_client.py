@@ -0,0 +1,222 @@
+import sys, os, json, threading
+from urllib.parse import urlsplit
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import rate_limit, response_cache, telemetry
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+# (connect, read) timeouts in seconds, used when a caller does not pass its own.
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Kept connections per host. Should be at least the size of the deck import worker pool.
+POOL_SIZE = 8
+
+# In offline mode nothing is sent: every request is answered from the response cache
+# (stale entries included) or fails immediately with OfflineError.
+OFFLINE = False
+offline_misses = []
+
+# requests (with urllib3 under it) is the slowest import of a run, so it is only loaded by the
+# first request: a run that finds every card in the database never needs it.
+# OfflineError, a requests.exceptions.ConnectionError, is defined at the same time.
+requests = None
+OfflineError = None
+
+_sessions = {}
+_lock = threading.Lock()
+_import_lock = threading.Lock()
+
+
+def _load_requests():
+    global requests, OfflineError
+    with _import_lock:
+        if requests is None:
+            import requests as module
+
+            class OfflineError(module.exceptions.ConnectionError):
+                """Raised in offline mode for a request that is not in the response cache."""
+
+            requests = module
+    return requests
+
+
+def _new_session():
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = _load_requests().Session()
+    session.headers.update(DEFAULT_HEADERS)
+    # Only retry failures where the request never reached the server or the server is overloaded.
+    # urllib3 retries connection errors for any method, but a 5xx only for idempotent ones
+    # (its default allowed_methods), so a POST is never sent twice once the server has it.
+    retry = Retry(total=2, read=0, backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url):
+    """Returns the shared keep-alive session for the host of url, creating it on first use."""
+    host = urlsplit(url).hostname or ""
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _new_session()
+    return session
+
+
+def add_arguments(parser):
+    """Adds the --offline option to an argparse parser."""
+    parser.add_argument("--offline", action="store_true", help="Do not touch the network: serve everything from the database, response cache and image directories.")
+
+
+def apply_arguments(args):
+    """Applies the options added by add_arguments(). Starts a new run: earlier offline misses are dropped."""
+    global OFFLINE
+    OFFLINE = bool(getattr(args, "offline", False))
+    with _lock:
+        del offline_misses[:]
+
+
+def request(method, url, cache=False, fresh_seconds=None, offline=None, **kwargs):
+    """
+    Sends a request through the pooled session for its host.
+    Applies the per-host rate limit and a default timeout.
+
+    With cache=True the response goes through the on-disk response cache: cached
+    entries are revalidated with If-None-Match / If-Modified-Since, and a 304 or a
+    still-fresh entry is returned without downloading the body again.
+    fresh_seconds overrides how long an entry without validators counts as fresh
+    (0 always revalidates, for pages that change, like deck lists).
+    offline overrides OFFLINE, for work that outlives the run that started it.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if OFFLINE if offline is None else offline:
+        return _offline_request(method, url, **kwargs)
+    if cache and response_cache.ENABLED:
+        return _cached_request(method, url, fresh_seconds=fresh_seconds, **kwargs)
+    rate_limit.throttle(url)
+    response = get_session(url).request(method, url, **kwargs)
+    telemetry.note("none", None if kwargs.get("stream") else len(response.content))
+    return response
+
+
+def _request_url(method, url, params):
+    """The URL the request is actually sent to, so query parameters are part of the cache key."""
+    if not params:
+        return url
+    return _load_requests().Request(method, url, params=params).prepare().url
+
+
+def _offline_request(method, url, **kwargs):
+    body = kwargs.get("json", kwargs.get("data"))
+    full_url = _request_url(method, url, kwargs.get("params"))
+    entry = response_cache.load(response_cache.cache_key(method, full_url, body))
+    if entry:
+        response_cache.stats["offline"] += 1
+        telemetry.note("offline", len(entry[1]))
+        return _response_from_cache(full_url, *entry)
+    with _lock:
+        offline_misses.append(f"{method.upper()} {full_url}" + (f" {json.dumps(body, ensure_ascii=False)}" if body else ""))
+    _load_requests()
+    raise OfflineError(f"Offline mode: {method.upper()} {full_url} is not in the response cache")
+
+
+def _cached_request(method, url, fresh_seconds=None, **kwargs):
+    body = kwargs.get("json", kwargs.get("data"))
+    key = response_cache.cache_key(method, _request_url(method, url, kwargs.get("params")), body)
+    entry = response_cache.load(key)
+    if entry:
+        meta, content = entry
+        if response_cache.is_fresh(meta, fresh_seconds):
+            response_cache.touch(key)
+            response_cache.stats["hit"] += 1
+            telemetry.note("hit", len(content))
+            return _response_from_cache(url, meta, content)
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(response_cache.conditional_headers(meta))
+        kwargs["headers"] = headers
+
+    rate_limit.throttle(url)
+    response = get_session(url).request(method, url, **kwargs)
+    if entry and response.status_code == 304:
+        response_cache.touch(key)
+        response_cache.stats["revalidated"] += 1
+        telemetry.note("revalidated", len(content))
+        return _response_from_cache(url, meta, content)
+
+    response_cache.stats["miss"] += 1
+    telemetry.note("miss", len(response.content))
+    if response.status_code == 200:
+        response_cache.store(key, response_cache.make_meta(method, url, response), response.content)
+    return response
+
+
+def _response_from_cache(url, meta, content):
+    from requests.structures import CaseInsensitiveDict
+
+    response = _load_requests().Response()
+    response.status_code = meta.get("status", 200)
+    response.reason = "OK"
+    response._content = content
+    response.headers = CaseInsensitiveDict({"Content-Type": meta.get("content_type") or ""})
+    response.encoding = meta.get("encoding")
+    response.url = url
+    response.from_cache = True
+    return response
+
+
+def report_offline(missing_cards=()):
+    """
+    In offline mode, lists what could not be served locally: a summary on stderr and an
+    {"offline": ...} JSON line on stdout. Does nothing when online.
+    """
+    if not OFFLINE:
+        return None
+    with _lock:
+        misses = list(dict.fromkeys(offline_misses))
+    summary = {"missing_cards": list(missing_cards), "missing_requests": misses}
+    if summary["missing_cards"] or misses:
+        print(f"Offline mode: {len(summary['missing_cards'])} cards and {len(misses)} requests could not be served locally.", file=sys.stderr)
+        for card_id in summary["missing_cards"]:
+            print(f"  missing card: {card_id}", file=sys.stderr)
+        for miss in misses:
+            print(f"  missing request: {miss}", file=sys.stderr)
+    else:
+        print("Offline mode: everything was served locally.", file=sys.stderr)
+    print(json.dumps({"offline": summary}, ensure_ascii=False), flush=True)
+    return summary
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def close_all():
+    """Closes every pooled session."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
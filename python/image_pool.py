@@ -0,0 +1,153 @@
+import sys, os, json, threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import http_client, image_store, image_variants, telemetry
+
+DEFAULT_WORKERS = 4
+
+# Set by the import worker while it runs a script: defer() hands the end of the import to it,
+# so the worker can answer once the cards are saved and finish the rest in the background.
+DEFER = None
+
+
+def download_image_file(image_url, image_path, card_id=None, offline=None):
+    """
+    Downloads an image to a temporary file next to image_path and moves it into place
+    through the content-addressed image store, so an interrupted download never leaves a
+    truncated image behind and identical images are kept once.
+    An image URL that is already in the store is linked without downloading it again.
+    Returns True if the image was created, False if it already existed.
+    offline overrides http_client.OFFLINE.
+    Raises requests.exceptions.RequestException or OSError on failure.
+    """
+    with telemetry.span('image', card_id) as event:
+        if os.path.exists(image_path):
+            event['cache'] = 'hit'
+            return False
+        if image_store.link_from_url(image_url, image_path):
+            event['cache'] = 'hit'
+            return True
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        temp_path = f"{image_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            response = http_client.get(image_url, stream=True, offline=offline)
+            with response:
+                response.raise_for_status()
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        f.write(chunk)
+                        telemetry.note(size=len(chunk))
+            image_store.store_file(temp_path, image_path, image_url)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        event['cache'] = 'miss'
+        return True
+
+
+class ImageDownloadPool:
+    """
+    Downloads card images on a background worker pool, so card metadata can be
+    returned before the images are done. Requests for an image path that is already being
+    downloaded share the same future instead of starting a second download.
+    Sized variants of each new image are generated on a separate process pool.
+    """
+    def __init__(self, workers=None, variant_processes=None):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers or DEFAULT_WORKERS))
+        self._variants = image_variants.VariantPool(variant_processes)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._url_in_flight = {}
+        self._futures = []
+        # Downloads still running after a worker request keep the mode of the run that queued them.
+        self._offline = http_client.OFFLINE
+        self.downloaded = []
+        self.failed = []
+
+    def submit(self, card_id, image_url, image_path):
+        """Queues a download and returns its future. Existing images complete immediately."""
+        if not image_url:
+            return None
+        if os.path.exists(image_path):
+            future = Future()
+            future.set_result(False)
+            return future
+        # Keyed by path as well: cards that share an image URL each need their own file. The later
+        # ones wait for the download in flight and are linked from the image store.
+        key = (image_url, image_path)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                first = self._url_in_flight.get(image_url)
+                future = self._executor.submit(self._download, card_id, image_url, image_path, first)
+                self._in_flight[key] = future
+                self._url_in_flight.setdefault(image_url, future)
+                self._futures.append(future)
+        return future
+
+    def _download(self, card_id, image_url, image_path, first=None):
+        import requests
+
+        try:
+            if first is not None:
+                wait([first])  # Queued before this one, so it never waits on a task behind it
+            downloaded = download_image_file(image_url, image_path, card_id, offline=self._offline)
+            if downloaded:
+                self.downloaded.append(card_id)
+                print(f"Downloaded card image: {os.path.basename(image_path)}", file=sys.stderr)
+                self._variants.submit(image_path)
+            return downloaded
+        except (requests.exceptions.RequestException, OSError) as e:
+            self.failed.append(card_id)
+            print(f"Error downloading card image {card_id}: {e}", file=sys.stderr)
+            return False
+        finally:
+            with self._lock:
+                future = self._in_flight.pop((image_url, image_path), None)
+                if self._url_in_flight.get(image_url) is future:
+                    del self._url_in_flight[image_url]
+
+    def wait(self):
+        """Waits for every queued download and returns a summary dict."""
+        for future in list(self._futures):
+            future.result()
+        variants = self._variants.wait()
+        return {"downloaded": len(self.downloaded), "failed": list(self.failed), "variants": variants}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self._variants.shutdown()
+
+
+def finish_and_report(pool):
+    """
+    Waits for a pool to drain, then reports image completion separately from the deck output:
+    a summary on stderr and an {"images": ...} JSON line on stdout.
+    """
+    summary = pool.wait()
+    pool.shutdown()
+    image_store.save_manifest()
+    print(f"Card images finished: {summary['downloaded']} downloaded, {len(summary['failed'])} failed.", file=sys.stderr)
+    print(json.dumps({"images": summary}), flush=True)
+    return summary
+
+
+def defer(task):
+    """
+    Runs the end of an import (waiting for its images): right away, or in the background when
+    the import worker has set DEFER. Offline there is no download to wait for, and the offline
+    report printed after it must include the images, so it always runs right away.
+    """
+    if DEFER is None or http_client.OFFLINE:
+        task()
+    else:
+        DEFER(task)
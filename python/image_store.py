@@ -0,0 +1,236 @@
+import sys, os, json, shutil, hashlib, threading, atexit, argparse
+
+# --- Constants and Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+ASSETS_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop')
+# Card images are stored once per content hash here. The per-card files in card_img_<lang>/
+# are hardlinks to these blobs, so the paths the graphics load from do not change.
+BLOB_DIR = os.path.join(ASSETS_DIR, 'card_img_blobs')
+MANIFEST_FILE = os.path.join(BLOB_DIR, 'manifest.json')
+
+ENABLED = True
+
+_lock = threading.Lock()
+_url_map = None
+_dirty = False
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _blob_path(blob_name):
+    return os.path.join(BLOB_DIR, blob_name[:2], blob_name)
+
+
+def _load_url_map():
+    global _url_map
+    if _url_map is None:
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                _url_map = json.load(f).get('urls', {})
+        except (OSError, ValueError):
+            _url_map = {}
+    return _url_map
+
+
+def save_manifest():
+    """Writes the URL -> blob manifest, merged with whatever other processes wrote meanwhile."""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                on_disk = json.load(f).get('urls', {})
+        except (OSError, ValueError):
+            on_disk = {}
+        on_disk.update(_url_map)
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        temp_path = f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"urls": on_disk}, f, ensure_ascii=False)
+            os.replace(temp_path, MANIFEST_FILE)
+            _dirty = False
+        except OSError as e:
+            print(f"Warning: Could not write image store manifest: {e}", file=sys.stderr)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+atexit.register(save_manifest)
+
+
+def _link(blob_path, target_path):
+    """Points target_path at a blob with a hardlink, falling back to a copy if links are not supported."""
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    temp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.link"
+    try:
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            shutil.copyfile(blob_path, temp_path)
+        os.replace(temp_path, target_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def link_from_url(image_url, target_path):
+    """
+    If an image with this URL has been stored before, links it to target_path
+    without downloading it again. Returns True on success.
+    """
+    if not ENABLED or not image_url:
+        return False
+    with _lock:
+        blob_name = _load_url_map().get(image_url)
+    if not blob_name or not os.path.exists(_blob_path(blob_name)):
+        return False
+    _link(_blob_path(blob_name), target_path)
+    return True
+
+
+def store_file(source_path, target_path, image_url=None):
+    """
+    Moves a freshly downloaded file into the store and links it to target_path.
+    Identical bytes already in the store are reused and the source file is discarded.
+    Returns the blob name.
+    """
+    global _dirty
+    if not ENABLED:
+        os.replace(source_path, target_path)
+        return None
+
+    extension = os.path.splitext(target_path)[1].lower()
+    blob_name = _hash_file(source_path) + extension
+    blob_path = _blob_path(blob_name)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    if os.path.exists(blob_path):
+        os.remove(source_path)
+    else:
+        os.replace(source_path, blob_path)
+    _link(blob_path, target_path)
+
+    if image_url:
+        with _lock:
+            _load_url_map()[image_url] = blob_name
+            _dirty = True
+    return blob_name
+
+
+def migrate(image_dirs):
+    """
+    Moves existing card images into the store and replaces them with hardlinks.
+    Returns (files, bytes_saved).
+    """
+    files = bytes_saved = 0
+    for image_dir in image_dirs:
+        if not os.path.isdir(image_dir):
+            print(f"Skipping missing directory: {image_dir}", file=sys.stderr)
+            continue
+        for name in sorted(os.listdir(image_dir)):
+            path = os.path.join(image_dir, name)
+            if not os.path.isfile(path) or name.startswith('.') or name.endswith(('.part', '.tmp', '.link')):
+                continue
+            extension = os.path.splitext(name)[1].lower()
+            blob_path = _blob_path(_hash_file(path) + extension)
+            if os.path.exists(blob_path):
+                if os.path.samefile(blob_path, path):
+                    continue  # Already migrated
+                size = os.path.getsize(path)
+                _link(blob_path, path)
+                if os.path.samefile(blob_path, path):
+                    bytes_saved += size
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                shutil.copyfile(path, blob_path)
+                _link(blob_path, path)
+            files += 1
+    return files, bytes_saved
+
+
+def card_image_dirs():
+    """The per-card image directories (card_img_<lang>/), without the store and the resized variants."""
+    if not os.path.isdir(ASSETS_DIR):
+        return []
+    return [
+        os.path.join(ASSETS_DIR, name) for name in sorted(os.listdir(ASSETS_DIR))
+        if name.startswith('card_img_') and name != os.path.basename(BLOB_DIR) and not name.endswith(('_thumb', '_medium'))
+    ]
+
+
+def collect_garbage(image_dirs=None):
+    """
+    Deletes blobs nothing refers to: neither the URL manifest nor any card image, whether that
+    is a hardlink to the blob or, where links are not supported, a copy of it. The link count
+    alone cannot tell, since copies leave every blob with a single link.
+    Returns (blobs, bytes_freed).
+    """
+    count = freed = 0
+    if not os.path.isdir(BLOB_DIR):
+        return count, freed
+    save_manifest()
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            referenced = set(json.load(f).get('urls', {}).values())
+    except FileNotFoundError:
+        referenced = set()
+    except (OSError, ValueError) as e:
+        print(f"Not collecting garbage, the image store manifest cannot be read: {e}", file=sys.stderr)
+        return count, freed
+
+    candidates = {}
+    for root, _, names in os.walk(BLOB_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            if path == MANIFEST_FILE or name.endswith('.tmp') or name in referenced:
+                continue
+            candidates[name] = (path, os.stat(path))
+    by_inode = {(st.st_dev, st.st_ino): name for name, (_, st) in candidates.items()}
+    sizes = {st.st_size for _, st in candidates.values()}
+
+    for image_dir in card_image_dirs() if image_dirs is None else image_dirs:
+        if not os.path.isdir(image_dir):
+            continue
+        for name in os.listdir(image_dir):
+            path = os.path.join(image_dir, name)
+            if not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            linked = by_inode.get((st.st_dev, st.st_ino))
+            if linked is not None:
+                candidates.pop(linked, None)
+            elif st.st_size in sizes:
+                candidates.pop(_hash_file(path) + os.path.splitext(name)[1].lower(), None)  # A copy
+
+    for name, (path, st) in candidates.items():
+        os.remove(path)
+        count += 1
+        freed += st.st_size
+    return count, freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed card image store shared by all languages.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Move existing card_img_* images into the store and hardlink them back.")
+    migrate_parser.add_argument("dirs", nargs='*', help="Image directories to migrate (defaults to every card_img_* directory).")
+    subparsers.add_parser("gc", help="Delete blobs neither the URL manifest nor any card image refers to.")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        image_dirs = args.dirs or card_image_dirs()
+        files, bytes_saved = migrate(image_dirs)
+        print(f"Migrated {files} images from {len(image_dirs)} directories, saved {bytes_saved / 1024 / 1024:.2f} MiB.")
+    elif args.command == "gc":
+        count, freed = collect_garbage()
+        print(f"Deleted {count} unreferenced blobs ({freed / 1024 / 1024:.2f} MiB).")
+
+
+if __name__ == "__main__":
+    main()
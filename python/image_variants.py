@@ -0,0 +1,204 @@
+import sys, os, json, argparse
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+# --- Constants and Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+ASSETS_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop')
+
+# Target width in pixels of each sized variant. "thumb" is used by board slots and
+# dashboard lists, "medium" by card.html. The original stays in card_img_<lang>/.
+VARIANTS = {
+    "thumb": 240,
+    "medium": 600,
+}
+VARIANT_FORMAT = "WEBP"
+VARIANT_EXTENSION = ".webp"
+VARIANT_QUALITY = 82
+
+DEFAULT_PROCESSES = 2
+
+# PIL.Image, imported by the first available() call: runs that write no image never load Pillow.
+Image = None
+_checked = False
+
+
+def available():
+    """Variants need Pillow. Without it the originals are used everywhere."""
+    global Image, _checked
+    if not _checked:
+        _checked = True
+        try:
+            from PIL import Image
+        except ImportError:
+            print("Warning: Pillow is not installed, card image variants will not be generated.", file=sys.stderr)
+    return Image is not None
+
+
+def variant_dir(image_dir, variant):
+    """card_img_jp -> card_img_jp_thumb"""
+    return f"{image_dir.rstrip(os.sep)}_{variant}"
+
+
+def variant_path(image_path, variant):
+    """Returns where the given variant of an original card image is stored."""
+    card_id = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(variant_dir(os.path.dirname(image_path), variant), f"{card_id}{VARIANT_EXTENSION}")
+
+
+def is_variant_dir(name):
+    return any(name.endswith(f"_{variant}") for variant in VARIANTS)
+
+
+def generate_variants(image_path, force=False):
+    """
+    Writes every sized variant of an original card image. Existing variants newer than
+    the original are kept unless force is set. Returns the list of variants written.
+    Safe to run in a worker process.
+    """
+    if not available() or not os.path.isfile(image_path):
+        return []
+    written = []
+    source_mtime = os.path.getmtime(image_path)
+    image = None
+    try:
+        for variant, width in VARIANTS.items():
+            target_path = variant_path(image_path, variant)
+            if not force and os.path.exists(target_path) and os.path.getmtime(target_path) >= source_mtime:
+                continue
+            if image is None:
+                image = Image.open(image_path)
+                image.load()
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            resized = image
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            temp_path = f"{target_path}.{os.getpid()}.tmp"
+            try:
+                resized.save(temp_path, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+                os.replace(temp_path, target_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            written.append(variant)
+    except OSError as e:
+        print(f"Error generating image variants for {os.path.basename(image_path)}: {e}", file=sys.stderr)
+    finally:
+        if image is not None:
+            image.close()
+    return written
+
+
+class VariantPool:
+    """
+    Generates image variants on a process pool, so resizing does not compete with the
+    download threads for the GIL. The pool is only started when the first image is submitted.
+    """
+    def __init__(self, processes=None):
+        self._processes = max(1, processes or DEFAULT_PROCESSES)
+        self._executor = None
+        self._futures = []
+
+    def submit(self, image_path):
+        if not available():
+            return None
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor  # Pulls in multiprocessing, so only once an image needs it
+            self._executor = ProcessPoolExecutor(max_workers=self._processes)
+        future = self._executor.submit(generate_variants, image_path)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Waits for every submitted image and returns the number of variant files written."""
+        count = 0
+        for future in self._futures:
+            try:
+                count += len(future.result())
+            except Exception as e:
+                print(f"Error generating image variants: {e}", file=sys.stderr)
+        self._futures = []
+        return count
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def lookup(card_id, language, size):
+    """
+    Returns the asset path (relative to the NodeCG root) of the best available image for a card:
+    the requested variant if it exists, otherwise the original. Returns None if there is no image.
+    """
+    image_dir_name = f"card_img_{language}"
+    if size in VARIANTS:
+        candidate = os.path.join(variant_dir(os.path.join(ASSETS_DIR, image_dir_name), size), f"{card_id}{VARIANT_EXTENSION}")
+        if os.path.exists(candidate):
+            return f"assets/ptcg-telop/{image_dir_name}_{size}/{card_id}{VARIANT_EXTENSION}"
+    image_dir = os.path.join(ASSETS_DIR, image_dir_name)
+    if os.path.isdir(image_dir):
+        for name in os.listdir(image_dir):
+            if os.path.splitext(name)[0] == card_id:
+                return f"assets/ptcg-telop/{image_dir_name}/{name}"
+    return None
+
+
+def backfill(image_dirs, processes=None, force=False):
+    """Generates missing variants for every original in image_dirs. Returns (images, variants written)."""
+    image_paths = []
+    for image_dir in image_dirs:
+        if not os.path.isdir(image_dir):
+            print(f"Skipping missing directory: {image_dir}", file=sys.stderr)
+            continue
+        for name in sorted(os.listdir(image_dir)):
+            path = os.path.join(image_dir, name)
+            if os.path.isfile(path) and not name.startswith('.') and not name.endswith(('.part', '.tmp', '.link')):
+                image_paths.append(path)
+    if not image_paths or not available():
+        return len(image_paths), 0
+    from concurrent.futures import ProcessPoolExecutor
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=max(1, processes or os.cpu_count() or DEFAULT_PROCESSES)) as executor:
+        for done, variants in enumerate(executor.map(generate_variants, image_paths, [force] * len(image_paths), chunksize=8), 1):
+            written += len(variants)
+            if done % 100 == 0:
+                print(f"--- Processed {done}/{len(image_paths)} images ---", file=sys.stderr)
+    return len(image_paths), written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and look up sized variants (thumb/medium) of the card images.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser("backfill", help="Generate missing variants for existing card images.")
+    backfill_parser.add_argument("--lang", action="append", choices=["jp", "chs", "cht"], help="Language to backfill (repeatable, defaults to all).")
+    backfill_parser.add_argument("--processes", type=int, default=None, help="Number of worker processes (defaults to the CPU count).")
+    backfill_parser.add_argument("--force", action="store_true", help="Regenerate variants that are already up to date.")
+    lookup_parser = subparsers.add_parser("lookup", help="Print the best available image path for a card as JSON.")
+    lookup_parser.add_argument("lang", choices=["jp", "chs", "cht"])
+    lookup_parser.add_argument("card_id")
+    lookup_parser.add_argument("size", nargs='?', default="original", choices=["original", *VARIANTS])
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        languages = args.lang or ["jp", "chs", "cht"]
+        image_dirs = [os.path.join(ASSETS_DIR, f"card_img_{lang}") for lang in languages]
+        images, written = backfill(image_dirs, processes=args.processes, force=args.force)
+        print(f"Checked {images} images, wrote {written} variant files.")
+    elif args.command == "lookup":
+        print(json.dumps({"id": args.card_id, "size": args.size, "path": lookup(args.card_id, args.lang, args.size)}))
+
+
+if __name__ == "__main__":
+    main()
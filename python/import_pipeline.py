@@ -0,0 +1,205 @@
+import sys, time, asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import telemetry
+
+# Workers per stage. Fetch and image are network bound, parse is CPU bound.
+DEFAULT_CONCURRENCY = {
+    "fetch": 4,
+    "parse": 2,
+    "image": 4,
+}
+STAGES = ("fetch", "parse", "image", "persist")
+
+
+def parse_concurrency(value):
+    """
+    Parses a '--stage-concurrency' value such as 'fetch=6,parse=2,image=4'.
+    """
+    concurrency = dict(DEFAULT_CONCURRENCY)
+    if not value:
+        return concurrency
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        stage, _, count = part.partition('=')
+        stage = stage.strip()
+        if stage not in DEFAULT_CONCURRENCY:
+            raise ValueError(f"Unknown pipeline stage '{stage}'. Expected one of: {', '.join(DEFAULT_CONCURRENCY)}.")
+        concurrency[stage] = max(1, int(count))
+    return concurrency
+
+
+def add_arguments(parser):
+    """Adds the --pipeline options to an argparse parser."""
+    parser.add_argument("--pipeline", action="store_true", help="Import cards with the staged asyncio pipeline (fetch, parse, image, persist).")
+    parser.add_argument("--stage-concurrency", type=str, default=None, help="Workers per pipeline stage, e.g. 'fetch=4,parse=2,image=4'.")
+    parser.add_argument("--parse-processes", action="store_true", help="Run the pipeline parse stage in a process pool instead of threads.")
+
+
+class _StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.first_start = None
+        self.last_end = None
+
+    def record(self, started, ended):
+        self.count += 1
+        self.busy += ended - started
+        if self.first_start is None or started < self.first_start:
+            self.first_start = started
+        if self.last_end is None or ended > self.last_end:
+            self.last_end = ended
+
+    def summary(self):
+        wall = (self.last_end - self.first_start) if self.count else 0.0
+        rate = self.count / wall if wall > 0 else 0.0
+        return f"  {self.name:<8} {self.count:>4} items  busy {self.busy:7.2f}s  active {wall:6.2f}s  {rate:6.1f} items/s"
+
+
+def _start_stage(name, inbox, outbox, handler, workers, stats):
+    async def worker():
+        while True:
+            job = await inbox.get()
+            try:
+                started = time.perf_counter()
+                try:
+                    await handler(job)
+                except Exception as e:
+                    print(f"Pipeline {name} stage failed for card ID {job['id']}: {e}", file=sys.stderr)
+                    job['status'] = 'failed'
+                stats[name].record(started, time.perf_counter())
+                if outbox is not None:
+                    # Blocks when the next stage is full, which throttles this stage (backpressure).
+                    await outbox.put(job)
+            finally:
+                inbox.task_done()
+
+    return [asyncio.create_task(worker()) for _ in range(workers)]
+
+
+async def _run(card_ids, fetch_page, parse_page, download_image, card_database, overwrite, concurrency, parse_processes, image_queued):
+    loop = asyncio.get_running_loop()
+    concurrency = concurrency or dict(DEFAULT_CONCURRENCY)
+    # A download_image that only queues the download needs no stage of its own.
+    stages = tuple(name for name in STAGES if not (image_queued and name == "image"))
+    stats = {name: _StageStats(name) for name in stages}
+    total = len(card_ids)
+    results = {}
+    state = {"done": 0, "updated": False}
+
+    queues = {name: asyncio.Queue(maxsize=concurrency.get(name, 1) * 2) for name in stages}
+
+    fetch_executor = ThreadPoolExecutor(max_workers=concurrency["fetch"])
+    image_executor = ThreadPoolExecutor(max_workers=concurrency["image"])
+    parse_executor_class = ProcessPoolExecutor if parse_processes else ThreadPoolExecutor
+    parse_executor = parse_executor_class(max_workers=concurrency["parse"])
+
+    async def fetch(job):
+        existing = card_database.get(job['id'])
+        if not overwrite and existing and existing.get('name'):
+            print(f"Card ID {job['id']} already exists, skipping.", file=sys.stderr)
+            job['info'], job['status'] = existing, 'skipped'
+            return
+        if existing is not None and not existing.get('name'):
+            print(f"Warning: Card ID {job['id']} has corrupted data, forcing re-fetch...", file=sys.stderr)
+        job['raw'] = await loop.run_in_executor(fetch_executor, fetch_page, job['id'], overwrite)
+        if not job['raw']:
+            # An empty body is a failed fetch here; the parse stage never goes to the network.
+            if job['raw'] is not None:
+                print(f"Empty response for card ID {job['id']}.", file=sys.stderr)
+            job['status'] = 'failed'
+
+    async def parse(job):
+        if job['status'] is not None:
+            return
+        started = time.perf_counter()
+        job['info'] = await loop.run_in_executor(parse_executor, parse_page, job['id'], job.pop('raw'))
+        telemetry.emit('parse', card=job['id'], ms=telemetry.elapsed_ms(started))
+        if not job['info'] or not job['info'].get('name'):
+            print(f"Could not retrieve or parse information for card ID {job['id']}.", file=sys.stderr)
+            job['status'] = 'failed'
+        elif image_queued:
+            download_image(job['id'], job['info'].get('image_url'))
+            job['status'] = 'updated'
+
+    async def image(job):
+        if job['status'] is not None:
+            return
+        await loop.run_in_executor(image_executor, download_image, job['id'], job['info'].get('image_url'))
+        job['status'] = 'updated'
+
+    async def persist(job):
+        state["done"] += 1
+        print(f"--- Processing card {state['done']}/{total}: {job['id']} ---", file=sys.stderr)
+        telemetry.emit('card', card=job['id'], done=state['done'], total=total, status=job['status'], ms=telemetry.elapsed_ms(job['started']))
+        if job['status'] == 'updated':
+            card_database[job['id']] = job['info']
+            state["updated"] = True
+        elif job['status'] == 'failed':
+            job['info'] = card_database.get(job['id'])
+        results[job['id']] = (job['info'], job['status'])
+
+    handlers = {"fetch": fetch, "parse": parse, "image": image, "persist": persist}
+    workers = dict(concurrency, persist=1)
+    tasks = []
+    for index, name in enumerate(stages):
+        outbox = queues[stages[index + 1]] if index + 1 < len(stages) else None
+        tasks += _start_stage(name, queues[name], outbox, handlers[name], workers[name], stats)
+
+    started = time.perf_counter()
+    try:
+        for card_id in card_ids:
+            await queues["fetch"].put({"id": card_id, "raw": None, "info": None, "status": None, "started": time.perf_counter()})
+        for name in stages:
+            await queues[name].join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        fetch_executor.shutdown(wait=False)
+        image_executor.shutdown(wait=False)
+        parse_executor.shutdown(wait=False)
+
+    elapsed = time.perf_counter() - started
+    print(f"Pipeline finished {total} cards in {elapsed:.2f}s. Per-stage throughput:", file=sys.stderr)
+    for name in stages:
+        print(stats[name].summary(), file=sys.stderr)
+
+    return results, state["updated"]
+
+
+def run_pipeline(card_ids, fetch_page, parse_page, download_image, card_database, overwrite=True, concurrency=None, parse_processes=False,
+                 image_queued=False):
+    """
+    Imports cards through a staged asyncio pipeline: fetch -> parse -> image -> persist.
+
+    Each stage has its own workers and is connected to the next one by a bounded queue,
+    so image downloads of one card overlap with detail fetches and parsing of the next.
+    With image_queued, download_image only queues the download (an ImageDownloadPool that
+    keeps running after the pipeline); there is no image stage, and each image is queued as
+    soon as its card is parsed.
+    Blocking network calls and parsing run in executors, off the event loop.
+    The persist stage merges updated cards into card_database; the caller saves it once.
+
+    Args:
+        card_ids (list): Card IDs in deck order; also the database keys.
+        fetch_page (callable): fetch_page(card_id, revalidate) -> raw page text or None; revalidate
+            (set with overwrite) asks for a fresh copy instead of a cached one.
+        parse_page (callable): parse_page(card_id, raw) -> card_info dict or None. It must not
+            go to the network; lookups belong in fetch_page, which runs in this process under its
+            rate limits. Must be a module-level function when parse_processes is True.
+        download_image (callable): download_image(card_id, image_url).
+        card_database (dict): The in-memory database.
+        overwrite (bool): Whether to re-fetch cards that already exist in the database.
+        concurrency (dict, optional): Workers per stage, see DEFAULT_CONCURRENCY.
+        parse_processes (bool): Run the parse stage in a process pool.
+        image_queued (bool): download_image returns at once and the download finishes later.
+
+    Returns:
+        tuple: (results, db_was_updated), the same shape as deck_ingest.ingest_cards().
+    """
+    card_ids = list(dict.fromkeys(card_ids))
+    return asyncio.run(_run(card_ids, fetch_page, parse_page, download_image, card_database, overwrite, concurrency, parse_processes, image_queued))
@@ -0,0 +1,345 @@
+import sys, os, io, json, time, threading, importlib, argparse, traceback
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_store, card_model, http_client, rate_limit, telemetry, image_pool
+
+# Long-lived import worker: one process serves every import, so requests/bs4, the pooled HTTP
+# sessions, the response cache, rate-limit buckets and the parsers' caches stay warm between
+# clicks instead of being rebuilt by a fresh python per import.
+#
+# Protocol: line-delimited JSON-RPC 2.0 over stdin/stdout, one request at a time.
+#   -> {"jsonrpc": "2.0", "id": 1, "method": "deck", "params": {"language": "jp", "args": ["<code>", "--database-path", "..."], "deadline": 1760000000000}}
+#   <- {"jsonrpc": "2.0", "method": "started", "params": {"id": 1}}
+#   <- {"jsonrpc": "2.0", "method": "output", "params": {"id": 1, "message": {"cardChanges": ...}}}   every JSON line the script prints, {"progress": ...} events (telemetry.py) included
+#   <- {"jsonrpc": "2.0", "method": "log", "params": {"id": 1, "line": "Processing card ID 45123..."}}   its stderr
+#   <- {"jsonrpc": "2.0", "id": 1, "result": {"exitCode": 0}}
+# A deck or card import answers as soon as its cards are saved. If it still has images to finish,
+# the result says "background": true; their output keeps coming tagged with the request id, and
+#   <- {"jsonrpc": "2.0", "method": "finished", "params": {"id": 1, "exitCode": 0}}
+# follows once they are done. The worker takes the next request meanwhile.
+# deck and card take the same arguments as the extract_deck_cards_* / get_single_card_* scripts.
+# deadline (optional, Unix time in ms) is when the caller stops waiting for the request to start:
+# a request still queued behind a slow one at that point gets an EXPIRED error instead of running,
+# since the caller has already run the script itself.
+
+PROTOCOL_VERSION = 1
+
+SCRIPTS = {
+    "deck": "extract_deck_cards_{}",
+    "card": "get_single_card_{}",
+}
+LANGUAGES = ("jp", "cht", "chs")
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+EXPIRED = -32001
+
+# Module settings the scripts change for their own run (--offline, --rate-limit, the change feed,
+# telemetry). The worker puts them back after every request, so none of them leak into the next.
+MODULE_STATE = (
+    (card_store, ("CHANGE_FEED",)),
+    (http_client, ("OFFLINE",)),
+    (telemetry, ("ENABLED", "_pid")),
+)
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class _RequestStream:
+    """
+    Replaces sys.stdout / sys.stderr while the worker runs. Complete lines written during a
+    request are sent as notifications tagged with its id; stdout lines that are not JSON
+    objects (progress chatter, pretty-printed cards) are only logged, so stdout stays protocol-only.
+    Lines are buffered per thread, so a request finishing in the background never splices
+    its output into the next one's.
+    """
+    def __init__(self, worker, kind):
+        self._worker = worker
+        self._kind = kind
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', '') + text
+        lines = buffer.split('\n')
+        self._local.buffer = lines.pop()
+        for line in lines:
+            self._worker.forward(self._kind, line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    @property
+    def encoding(self):
+        return 'utf-8'
+
+
+class ImportWorker:
+    def __init__(self, output, errors):
+        self._output = output
+        self._errors = errors
+        self._write_lock = threading.Lock()
+        self._request_id = None
+        self._local = threading.local()
+        self._background = []
+        self._databases = {}
+
+    def send(self, message):
+        line = json.dumps(dict(jsonrpc="2.0", **message), ensure_ascii=False, default=card_model.json_default)
+        with self._write_lock:
+            self._output.write(line + '\n')
+            self._output.flush()
+
+    def forward(self, kind, line):
+        if not line.strip():
+            return
+        # A thread finishing a request in the background reports for that request.
+        request_id = getattr(self._local, 'request_id', self._request_id)
+        if kind == 'stdout':
+            message = None
+            if line.lstrip().startswith('{'):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    pass
+            if isinstance(message, dict) and request_id is not None:
+                self.send({"method": "output", "params": {"id": request_id, "message": message}})
+                return
+        if request_id is not None:
+            self.send({"method": "log", "params": {"id": request_id, "line": line}})
+        else:
+            self._errors.write(line + '\n')
+            self._errors.flush()
+
+    # --- Methods ---
+
+    def run_script(self, method, params):
+        language = params.get("language", "jp")
+        if language not in LANGUAGES:
+            raise RpcError(INVALID_PARAMS, f"Unsupported language: {language}")
+        args = params.get("args")
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            raise RpcError(INVALID_PARAMS, "args must be a list of strings")
+        return self._run_main(SCRIPTS[method].format(language), args)
+
+    def lookup(self, params):
+        """Reads cards straight from the store; the lazy database is reused until the store changes."""
+        json_path = params.get("databasePath")
+        ids = params.get("ids")
+        if not json_path or not isinstance(ids, list):
+            raise RpcError(INVALID_PARAMS, "lookup needs databasePath and a list of ids")
+        signature = _store_signature(json_path)
+        cached = self._databases.get(json_path)
+        if cached is None or cached[0] != signature:
+            cached = self._databases[json_path] = (signature, card_store.load(json_path))
+        database = cached[1]
+        return {"cards": {str(card_id): database.get(str(card_id)) for card_id in ids}}
+
+    def warm(self, params):
+        args = params.get("args")
+        if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args):
+            raise RpcError(INVALID_PARAMS, "args must be a list of strings")
+        return self._run_main("warm_cache", args)
+
+    def preload(self, params):
+        """Imports the scripts of a language ahead of the first import."""
+        languages = params.get("languages") or [params.get("language", "jp")]
+        loaded = []
+        for language in languages:
+            if language in LANGUAGES:
+                for template in SCRIPTS.values():
+                    importlib.import_module(template.format(language))
+                loaded.append(language)
+        if loaded:
+            # The scripts only import these on their first fetch; the worker pays for them up front.
+            for name in ("requests", "bs4"):
+                importlib.import_module(name)
+        return {"pid": os.getpid(), "protocol": PROTOCOL_VERSION, "languages": loaded}
+
+    def _run_main(self, module_name, args):
+        """Runs a script's main() in this process, as if it had been started with args."""
+        module = importlib.import_module(module_name)
+        saved_argv, saved_stdin = sys.argv, sys.stdin
+        saved_state = _save_state()
+        sys.argv = [module.__file__] + args
+        # stdin carries the protocol; a script that prompts or reads "-" sees an empty input instead.
+        sys.stdin = io.StringIO()
+        # What the script hands to image_pool.defer() (waiting for its images) runs after the answer.
+        deferred = []
+        image_pool.DEFER = deferred.append
+        exit_code = 0
+        try:
+            module.main()
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.argv, sys.stdin = saved_argv, saved_stdin
+            image_pool.DEFER = None
+            _restore_state(saved_state)
+            self._flush_indexes()
+        result = {"exitCode": exit_code}
+        if deferred:
+            self._finish_in_background(self._request_id, deferred)
+            result["background"] = True
+        return result
+
+    def _finish_in_background(self, request_id, tasks):
+        def run():
+            self._local.request_id = request_id
+            exit_code = 0
+            for task in tasks:
+                try:
+                    task()
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+            self._flush_indexes()
+            if request_id is not None:
+                self.send({"method": "finished", "params": {"id": request_id, "exitCode": exit_code}})
+
+        self._background = [thread for thread in self._background if thread.is_alive()]
+        thread = threading.Thread(target=run, name=f"import-worker-finish-{request_id}")
+        thread.start()
+        self._background.append(thread)
+
+    def wait_background(self):
+        """Waits for the requests still finishing in the background."""
+        for thread in self._background:
+            thread.join()
+        self._background = []
+
+    def _flush_indexes(self):
+        # Normally written at exit; a worker runs for hours, so write them after every request.
+        image_store = sys.modules.get("image_store")
+        if image_store is not None:
+            image_store.save_manifest()
+        evolution_index = sys.modules.get("evolution_index")
+        if evolution_index is not None:
+            evolution_index.save()
+
+    # --- Dispatch ---
+
+    def handle(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.send({"id": None, "error": {"code": PARSE_ERROR, "message": str(e)}})
+            return True
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            self.send({"id": request.get("id") if isinstance(request, dict) else None,
+                       "error": {"code": INVALID_REQUEST, "message": "Invalid request"}})
+            return True
+
+        request_id = request.get("id")
+        method = request["method"]
+        params = request.get("params") or {}
+        if method == "shutdown":
+            self.send({"id": request_id, "result": None})
+            return False
+
+        started = time.perf_counter()
+        self._request_id = request_id
+        try:
+            deadline = params.get("deadline")
+            if isinstance(deadline, (int, float)) and time.time() * 1000 > deadline:
+                raise RpcError(EXPIRED, "The request expired before the worker could start it")
+            if request_id is not None:
+                self.send({"method": "started", "params": {"id": request_id}})
+            if method in SCRIPTS:
+                result = self.run_script(method, params)
+            elif method == "lookup":
+                result = self.lookup(params)
+            elif method == "warm":
+                result = self.warm(params)
+            elif method == "preload":
+                result = self.preload(params)
+            else:
+                raise RpcError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+            response = {"id": request_id, "result": result}
+        except RpcError as e:
+            response = {"id": request_id, "error": {"code": e.code, "message": str(e)}}
+        except Exception as e:
+            traceback.print_exc()
+            response = {"id": request_id, "error": {"code": INTERNAL_ERROR, "message": f"{type(e).__name__}: {e}"}}
+        finally:
+            sys.stdout.flush()
+            self._request_id = None
+        self._errors.write(f"[import_worker] {method} #{request_id} took {(time.perf_counter() - started) * 1000:.0f} ms\n")
+        self._errors.flush()
+        if request_id is not None:
+            self.send(response)
+        return True
+
+
+def _save_state():
+    state = [(module, name, getattr(module, name)) for module, names in MODULE_STATE for name in names]
+    return state, rate_limit.limits()
+
+
+def _restore_state(saved):
+    state, limits = saved
+    for module, name, value in state:
+        setattr(module, name, value)
+    rate_limit.restore_limits(limits)
+
+
+def _store_signature(json_path):
+    """Changes whenever any process writes the database (the SQLite WAL, the journal, or the files)."""
+    paths = [json_path, card_store.store_path(json_path), card_store.store_path(json_path) + '-wal', card_store.journal_path(json_path)]
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve deck imports, single cards, lookups and warm-ups over line-delimited JSON-RPC on stdin/stdout.")
+    parser.add_argument("--preload", action="append", default=[], help="Import the scripts of a language at startup (repeatable, unsupported languages are ignored).")
+    args = parser.parse_args()
+
+    output, errors = sys.stdout, sys.stderr
+    worker = ImportWorker(output, errors)
+    # Nothing but protocol messages may reach the real stdout from here on.
+    sys.stdout = _RequestStream(worker, 'stdout')
+    sys.stderr = _RequestStream(worker, 'stderr')
+    if args.preload:
+        worker.preload({"languages": args.preload})
+    print(f"[import_worker] ready (pid {os.getpid()})", file=errors, flush=True)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        if not worker.handle(line):
+            break
+    worker.wait_background()
+    sys.stdout, sys.stderr = output, errors
+
+
+if __name__ == "__main__":
+    main()
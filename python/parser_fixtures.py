@@ -0,0 +1,423 @@
+import sys, os, gc, json, time, zlib, shutil, random, argparse, tempfile, subprocess, tracemalloc
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_model, http_client, evolution_index
+import card_utils_jp, card_utils_cht, card_utils_chs
+
+# Parser fixture corpus: JP / CHT detail pages and CHS card-detail API responses, each with the
+# card_details get_card_details must produce for it (<name>.golden.json). `check` is the
+# regression check for parser changes, `bench` measures cards/s and memory per parser.
+#
+#   fixtures/parsers/manifest.json          {lang: {name: {"card_id", "source", "golden"}}, "chs_context": {...}}
+#   fixtures/parsers/<lang>/<name>.html     JP / CHT page (.json for CHS)
+#   fixtures/parsers/<lang>/<name>.golden.json
+#
+# "source" is "synthesized" for fixtures built by `synthesize` (the markup get_card_details reads,
+# see bench_html_parser.py) or "saved <date>" for responses downloaded with `add`.
+# Goldens written by the parsers under test only show they agree with themselves, so they are
+# written from a reference checkout instead (`update --reference <dir>`, e.g. a `git worktree` of the
+# original scripts); "golden" records which. `check` warns while a golden has no reference
+# or a language has no saved page for a card family (FAMILIES, the golden's supertype), and fails
+# on that too with --require-saved.
+
+FIXTURES_DIR = os.path.join(script_dir, 'fixtures', 'parsers')
+MANIFEST_FILE = os.path.join(FIXTURES_DIR, 'manifest.json')
+
+LANGUAGES = ("jp", "cht", "chs")
+FAMILIES = ("pokemon", "trainer", "energy")
+MODULES = {"jp": card_utils_jp, "cht": card_utils_cht, "chs": card_utils_chs}
+EXTENSIONS = {"jp": ".html", "cht": ".html", "chs": ".json"}
+
+SYNTHESIZED_KINDS = {
+    "jp": ("pokemon", "ex", "ex_terastal", "mega", "item", "supporter", "stadium", "tool", "tm", "ace", "special", "basic", "fossil"),
+    "cht": ("pokemon", "ex", "ex_terastal", "mega", "vstar", "item", "supporter", "stadium", "tool", "tm", "special", "basic"),
+    "chs": ("pokemon", "stage1", "stage2", "ex", "ex_terastal", "mega", "vstar", "vmax", "radiant",
+            "item", "supporter", "stadium", "tool", "trainer", "tm", "special", "basic"),
+}
+
+# What the CHS parser looks up besides the API response: the set catalog and the evolution index.
+CHS_CONTEXT = {
+    "set_names": {"CSV8C": "朱&紫 超电突围"},
+    "evolutions": {"火恐龙": "小火龙", "小火龙": None},
+}
+
+
+# --- Corpus ---
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    _write(MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n")
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def fixture_path(language, name):
+    return os.path.join(FIXTURES_DIR, language, name + EXTENSIONS[language])
+
+
+def golden_path(language, name):
+    return os.path.join(FIXTURES_DIR, language, name + ".golden.json")
+
+
+def fixtures(manifest, languages=None, names=None):
+    """[(language, name, card_id, content)] in a stable order."""
+    result = []
+    for language in languages or LANGUAGES:
+        for name, entry in sorted(manifest.get(language, {}).items()):
+            if names and name not in names:
+                continue
+            with open(fixture_path(language, name), 'r', encoding='utf-8') as f:
+                result.append((language, name, entry["card_id"], f.read()))
+    return result
+
+
+def use_chs_context(context, work_dir):
+    """Points the CHS parser at the fixture set catalog and evolution index instead of the real ones."""
+    card_utils_chs._SET_NAME_CACHE = dict(context.get("set_names", {}))
+    card_utils_chs._SET_NAME_FETCHED_AT = time.time()
+    evolution_index.INDEX_FILE = os.path.join(work_dir, "evolution_index_chs.json")
+    evolution_index._names = dict(context.get("evolutions", {}))
+
+
+def parse(language, card_id, content):
+    return MODULES[language].get_card_details(card_id, html_content=content)
+
+
+def dumps(card):
+    """The byte-exact form outputs are compared in."""
+    return json.dumps(card, ensure_ascii=False, default=card_model.json_default)
+
+
+# Runs in a separate interpreter with the reference checkout first on sys.path, so its
+# card_utils_* are imported instead of these. Reads {"context", "fixtures": [[lang, card_id, content]]}
+# on stdin and prints the card_details of each fixture as one JSON list. The network is cut off;
+# the set catalog and the evolution lookup are served from the fixture context.
+_REFERENCE_SCRIPT = r"""
+import sys, os, json
+sys.path[:0] = [sys.argv[1], os.path.join(sys.argv[1], 'libs')]
+import requests
+
+def offline(*args, **kwargs):
+    raise requests.exceptions.ConnectionError("parser fixtures are parsed offline")
+
+requests.get = requests.post = requests.request = requests.Session.request = offline
+import card_utils_jp, card_utils_cht, card_utils_chs
+
+payload = json.load(sys.stdin)
+context = payload["context"]
+card_utils_chs._SET_NAME_CACHE = dict(context.get("set_names", {}))
+
+def get_card_by_name(name):
+    pre_evolution = context.get("evolutions", {}).get(name)
+    return {"pokemon": {"evolvesFrom": [pre_evolution]}} if pre_evolution else None
+
+card_utils_chs.get_card_by_name = get_card_by_name
+modules = {"jp": card_utils_jp, "cht": card_utils_cht, "chs": card_utils_chs}
+sys.stdout.write(json.dumps([modules[language].get_card_details(card_id, html_content=content)
+                             for language, card_id, content in payload["fixtures"]], ensure_ascii=False))
+"""
+
+
+def reference_outputs(reference_dir, corpus, context):
+    """The card_details the get_card_details of another checkout's python/ returns for corpus."""
+    payload = {"context": context, "fixtures": [[language, card_id, content] for language, _, card_id, content in corpus]}
+    result = subprocess.run([sys.executable, "-c", _REFERENCE_SCRIPT, os.path.abspath(reference_dir)],
+                            input=json.dumps(payload, ensure_ascii=False), capture_output=True, text=True, encoding='utf-8')
+    if result.returncode != 0:
+        raise RuntimeError(f"the reference parsers failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+
+# --- CHS synthesis ---
+
+def synthesize_chs_response(rng, card_id, kind):
+    set_code, card_index = card_id.split('-', 1)
+    data = {"setCode": set_code, "cardIndex": card_index, "rarity": rng.choice(["C", "U", "R", "RR", "SR", "SAR"]),
+            "artist": "5ban Graphics"}
+    if kind in ("pokemon", "stage1", "stage2", "ex", "ex_terastal", "mega", "vstar", "vmax", "radiant"):
+        stage = {"stage1": "Stage 1", "stage2": "Stage 2", "vstar": "VSTAR", "vmax": "VMAX"}.get(kind, "Basic")
+        name = {"pokemon": "小火龙", "stage1": "火恐龙", "stage2": "喷火龙", "ex": "喷火龙ex", "ex_terastal": "太乐巴戈斯ex",
+                "mega": "超级喷火龙Xex", "vstar": "阿尔宙斯VSTAR", "vmax": "超极巨化喷火龙VMAX", "radiant": "光辉喷火龙"}[kind]
+        attr = {
+            "stage": stage, "hp": rng.randint(3, 34) * 10, "energyType": rng.choice("GRWLPFDMNC"),
+            "attack": [{"name": f"招式{i}", "cost": "".join(rng.choice("GRWLPFDMC") for _ in range(rng.randint(1, 3))),
+                        "damage": str(rng.randint(1, 25) * 10), "text": f"  给予对手的战斗宝可梦{rng.randint(1, 9) * 10}伤害。 "}
+                       for i in range(rng.randint(1, 2))],
+            "weakness": {"energy": "W", "value": "×2"},
+            "retreatCost": rng.randint(0, 3),
+        }
+        if stage not in ("Basic",):
+            attr["evolvesFrom"] = {"stage1": "小火龙", "stage2": "火恐龙", "vstar": "阿尔宙斯V", "vmax": "喷火龙V"}[kind]
+        if kind in ("stage1", "vstar") or rng.random() < 0.3:
+            attr["ability"] = [{"name": "星耀之力" if kind == "vstar" else "烈焰之心", "text": "在自己的回合可以使用1次。 ",
+                                "isVStarPower": kind == "vstar"}]
+        if rng.random() < 0.3:
+            attr["resistance"] = {"energy": "F", "value": "-30"}
+        if kind == "ex_terastal":
+            attr["ancientTrait"] = "Tera"
+        data.update({"name": name, "cardType": "Pokemon", "pokemonAttr": attr,
+                     "mechanic": {"ex": "ex", "ex_terastal": "ex", "mega": "ex", "vstar": "V"}.get(kind)})
+        if kind == "mega":
+            data["label"] = ["Mega"]
+    elif kind in ("item", "supporter", "stadium", "tool", "trainer", "tm"):
+        name = {"item": "神奇糖果", "supporter": "博士的研究", "stadium": "顶尖雪道", "tool": "勇气护身符",
+                "trainer": "派帕", "tm": "招式学习器 进化"}[kind]
+        card_type = {"item": "Item", "supporter": "Supporter", "stadium": "Stadium", "tool": "Tool", "trainer": "Trainer", "tm": "Tool"}[kind]
+        description = f"从自己的牌库抽取{rng.randint(1, 7)}张卡。\n  在自己的回合只可以使用1张支援者卡。"
+        if kind == "tm":
+            description = "身上放有这张卡的宝可梦，可以使用这张卡的招式。 【无】【无】 进化 选择自己场上最多2只宝可梦进化。"
+        data.update({"name": name, "cardType": card_type, "description": description})
+    else:
+        name = "双重涡轮能量" if kind == "special" else "基本火能量"
+        data.update({"name": name, "cardType": "Special Energy" if kind == "special" else "Basic Energy",
+                     "description": "这张卡被附着期间，\n 视为【无】能量2个。" if kind == "special" else ""})
+    return json.dumps({"code": 200, "msg": "success", "data": data}, ensure_ascii=False, indent=2)
+
+
+def synthesize(language, name, kind):
+    import bench_html_parser
+
+    rng = random.Random(zlib.crc32(f"{language}:{name}".encode('utf-8')))
+    index = SYNTHESIZED_KINDS[language].index(kind) + 1
+    if language == "chs":
+        card_id = f"CSV8C-{index:03d}"
+        return card_id, synthesize_chs_response(rng, card_id, kind)
+    card_id = 40000 + index
+    return str(card_id), bench_html_parser.SYNTHESIZERS[language](rng, card_id, kind)
+
+
+# --- Commands ---
+
+def command_synthesize(args, manifest):
+    for language in args.language or LANGUAGES:
+        entries = manifest.setdefault(language, {})
+        for kind in SYNTHESIZED_KINDS[language]:
+            name = kind
+            if name in entries and not args.force:
+                continue
+            card_id, content = synthesize(language, name, kind)
+            _write(fixture_path(language, name), content)
+            entries[name] = {"card_id": card_id, "source": "synthesized"}
+            print(f"{language}/{name}: synthesized ({card_id})", file=sys.stderr)
+    manifest["chs_context"] = manifest.get("chs_context") or CHS_CONTEXT
+    save_manifest(manifest)
+    return 0
+
+
+def command_add(args, manifest):
+    """Saves a live response as a fixture; check the golden it writes before committing it."""
+    language = args.language_arg
+    name = args.name or args.card_id.replace('/', '-')
+    content = MODULES[language].fetch_card_page(args.card_id, revalidate=True)
+    if content is None:
+        print(f"Could not download {args.card_id}.", file=sys.stderr)
+        return 1
+    _write(fixture_path(language, name), content)
+    manifest.setdefault(language, {})[name] = {"card_id": args.card_id, "source": f"saved {time.strftime('%Y-%m-%d')}"}
+    if language == "chs":
+        # Goldens are checked against the fixture set catalog and evolution index; copy what this card needs into them.
+        card = parse(language, args.card_id, content)
+        context = manifest.setdefault("chs_context", json.loads(json.dumps(CHS_CONTEXT)))
+        if card:
+            context.setdefault("set_names", {})[args.card_id.replace('/', '-').split('-', 1)[0]] = card.get("set_name")
+            evolves_from = (card.get("pokemon") or {}).get("evolvesFrom") or []
+            if len(evolves_from) > 1:
+                context.setdefault("evolutions", {})[evolves_from[0]] = evolves_from[1]
+        use_chs_context(context, args.work_dir)
+    save_manifest(manifest)
+    return command_update(argparse.Namespace(language=[language], names=[name], reference=args.reference, reference_label=None), manifest)
+
+
+def command_update(args, manifest):
+    corpus = fixtures(manifest, args.language, args.names)
+    if args.reference:
+        cards = reference_outputs(args.reference, corpus, manifest.get("chs_context") or CHS_CONTEXT)
+        written_by = args.reference_label or os.path.abspath(args.reference)
+    else:
+        cards = [parse(language, card_id, content) for language, _, card_id, content in corpus]
+        written_by = "self"
+    for (language, name, _, _), card in zip(corpus, cards):
+        manifest[language][name]["golden"] = written_by
+        _write(golden_path(language, name), json.dumps(card, ensure_ascii=False, indent=2, default=card_model.json_default) + "\n")
+        print(f"{language}/{name}: golden written" + (" from the reference" if args.reference else ""), file=sys.stderr)
+    save_manifest(manifest)
+    return 0
+
+
+def command_check(args, manifest):
+    failures = 0
+    checked = 0
+    pooled = []
+    saved = set()
+    for language, name, card_id, content in fixtures(manifest, args.language, args.names):
+        try:
+            with open(golden_path(language, name), 'r', encoding='utf-8') as f:
+                golden = json.load(f)
+            expected = dumps(golden)
+        except FileNotFoundError:
+            print(f"FAIL {language}/{name}: no golden output (run update)", file=sys.stderr)
+            failures += 1
+            continue
+        if manifest[language][name].get("source", "").startswith("saved") and golden:
+            saved.add((language, golden.get("supertype")))
+        checked += 1
+        if not _matches(language, name, None, expected, dumps(parse(language, card_id, content))):
+            failures += 1
+        pooled.append((language, name, card_id, content, expected))
+
+    # --pipeline --parse-processes parses in worker processes: the cards must survive pickling.
+    if pooled:
+        from concurrent.futures import ProcessPoolExecutor
+
+        context = manifest.get("chs_context") or CHS_CONTEXT
+        with ProcessPoolExecutor(max_workers=2, initializer=_init_process, initargs=(context, args.work_dir)) as pool:
+            futures = [pool.submit(parse, language, card_id, content) for language, _, card_id, content, _ in pooled]
+            for (language, name, _, _, expected), future in zip(pooled, futures):
+                checked += 1
+                try:
+                    actual = dumps(future.result())
+                except Exception as e:
+                    actual = f"{type(e).__name__}: {e}"
+                if not _matches(language, name, "process pool", expected, actual):
+                    failures += 1
+    print(f"{checked - failures}/{checked} parser fixtures match their golden output.", file=sys.stderr)
+    if not args.names:
+        label = 'FAIL' if args.require_saved else 'Warning'
+        unreferenced = [f"{language}/{name}" for language in args.language or LANGUAGES
+                        for name, entry in sorted(manifest.get(language, {}).items()) if entry.get("golden", "self") == "self"]
+        if unreferenced:
+            print(f"{label}: the goldens of {', '.join(unreferenced)} were written by the parsers under test; "
+                  f"write them with `update --reference <dir>`.", file=sys.stderr)
+            failures += args.require_saved
+        missing = [f"{language}/{family}" for language in args.language or LANGUAGES for family in FAMILIES
+                   if (language, family) not in saved]
+        if missing:
+            print(f"{label}: no saved page for {', '.join(missing)}; those fixtures are synthesized only. "
+                  f"Save real ones with `add <lang> <card id>`.", file=sys.stderr)
+            failures += args.require_saved
+    return 1 if failures else 0
+
+
+def _matches(language, name, label, expected, actual):
+    if actual == expected:
+        return True
+    print(f"FAIL {language}/{name}" + (f" ({label})" if label else "") + ":\n"
+          f"  expected {expected}\n  actual   {actual}", file=sys.stderr)
+    return False
+
+
+def _init_process(context, work_dir):
+    http_client.OFFLINE = True
+    use_chs_context(context, work_dir)
+
+
+def command_bench(args, manifest):
+    for language in args.language or LANGUAGES:
+        corpus = fixtures(manifest, [language], args.names)
+        if not corpus:
+            continue
+        parse(language, corpus[0][2], corpus[0][3])  # Imports and caches outside the measurement
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for _, _, card_id, content in corpus:
+                parse(language, card_id, content)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Memory is measured in a separate pass; tracing slows parsing down several times.
+        peaks, retained = [], []
+        tracemalloc.start()
+        try:
+            for _, _, card_id, content in corpus:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                card = parse(language, card_id, content)
+                peak = tracemalloc.get_traced_memory()[1]
+                gc.collect()  # The parse tree is freed by the cycle collector; what is left is the card
+                peaks.append(peak - before)
+                retained.append(tracemalloc.get_traced_memory()[0] - before)
+                del card
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            "language": language, "parser": "json" if language == "chs" else "html.parser", "cards": len(corpus),
+            "cards_per_s": round(len(corpus) / best, 1), "ms_per_card": round(best * 1000 / len(corpus), 2),
+            "peak_alloc_kb_per_card": round(sum(peaks) / len(peaks) / 1024, 1),
+            "retained_kb_per_card": round(sum(retained) / len(retained) / 1024, 1),
+        }
+        print(json.dumps(result, ensure_ascii=False))
+        print(f"{language} {result['parser']:<12} {result['cards_per_s']:8.1f} cards/s  {result['ms_per_card']:6.2f} ms/card  "
+              f"peak {result['peak_alloc_kb_per_card']:7.1f} KiB/card  retained {result['retained_kb_per_card']:5.1f} KiB/card", file=sys.stderr)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser fixture corpus: check get_card_details against golden outputs and benchmark it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_selection(sub):
+        sub.add_argument("--language", action="append", choices=LANGUAGES, help="Language (repeatable, defaults to all).")
+        sub.add_argument("--name", dest="names", action="append", default=None, help="Only this fixture (repeatable).")
+
+    check_parser = subparsers.add_parser("check", help="Parse every fixture, also in a process pool, and compare with its golden output.")
+    add_selection(check_parser)
+    check_parser.add_argument("--require-saved", action="store_true",
+                              help="Also fail without reference goldens or without saved real pages for every language and card family.")
+    update_parser = subparsers.add_parser("update", help="Rewrite golden outputs, from --reference or the current parsers (review the diff!).")
+    add_selection(update_parser)
+    update_parser.add_argument("--reference", default=None, help="python/ directory of another checkout whose parsers write the goldens.")
+    update_parser.add_argument("--reference-label", default=None, help="How the manifest names the reference (defaults to its path).")
+    bench_parser = subparsers.add_parser("bench", help="Cards per second and memory per card for each parser.")
+    add_selection(bench_parser)
+    bench_parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus; the fastest is reported.")
+    synthesize_parser = subparsers.add_parser("synthesize", help="Write the synthesized fixtures that are missing.")
+    synthesize_parser.add_argument("--language", action="append", choices=LANGUAGES, help="Language (repeatable, defaults to all).")
+    synthesize_parser.add_argument("--force", action="store_true", help="Rewrite synthesized fixtures that already exist.")
+    add_parser = subparsers.add_parser("add", help="Download a card's page / API response and save it as a fixture.")
+    add_parser.add_argument("language_arg", metavar="lang", choices=LANGUAGES, help="Card language.")
+    add_parser.add_argument("card_id", help="Card ID.")
+    add_parser.add_argument("--name", default=None, help="Fixture name (defaults to the card ID).")
+    add_parser.add_argument("--reference", default=None, help="Write the golden with this checkout's parsers (see update).")
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    args.work_dir = tempfile.mkdtemp(prefix="ptcg_fixtures_")
+    try:
+        # Fixtures are parsed from their files only; nothing may reach the network (except `add`).
+        if args.command != "add":
+            http_client.OFFLINE = True
+            use_chs_context(manifest.get("chs_context") or CHS_CONTEXT, args.work_dir)
+        commands = {"check": command_check, "update": command_update, "bench": command_bench,
+                    "synthesize": command_synthesize, "add": command_add}
+        exit_code = commands[args.command](args, manifest)
+    finally:
+        evolution_index._dirty = False  # The fixture index is never saved
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
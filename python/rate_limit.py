@@ -0,0 +1,105 @@
+import threading, time
+from urllib.parse import urlsplit
+
+# Requests per second and burst size we allow ourselves against each upstream host.
+# The old sequential loop fetched one card at a time and slept 0.3s (JP, CHT) or 0.5s (CHS)
+# after each, which came to about two requests a second; a concurrent import stays there.
+# --rate-limit / --burst raise it for a run.
+DEFAULT_HOST_LIMITS = {
+    "www.pokemon-card.com": (2.0, 2),
+    "asia.pokemon-card.com": (2.0, 2),
+    "tcg.mik.moe": (2.0, 2),
+}
+DEFAULT_LIMIT = (2.0, 2)
+
+_buckets = {}
+_host_limits = dict(DEFAULT_HOST_LIMITS)
+_default_limit = DEFAULT_LIMIT
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. acquire() blocks until a token is available.
+    """
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def configure(rate=None, burst=None, host=None):
+    """
+    Overrides the rate limit for one host, or for every host if host is None.
+    A rate of 0 disables throttling.
+    """
+    global _default_limit
+    with _lock:
+        targets = [host] if host else list(_host_limits.keys())
+        for target in targets:
+            old_rate, old_burst = _host_limits.get(target, _default_limit)
+            new_rate = old_rate if rate is None else rate
+            _host_limits[target] = (new_rate, old_burst if burst is None else burst)
+        if not host:
+            new_rate = _default_limit[0] if rate is None else rate
+            _default_limit = (new_rate, _default_limit[1] if burst is None else burst)
+        _buckets.clear()
+
+
+def limits():
+    """The current limits, for restore_limits()."""
+    with _lock:
+        return dict(_host_limits), _default_limit
+
+
+def restore_limits(saved):
+    """Puts back limits returned by limits(). The buckets are only reset if the limits changed."""
+    global _default_limit
+    host_limits, default_limit = saved
+    with _lock:
+        if host_limits == _host_limits and default_limit == _default_limit:
+            return
+        _host_limits.clear()
+        _host_limits.update(host_limits)
+        _default_limit = default_limit
+        _buckets.clear()
+
+
+def add_arguments(parser):
+    """Adds the shared --workers / --rate-limit options to an argparse parser."""
+    parser.add_argument("--workers", type=int, default=None, help="Number of cards fetched in parallel.")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Maximum requests per second to each card site (0 disables the limit).")
+    parser.add_argument("--burst", type=int, default=None, help="Number of requests allowed in a burst before the rate limit applies.")
+
+
+def apply_arguments(args):
+    """Applies the options added by add_arguments()."""
+    if args.rate_limit is not None or args.burst is not None:
+        configure(rate=args.rate_limit, burst=args.burst)
+
+
+def throttle(url):
+    """Blocks until a request to the host of url is allowed by its token bucket."""
+    host = urlsplit(url).hostname or ""
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, burst = _host_limits.get(host, _default_limit)
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+    bucket.acquire()
@@ -0,0 +1,215 @@
+import sys, os, json, gzip, zlib, time, hashlib, threading, argparse
+
+# --- Constants and Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop', 'http_cache')
+
+# Responses without ETag / Last-Modified are served from the cache for this long
+# before they are fetched again. Responses with validators are always revalidated.
+FRESH_SECONDS = 24 * 3600
+# Upper bound for the whole cache directory. The least recently used entries are evicted first.
+MAX_BYTES = 256 * 1024 * 1024
+
+ENABLED = True
+
+_lock = threading.Lock()
+_total_bytes = None
+stats = {"hit": 0, "revalidated": 0, "miss": 0, "stored": 0, "offline": 0}
+
+
+def cache_key(method, url, body=None):
+    """Builds the cache key from the method, URL and request body (for the JSON POST APIs)."""
+    if body is not None and not isinstance(body, (bytes, str)):
+        body = json.dumps(body, sort_keys=True, ensure_ascii=False)
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha256()
+    digest.update(method.upper().encode('ascii'))
+    digest.update(b'\0')
+    digest.update(url.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.gz")
+
+
+def load(key):
+    """
+    Returns (meta, body) for a cached entry, or None if it is missing or unreadable.
+    """
+    path = _entry_path(key)
+    try:
+        with gzip.open(path, 'rb') as f:
+            raw = f.read()
+    except (OSError, EOFError, zlib.error):  # Missing, truncated or corrupt: a miss
+        return None
+    header, sep, body = raw.partition(b'\n')
+    if not sep:
+        return None
+    try:
+        meta = json.loads(header.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    return meta, body
+
+
+def touch(key):
+    """Marks an entry as recently used, for the size cap eviction order."""
+    path = _entry_path(key)
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def store(key, meta, body):
+    """Writes an entry atomically and evicts old entries when the cache is over MAX_BYTES."""
+    global _total_bytes
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    header = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    try:
+        with gzip.open(temp_path, 'wb', compresslevel=6) as f:
+            f.write(header + b'\n' + body)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+        new_size = os.path.getsize(path)
+    except OSError as e:
+        print(f"Warning: Could not write HTTP cache entry {key}: {e}", file=sys.stderr)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    stats["stored"] += 1
+
+    with _lock:
+        if _total_bytes is None:
+            _total_bytes = sum(size for _, size, _ in _iter_entries())
+        else:
+            _total_bytes += new_size - old_size
+        if _total_bytes > MAX_BYTES:
+            _total_bytes -= _evict(_total_bytes - int(MAX_BYTES * 0.9))
+
+
+def _iter_entries():
+    """Yields (path, size, mtime) for every cache entry."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if not name.endswith('.gz'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            yield path, st.st_size, st.st_mtime
+
+
+def _evict(bytes_to_free):
+    freed = 0
+    for path, size, _ in sorted(_iter_entries(), key=lambda entry: entry[2]):
+        if freed >= bytes_to_free:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def conditional_headers(meta):
+    """Returns the If-None-Match / If-Modified-Since headers for a cached entry."""
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def is_fresh(meta, fresh_seconds=None):
+    """
+    An entry without validators can be served without a request while it is younger than
+    fresh_seconds (FRESH_SECONDS by default). Pass 0 to always revalidate.
+    """
+    if meta.get('etag') or meta.get('last_modified'):
+        return False
+    if fresh_seconds is None:
+        fresh_seconds = FRESH_SECONDS
+    return time.time() - meta.get('stored_at', 0) < fresh_seconds
+
+
+def make_meta(method, url, response):
+    return {
+        "method": method.upper(),
+        "url": url,
+        "status": response.status_code,
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "content_type": response.headers.get('Content-Type'),
+        "encoding": response.encoding,
+        "stored_at": time.time(),
+    }
+
+
+def purge(older_than_days=None):
+    """Deletes cache entries, optionally only those not used for older_than_days. Returns (count, bytes)."""
+    global _total_bytes
+    cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+    count = freed = 0
+    for path, size, mtime in list(_iter_entries()):
+        if cutoff is not None and mtime >= cutoff:
+            continue
+        try:
+            os.remove(path)
+            count += 1
+            freed += size
+        except OSError:
+            pass
+    with _lock:
+        _total_bytes = None
+    return count, freed
+
+
+def main():
+    global CACHE_DIR
+    parser = argparse.ArgumentParser(description="Inspect or purge the on-disk HTTP response cache used by the card import scripts.")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Path to the cache directory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show the number of entries and the total size.")
+    list_parser = subparsers.add_parser("list", help="List cached URLs, most recently used first.")
+    list_parser.add_argument("--limit", type=int, default=50, help="Maximum number of entries to show.")
+    purge_parser = subparsers.add_parser("purge", help="Delete cache entries.")
+    purge_parser.add_argument("--older-than", type=float, default=None, help="Only delete entries not used for this many days.")
+    args = parser.parse_args()
+    if args.cache_dir:
+        CACHE_DIR = args.cache_dir
+
+    if args.command == "stats":
+        entries = list(_iter_entries())
+        total = sum(size for _, size, _ in entries)
+        print(f"Cache directory: {CACHE_DIR}")
+        print(f"Entries: {len(entries)}")
+        print(f"Size: {total / 1024 / 1024:.2f} MiB (limit {MAX_BYTES / 1024 / 1024:.0f} MiB)")
+    elif args.command == "list":
+        entries = sorted(_iter_entries(), key=lambda entry: entry[2], reverse=True)[:args.limit]
+        for path, size, mtime in entries:
+            key = os.path.basename(path)[:-len('.gz')]
+            entry = load(key)
+            url = entry[0].get('url') if entry else '(unreadable)'
+            method = entry[0].get('method', '') if entry else ''
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))
+            print(f"{used}  {size:>8}  {method:<4} {url}")
+    elif args.command == "purge":
+        count, freed = purge(args.older_than)
+        print(f"Deleted {count} entries ({freed / 1024 / 1024:.2f} MiB).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import sys, os, json, time, random, argparse, subprocess, tempfile, shutil
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import card_store
+
+
+def fake_card(card_id, worker):
+    return {
+        "name": f"Stress {card_id}",
+        "cardType": "Pokémon",
+        "image_url": f"https://example.invalid/{card_id}.png",
+        "worker": worker,
+    }
+
+
+def run_worker(json_path, worker, cards, batches, max_delay):
+    """
+    Behaves like an import script: loads the whole database, spends some time "fetching",
+    then saves. Every batch adds cards no other worker writes, so nothing may go missing.
+    """
+    per_batch = max(1, cards // batches)
+    written = 0
+    while written < cards:
+        database = card_store.load(json_path)
+        for _ in range(min(per_batch, cards - written)):
+            card_id = f"w{worker}-{written}"
+            database[card_id] = fake_card(card_id, worker)
+            written += 1
+        time.sleep(random.uniform(0, max_delay))  # Other workers load and save in the meantime
+        card_store.save(database, json_path)
+
+
+def read_json(json_path):
+    try:
+        return card_store.read_file(json_path)
+    except (OSError, ValueError):
+        return {}
+
+
+def wait_for_compaction(json_path, timeout=30):
+    deadline = time.time() + timeout
+    compacting = card_store.journal_path(json_path) + '.compacting'
+    while os.path.exists(compacting) and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def run(backend, processes, cards, batches, max_delay, compact_bytes, keep_dir=None):
+    work_dir = keep_dir or tempfile.mkdtemp(prefix="ptcg_stress_")
+    json_path = os.path.join(work_dir, f"database_{backend}.json")
+    env = dict(os.environ, PTCG_CARD_STORE=backend)
+    if compact_bytes:
+        env["PTCG_JOURNAL_COMPACT_BYTES"] = str(compact_bytes)
+    # Seed an existing card, so a worker that overwrote the file with its own copy would lose it too.
+    seed = {"seed": fake_card("seed", -1)}
+    card_store.BACKEND = backend
+    card_store.save(seed, json_path)
+
+    started = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(worker), "--json", json_path,
+             "--cards", str(cards), "--batches", str(batches), "--max-delay", str(max_delay)],
+            env=env,
+        )
+        for worker in range(processes)
+    ]
+    failed_workers = sum(1 for p in workers if p.wait() != 0)
+    elapsed = time.perf_counter() - started
+    if backend == "journal":
+        wait_for_compaction(json_path)
+
+    expected = {"seed"} | {f"w{worker}-{i}" for worker in range(processes) for i in range(cards)}
+    views = {"store": set(card_store.load(json_path))}
+    if backend == "sqlite":
+        views["json"] = set(read_json(json_path))
+    else:
+        card_store.compact(json_path)
+        views["snapshot"] = set(read_json(json_path))
+
+    result = {
+        "backend": backend,
+        "processes": processes,
+        "cards_per_process": cards,
+        "saves_per_process": batches,
+        "elapsed_s": round(elapsed, 3),
+        "failed_workers": failed_workers,
+        "expected": len(expected),
+        "lost": {name: sorted(expected - ids)[:20] for name, ids in views.items() if expected - ids},
+    }
+    if not keep_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run N concurrent fake importers against one card database and check that no card is lost.")
+    parser.add_argument("--backend", action="append", choices=["sqlite", "journal"], help="Store backend to test (repeatable, defaults to both).")
+    parser.add_argument("--processes", type=int, default=8, help="Number of concurrent importer processes.")
+    parser.add_argument("--cards", type=int, default=50, help="Cards written by each process.")
+    parser.add_argument("--batches", type=int, default=5, help="Load/save cycles per process.")
+    parser.add_argument("--max-delay", type=float, default=0.05, help="Longest pause between load and save, in seconds.")
+    parser.add_argument("--compact-bytes", type=int, default=4096, help="Journal size that triggers compaction during the run (0 for the default).")
+    parser.add_argument("--keep-dir", type=str, default=None, help="Directory to run in and keep afterwards (defaults to a temporary one).")
+    parser.add_argument("--worker", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--json", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.json, args.worker, args.cards, args.batches, args.max_delay)
+        return
+
+    ok = True
+    for backend in args.backend or ["sqlite", "journal"]:
+        keep_dir = os.path.join(args.keep_dir, backend) if args.keep_dir else None
+        if keep_dir:
+            os.makedirs(keep_dir, exist_ok=True)
+        result = run(backend, args.processes, args.cards, args.batches, args.max_delay, args.compact_bytes, keep_dir)
+        print(json.dumps(result, ensure_ascii=False))
+        ok = ok and not result["lost"] and not result["failed_workers"]
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os, sys, json, time, threading
+from contextlib import contextmanager
+
+# Progress and timing events for the extension, one JSON line on stdout each (next to the
+# {"cards"}, {"cardChanges"} and {"images"} lines), so they never depend on how stderr is chunked:
+#   {"progress": {"phase": "fetch", "card": "45123", "cache": "miss", "bytes": 48213, "ms": 412.7}}
+#   {"progress": {"phase": "card", "card": "45123", "done": 3, "total": 20, "status": "updated", "ms": 655.1}}
+# Phases:
+#   deck   the deck list page / API request
+#   fetch  a card detail page / API request
+#   parse  turning it into card details
+#   image  a card image download
+#   save   the database save
+#   card   a card is done (done/total of the import, its status and its total time)
+# cache is how http_client served the request: "hit", "revalidated", "miss", "offline" or
+# "none" (not cached); for an image, "hit" means it was already on disk or in the image store.
+# A step that raised carries its exception name as "error". Fields that do not apply are left out.
+#
+# Off unless a script calls enable(). Events are only sent from the process that enabled
+# them, never from a parse process pool.
+ENABLED = False
+PHASES = ("deck", "fetch", "parse", "image", "save", "card")
+
+_pid = None
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def enable():
+    global ENABLED, _pid
+    ENABLED = True
+    _pid = os.getpid()
+
+
+def active():
+    return ENABLED and os.getpid() == _pid
+
+
+def elapsed_ms(started):
+    """Milliseconds since a time.perf_counter() value."""
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def emit(phase, **fields):
+    """Sends one event; fields that are None are left out."""
+    if not active():
+        return
+    event = {"phase": phase}
+    event.update((key, value) for key, value in fields.items() if value is not None)
+    line = json.dumps({"progress": event}, ensure_ascii=False) + '\n'
+    # One write per line: events come from several threads at once.
+    with _lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+@contextmanager
+def span(phase, card=None, **fields):
+    """
+    Times the block and emits one event for it when it ends. Requests sent inside the block on
+    this thread add their cache status and size to it (see note()).
+    """
+    if not active():
+        yield fields
+        return
+    event = dict(fields, card=card)
+    outer = getattr(_local, 'span', None)
+    _local.span = event
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event['error'] = type(e).__name__
+        raise
+    finally:
+        _local.span = outer
+        event['ms'] = elapsed_ms(started)
+        emit(phase, **event)
+
+
+def note(cache=None, size=None):
+    """Records a response on the span open on this thread: how it was served and its body size."""
+    event = getattr(_local, 'span', None)
+    if event is None:
+        return
+    if cache is not None:
+        event['cache'] = cache
+    if size:
+        event['bytes'] = event.get('bytes', 0) + size
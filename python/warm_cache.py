@@ -0,0 +1,310 @@
+import sys, os, re, json, time, argparse, importlib
+
+# Get the absolute path of the directory where the script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Construct the absolute path to the 'libs' directory
+libs_dir = os.path.join(script_dir, 'libs')
+
+# Add the 'libs' directory to the Python path
+if libs_dir not in sys.path:
+    sys.path.insert(0, libs_dir)
+
+import requests
+
+import http_client, rate_limit, html_parsing
+from deck_ingest import ingest_cards
+from image_pool import ImageDownloadPool, finish_and_report
+
+# --- Constants and Paths ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+ASSETS_DIR = os.path.join(PROJECT_ROOT, 'nodecg', 'assets', 'ptcg-telop')
+
+# Cards processed between two database saves / checkpoint writes.
+CHUNK_SIZE = 50
+# The enumeration stops after this many pages to guard against a search that never runs out.
+MAX_PAGES = 200
+
+JP_SEARCH_URL = "https://www.pokemon-card.com/card-search/resultAPI.php"
+CHT_LIST_URL = "https://asia.pokemon-card.com/tw/card-search/list/"
+CHS_SEARCH_URL = "https://tcg.mik.moe/api/v3/card/card-basic-search"
+CHS_SEARCH_PAGE_SIZE = 100
+
+
+# --- Enumeration ---
+def enumerate_jp(set_code=None, regulation=None):
+    """Lists card IDs from the JSON API behind the official JP card search. pg selects an expansion."""
+    card_ids = []
+    page = 1
+    while page <= MAX_PAGES:
+        params = {
+            "keyword": "", "se_ta": "", "illust": "", "sm_and_keyword": "true",
+            "regulation_sidebar_form": regulation or "all",
+            "pg": set_code or "",
+            "page": page,
+        }
+        response = http_client.get(JP_SEARCH_URL, params=params)
+        response.raise_for_status()
+        result = response.json()
+        for card in result.get("cardList") or []:
+            if card.get("cardID"):
+                card_ids.append(str(card["cardID"]))
+        if page >= int(result.get("maxPage") or 0):
+            break
+        page += 1
+    return card_ids
+
+
+def enumerate_cht(set_code=None, regulation=None):
+    """Lists card IDs from the paged results of the Asia (TW) card search by scraping detail links."""
+    card_ids = []
+    for page in range(1, MAX_PAGES + 1):
+        params = {"pageNo": page, "expansionCodes": set_code or "", "regulation": regulation or ""}
+        response = http_client.get(CHT_LIST_URL, params=params)
+        response.raise_for_status()
+        soup = html_parsing.make_soup(response.text)
+        page_ids = []
+        for link in soup.find_all('a', href=True):
+            match = re.search(r'/card-search/detail/(\d+)/', link['href'])
+            if match and match.group(1) not in page_ids:
+                page_ids.append(match.group(1))
+        new_ids = [card_id for card_id in page_ids if card_id not in card_ids]
+        if not new_ids:
+            break  # Past the last page the site repeats the last page or shows nothing
+        card_ids.extend(new_ids)
+    return card_ids
+
+
+def enumerate_chs(set_code=None, regulation=None):
+    """
+    Lists card IDs ('SET-NUM') for one CHS set with the basic search API, filtered by setCode.
+    With only a regulation mark, every set from the product list with that mark is enumerated.
+    """
+    if not set_code:
+        card_ids = []
+        for code in chs_set_codes(regulation):
+            card_ids.extend(enumerate_chs(code))
+        return card_ids
+
+    card_ids = []
+    for page in range(1, MAX_PAGES + 1):
+        payload = {"SearchText": "", "setCode": set_code, "page": page, "PageSize": CHS_SEARCH_PAGE_SIZE}
+        response = http_client.post(CHS_SEARCH_URL, json=payload)
+        response.raise_for_status()
+        result = response.json()
+        if result.get("code") != 200:
+            print(f"API returned an error while listing {set_code}: {result.get('msg')}", file=sys.stderr)
+            break
+        card_list = result.get("data", {}).get("list", [])
+        if not card_list:
+            break
+        matching = [card for card in card_list if card.get("setCode") == set_code and card.get("cardIndex")]
+        if not matching:
+            print(f"Warning: The search for {set_code} returned cards from other sets only, stopping.", file=sys.stderr)
+            break
+        card_ids.extend(f"{card['setCode']}-{card['cardIndex']}" for card in matching)
+        if len(card_list) < CHS_SEARCH_PAGE_SIZE:
+            break
+    return list(dict.fromkeys(card_ids))
+
+
+def chs_set_codes(regulation=None):
+    """Set codes from the CHS product list (card_packs.json), optionally only those with a regulation mark."""
+    import card_utils_chs
+    card_utils_chs._get_set_name_map()  # Fetches the catalog if it is missing, refreshes it if stale
+    set_list, _ = card_utils_chs.read_card_packs()
+    codes = []
+    for item in set_list or []:
+        mark = item.get('regulationMark') or item.get('regulation')
+        if regulation and mark != regulation:
+            continue
+        if item.get('setCode'):
+            codes.append(item['setCode'])
+    return codes
+
+
+ENUMERATORS = {"jp": enumerate_jp, "cht": enumerate_cht, "chs": enumerate_chs}
+
+
+# --- Checkpoint ---
+def checkpoint_path(language):
+    return os.path.join(ASSETS_DIR, f"warm_{language}.checkpoint.json")
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"targets": {}, "done": [], "failed": {}}
+
+
+def save_checkpoint(path, checkpoint):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+# --- Warm-up ---
+def _card_utils(language):
+    return importlib.import_module(f"card_utils_{language}")
+
+
+def _process_card(utils, language, card_id, card_database, image_pool):
+    if language == 'chs':
+        return utils._core_process_card(card_id, card_database, overwrite=False, image_pool=image_pool)
+    return utils._core_process_card(card_id, card_database, overwrite=False, language=language, image_pool=image_pool)
+
+
+def _image_path(utils, language, card_id, image_url):
+    if language == 'chs':
+        return utils.get_card_image_path(card_id, image_url)
+    return utils.get_card_image_path(card_id, image_url, language=language)
+
+
+def warm(language, targets, db_path=None, workers=None, refresh_ids=False, retry_failed=False):
+    """
+    Enumerates every card of the targets ("set:<code>" / "regulation:<mark>") and imports the
+    ones missing from the database. Progress is checkpointed after every chunk, so an interrupted
+    run continues where it stopped. Returns the checkpoint.
+    """
+    utils = _card_utils(language)
+    path = checkpoint_path(language)
+    checkpoint = load_checkpoint(path)
+
+    for target in targets:
+        if target in checkpoint["targets"] and not refresh_ids:
+            continue
+        kind, _, value = target.partition(':')
+        print(f"Enumerating cards for {target}...", file=sys.stderr)
+        try:
+            if kind == 'set':
+                card_ids = ENUMERATORS[language](set_code=value)
+            else:
+                card_ids = ENUMERATORS[language](regulation=value)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error enumerating {target}: {e}", file=sys.stderr)
+            continue
+        print(f"Found {len(card_ids)} cards for {target}.", file=sys.stderr)
+        checkpoint["targets"][target] = card_ids
+        save_checkpoint(path, checkpoint)
+
+    card_database = utils.load_database(db_path=db_path)
+    # Only trust "done" for cards the database still has: it may have been cleared since.
+    checkpoint["done"] = [card_id for card_id in checkpoint["done"] if (card_database.get(card_id) or {}).get('name')]
+    done = set(checkpoint["done"])
+    if retry_failed:
+        checkpoint["failed"] = {}
+    pending = []
+    for target in targets:
+        for card_id in checkpoint["targets"].get(target, []):
+            if card_id not in done and card_id not in checkpoint["failed"] and card_id not in pending:
+                pending.append(card_id)
+    print(f"{len(pending)} cards left to warm up ({len(done)} already done).", file=sys.stderr)
+
+    image_pool = ImageDownloadPool(workers)
+    try:
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[start:start + CHUNK_SIZE]
+            results, updated = ingest_cards(
+                chunk,
+                lambda card_id: _process_card(utils, language, card_id, card_database, image_pool),
+                card_database,
+                workers=workers,
+            )
+            if updated:
+                utils.save_database(card_database, db_path=db_path)
+            for card_id, (card_info, status) in results.items():
+                if card_info and card_info.get('name'):
+                    checkpoint["done"].append(card_id)
+                else:
+                    checkpoint["failed"][card_id] = status
+            save_checkpoint(path, checkpoint)
+            print(f"Warm-up progress: {min(start + CHUNK_SIZE, len(pending))}/{len(pending)} cards.", file=sys.stderr)
+    finally:
+        finish_and_report(image_pool)
+    return checkpoint
+
+
+def coverage_report(language, targets, db_path=None):
+    """Returns {target: {"cards", "in_database", "with_image", "missing": [...]}} for the enumerated targets."""
+    utils = _card_utils(language)
+    checkpoint = load_checkpoint(checkpoint_path(language))
+    card_database = utils.load_database(db_path=db_path)
+    report = {}
+    for target in targets or checkpoint["targets"].keys():
+        card_ids = checkpoint["targets"].get(target)
+        if card_ids is None:
+            report[target] = {"cards": 0, "in_database": 0, "with_image": 0, "missing": [], "enumerated": False}
+            continue
+        in_database = with_image = 0
+        missing = []
+        for card_id in card_ids:
+            card = card_database.get(card_id)
+            if not card or not card.get('name'):
+                missing.append(card_id)
+                continue
+            in_database += 1
+            if card.get('image_url') and os.path.exists(_image_path(utils, language, card_id, card['image_url'])):
+                with_image += 1
+        report[target] = {"cards": len(card_ids), "in_database": in_database, "with_image": with_image, "missing": missing}
+    return report
+
+
+def print_report(report):
+    print("Coverage report:", file=sys.stderr)
+    for target, entry in report.items():
+        if entry.get("enumerated") is False:
+            print(f"  {target}: not enumerated yet", file=sys.stderr)
+            continue
+        cards = entry["cards"] or 1
+        print(
+            f"  {target}: {entry['in_database']}/{entry['cards']} in database ({entry['in_database'] * 100 / cards:.1f}%), "
+            f"{entry['with_image']}/{entry['cards']} with image",
+            file=sys.stderr,
+        )
+        if entry["missing"]:
+            print(f"    missing: {', '.join(entry['missing'][:20])}{' ...' if len(entry['missing']) > 20 else ''}", file=sys.stderr)
+    print(json.dumps({"coverage": report}, ensure_ascii=False), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-populate the card database and images for whole sets before an event.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("lang", choices=sorted(ENUMERATORS), help="Card language.")
+        sub.add_argument("--set", dest="sets", action="append", default=[], help="Expansion / set code to include (repeatable).")
+        sub.add_argument("--regulation", dest="regulations", action="append", default=[], help="Regulation mark to include (repeatable).")
+        sub.add_argument("--database-path", type=str, default=None, help="Path to the database JSON file.")
+
+    warm_parser = subparsers.add_parser("warm", help="Fetch every card of the given sets / regulation marks that is not in the database yet.")
+    add_common(warm_parser)
+    warm_parser.add_argument("--refresh-ids", action="store_true", help="Enumerate the targets again instead of using the checkpointed card lists.")
+    warm_parser.add_argument("--retry-failed", action="store_true", help="Retry cards that failed in an earlier run.")
+    warm_parser.add_argument("--reset", action="store_true", help="Discard the checkpoint and start over.")
+    rate_limit.add_arguments(warm_parser)
+
+    report_parser = subparsers.add_parser("report", help="Show the coverage of enumerated sets without fetching anything.")
+    add_common(report_parser)
+
+    args = parser.parse_args()
+    targets = [f"set:{code}" for code in args.sets] + [f"regulation:{mark}" for mark in args.regulations]
+
+    if args.command == "warm":
+        if not targets:
+            parser.error("warm needs at least one --set or --regulation")
+        rate_limit.apply_arguments(args)
+        if args.reset and os.path.exists(checkpoint_path(args.lang)):
+            os.remove(checkpoint_path(args.lang))
+        started = time.time()
+        checkpoint = warm(args.lang, targets, db_path=args.database_path, workers=args.workers,
+                          refresh_ids=args.refresh_ids, retry_failed=args.retry_failed)
+        print(f"Warm-up finished in {time.time() - started:.1f}s, {len(checkpoint['failed'])} cards failed.", file=sys.stderr)
+
+    print_report(coverage_report(args.lang, targets, db_path=args.database_path))
+
+
+if __name__ == "__main__":
+    main()